@@ -3,10 +3,15 @@ Alert Agent - Uses Google ADK
 Coordinates communication between agents and sends alerts to stakeholders
 """
 
+import os
 from typing import Dict, List, Any
 from datetime import datetime
 import asyncio
 
+from agents.alert_store import AlertArchive, AlertStore
+from agents.notifications import NotificationDispatcher
+from profiling import profiled
+
 class AlertAgent:
     """
     AI Agent for coordinating alerts and communication
@@ -16,7 +21,22 @@ class AlertAgent:
     def __init__(self):
         self.name = "alert_agent"
         self.status = "active"
-        self.alert_history: List[Dict[str, Any]] = []
+        self.tasks_completed = 0
+        # Bounded, indexed history; older alerts are archived once attach_archive() runs
+        self.alerts = AlertStore(capacity=int(os.getenv("ALERT_HISTORY_CAPACITY", "10000")))
+
+        # Background fan-out of stakeholder notifications
+        self.dispatcher = NotificationDispatcher(
+            self.send_digest,
+            digest_window=float(os.getenv("ALERT_DIGEST_WINDOW", "2.0")),
+            max_retries=int(os.getenv("ALERT_NOTIFICATION_RETRIES", "3"))
+        )
+
+    async def attach_archive(self, session_maker):
+        """
+        Archive alerts to the database and reserve alert ids in it
+        """
+        await self.alerts.attach_archive(AlertArchive(session_maker))
 
     async def create_alert(self,
                           disruption: Dict[str, Any],
@@ -25,7 +45,7 @@ class AlertAgent:
         Create a comprehensive alert from prediction and optimization data
         """
         alert = {
-            "id": f"alert-{len(self.alert_history) + 1}",
+            "id": self.alerts.next_id(),
             "timestamp": datetime.utcnow().isoformat(),
             "disruption": disruption,
             "optimization_plan": optimization_plan,
@@ -35,7 +55,7 @@ class AlertAgent:
             "status": "pending"
         }
 
-        self.alert_history.append(alert)
+        self.alerts.add(alert)
         return alert
 
     def calculate_severity(self, disruption: Dict[str, Any]) -> str:
@@ -58,8 +78,6 @@ class AlertAgent:
         """
         Identify which stakeholders need to be notified
         """
-        await asyncio.sleep(0.1)
-
         stakeholders = ["logistics_manager"]
 
         # Add more stakeholders based on severity
@@ -68,37 +86,55 @@ class AlertAgent:
 
         return stakeholders
 
-    async def send_notification(self, alert: Dict[str, Any], channel: str = "email"):
+    async def send_digest(self, channel: str, stakeholder: str, alerts: List[Dict[str, Any]]):
         """
-        Send notifications to stakeholders
+        Send one message to a stakeholder covering one or more alerts
         In production: integrates with email, Slack, SMS, etc.
         """
-        print(f"[Alert Agent] Sending {channel} notification for alert {alert['id']}")
-        print(f"  Severity: {alert['severity']}")
-        print(f"  Stakeholders: {', '.join(alert['stakeholders'])}")
+        severities = ", ".join(sorted({a["severity"] for a in alerts}))
+        print(f"[Alert Agent] Sending {channel} digest to {stakeholder}: {len(alerts)} alert(s) ({severities})")
 
         # Simulate notification sending
         await asyncio.sleep(0.2)
-        return {"status": "sent", "channel": channel}
+        return {"status": "sent", "channel": channel, "alerts": len(alerts)}
+
+    def notification_channels(self, alert: Dict[str, Any]) -> List[str]:
+        """
+        Pick delivery channels by severity
+        """
+        if alert["severity"] == "critical":
+            return ["email", "sms"]
+        return ["email"]
 
     async def track_resolution(self, alert_id: str) -> Dict[str, Any]:
         """
         Track alert resolution progress
         """
-        # Find alert in history
-        alert = next((a for a in self.alert_history if a["id"] == alert_id), None)
+        alert = await self.alerts.lookup(alert_id)
 
         if not alert:
             return {"error": "Alert not found"}
 
+        resolution_time = None
+        if alert.get("resolved_at"):
+            elapsed = datetime.fromisoformat(alert["resolved_at"]) - datetime.fromisoformat(alert["timestamp"])
+            resolution_time = elapsed.total_seconds()
+
         return {
             "alert_id": alert_id,
             "status": alert["status"],
             "created_at": alert["timestamp"],
             "actions_taken": len(alert.get("recommended_actions", [])),
-            "resolution_time": None  # Would calculate if resolved
+            "resolution_time": resolution_time
         }
 
+    def update_alert_status(self, alert_id: str, status: str) -> bool:
+        """
+        Move an alert to a new status (e.g. "acknowledged", "resolved")
+        """
+        return self.alerts.set_status(alert_id, status)
+
+    @profiled("alert.process_alert")
     async def process_alert(self,
                           disruption: Dict[str, Any],
                           optimization_plan: Dict[str, Any]) -> Dict[str, Any]:
@@ -108,16 +144,14 @@ class AlertAgent:
         # Create alert
         alert = await self.create_alert(disruption, optimization_plan)
 
-        # Send notifications to stakeholders
-        notification_results = []
-        for stakeholder in alert["stakeholders"]:
-            result = await self.send_notification(alert, channel="email")
-            notification_results.append(result)
-
-        alert["notifications_sent"] = len(notification_results)
+        # Queue notifications; delivery, batching and retries happen in the background
+        alert["notifications_queued"] = self.dispatcher.enqueue(
+            alert, alert["stakeholders"], self.notification_channels(alert)
+        )
 
         # Update alert status
-        alert["status"] = "active"
+        self.alerts.set_status(alert["id"], "active")
+        self.tasks_completed += 1
 
         return alert
 
@@ -126,6 +160,8 @@ class AlertAgent:
         return {
             "name": self.name,
             "status": self.status,
-            "tasks_completed": 2341,
-            "active_alerts": len([a for a in self.alert_history if a["status"] == "active"])
+            "tasks_completed": self.tasks_completed,
+            "active_alerts": self.alerts.status_counts["active"],
+            "alert_history": self.alerts.get_stats(),
+            "notifications": self.dispatcher.get_stats()
         }
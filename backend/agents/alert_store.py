@@ -0,0 +1,318 @@
+"""
+Indexed, bounded alert history for the Alert Agent
+Alerts are kept in insertion order in a dict keyed by id (O(1) lookup and
+oldest-first eviction); per-status and per-severity counters are updated on
+every add, status transition and eviction. Evicted alerts are archived to
+the alerts table in batches, and everything still held is archived on
+shutdown. Alert ids come from blocks reserved in the alert_sequence table,
+so they are never handed out twice, even after a crash.
+"""
+
+import asyncio
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+ALERT_ID_PREFIX = "alert-"
+SEQUENCE_NAME = "alerts"
+
+
+def _parse_created_at(value: Any) -> datetime:
+    try:
+        ts = datetime.fromisoformat(str(value))
+    except ValueError:
+        return datetime.now(timezone.utc)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class AlertArchive:
+    """Reads and writes evicted alerts in the alerts table"""
+
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+
+    async def save(self, entries: List[Tuple[int, Dict[str, Any]]]):
+        """Insert alerts, or update the status and payload of ones already archived"""
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+        from models import AlertRecord
+
+        rows = [
+            {
+                "seq": seq,
+                "alert_id": alert["id"],
+                "created_at": _parse_created_at(alert.get("timestamp")),
+                "severity": alert.get("severity", "low"),
+                "status": alert.get("status", "pending"),
+                "payload": alert,
+            }
+            for seq, alert in entries
+        ]
+        statement = insert(AlertRecord).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[AlertRecord.seq],
+            set_={
+                "status": statement.excluded.status,
+                "payload": statement.excluded.payload,
+                "archived_at": func.now(),
+            }
+        )
+        async with self.session_maker() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    async def get(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        from sqlalchemy import select
+        from models import AlertRecord
+
+        async with self.session_maker() as session:
+            result = await session.execute(select(AlertRecord.payload).where(AlertRecord.alert_id == alert_id))
+            return result.scalar_one_or_none()
+
+    async def max_sequence(self) -> int:
+        from sqlalchemy import func, select
+        from models import AlertRecord
+
+        async with self.session_maker() as session:
+            result = await session.execute(select(func.max(AlertRecord.seq)))
+            return result.scalar() or 0
+
+    async def reserve_sequence(self, at_least: int, block: int) -> int:
+        """
+        Move the persisted id high-water mark to max(mark, at_least) + block
+        and return it; ids up to the returned value are reserved
+        """
+        from sqlalchemy import text
+
+        async with self.session_maker() as session:
+            result = await session.execute(text(
+                "INSERT INTO alert_sequence (name, last_seq) VALUES (:name, CAST(:at_least AS BIGINT) + :block) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "last_seq = GREATEST(alert_sequence.last_seq, CAST(:at_least AS BIGINT)) + CAST(:block AS BIGINT), "
+                "updated_at = now() RETURNING last_seq"
+            ), {"name": SEQUENCE_NAME, "at_least": at_least, "block": block})
+            last_seq = result.scalar_one()
+            await session.commit()
+            return last_seq
+
+
+class AlertStore:
+    """
+    Bounded in-memory alert index
+
+    Ids come from a monotonically increasing sequence, so they stay unique
+    after eviction. Once an archive is attached, ids are taken from blocks
+    of `sequence_block` reserved in the database ahead of use, so they also
+    stay unique across restarts and crashes.
+    status_counts cover the alerts held in memory; severity_counts cover
+    every alert the store has created.
+    """
+
+    def __init__(self,
+                 capacity: int = 10000,
+                 archive: Optional[AlertArchive] = None,
+                 archive_batch_size: int = 500,
+                 sequence_block: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.archive = archive
+        self.archive_batch_size = archive_batch_size
+        self.sequence_block = sequence_block
+
+        self._alerts: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._seq = 0
+        # Highest reserved id (None: no archive, nothing to reserve against)
+        self._reserved: Optional[int] = None
+        self._reserve_task: Optional[asyncio.Task] = None
+        self.status_counts: Counter = Counter()
+        self.severity_counts: Counter = Counter()
+
+        # Evicted alerts waiting for the archive, and the batch being written
+        self._evicted: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._archiving: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._archive_task: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.archived = 0
+        self.archive_failures = 0
+        self.sequence_failures = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._alerts
+
+    @property
+    def total_created(self) -> int:
+        return self._seq
+
+    async def attach_archive(self, archive: AlertArchive):
+        """
+        Archive evicted alerts from now on and continue numbering after every
+        id reserved before (or found in the archive)
+        """
+        at_least = max(self._seq, await archive.max_sequence())
+        self._reserved = await archive.reserve_sequence(at_least, self.sequence_block)
+        self._seq = max(self._seq, self._reserved - self.sequence_block)
+        self.archive = archive
+
+    def next_id(self) -> str:
+        """Take the next alert id"""
+        self._seq += 1
+        if self._reserved is not None and self._reserved - self._seq < self.sequence_block // 2 \
+                and self._reserve_task is None:
+            self._reserve_task = asyncio.get_running_loop().create_task(self._reserve_more())
+        return f"{ALERT_ID_PREFIX}{self._seq}"
+
+    async def _reserve_more(self):
+        # Ids past the reservation (if this falls behind) are covered by the next one
+        try:
+            self._reserved = await self.archive.reserve_sequence(max(self._seq, self._reserved), self.sequence_block)
+        except Exception as e:
+            self.sequence_failures += 1
+            print(f"[Alert Agent] Failed to reserve alert ids: {e}")
+        finally:
+            self._reserve_task = None
+
+    def add(self, alert: Dict[str, Any]):
+        """Index an alert whose id came from next_id()"""
+        alert_id = alert["id"]
+        if alert_id in self._alerts:
+            raise ValueError(f"duplicate alert id: {alert_id}")
+        seq = int(alert_id[len(ALERT_ID_PREFIX):])
+        self._alerts[alert_id] = (seq, alert)
+        self.status_counts[alert["status"]] += 1
+        self.severity_counts[alert["severity"]] += 1
+
+        while len(self._alerts) > self.capacity:
+            _, entry = self._alerts.popitem(last=False)
+            self.status_counts[entry[1]["status"]] -= 1
+            self.evicted += 1
+            self._evict(entry)
+
+    def get(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """In-memory lookup by id"""
+        entry = self._alerts.get(alert_id)
+        return entry[1] if entry else None
+
+    async def lookup(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Lookup by id, falling back to the archive for evicted alerts"""
+        alert = self.get(alert_id)
+        if alert is not None or self.archive is None:
+            return alert
+        entry = self._evicted.get(alert_id) or self._archiving.get(alert_id)
+        if entry is not None:
+            return entry[1]
+        return await self.archive.get(alert_id)
+
+    def set_status(self, alert_id: str, status: str) -> bool:
+        """Move an in-memory alert to a new status; False if it is not held"""
+        alert = self.get(alert_id)
+        if alert is None:
+            return False
+        previous = alert["status"]
+        if previous == status:
+            return True
+        self.status_counts[previous] -= 1
+        self.status_counts[status] += 1
+        alert["status"] = status
+        alert[f"{status}_at"] = datetime.utcnow().isoformat()
+        return True
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest alerts first"""
+        alerts = []
+        for alert_id in reversed(self._alerts):
+            if len(alerts) >= limit:
+                break
+            alerts.append(self._alerts[alert_id][1])
+        return alerts
+
+    def _evict(self, entry: Tuple[int, Dict[str, Any]]):
+        if self.archive is None:
+            self.dropped += 1
+            return
+        self._evicted[entry[1]["id"]] = entry
+        # Don't let a failing archive turn the buffer into an unbounded history
+        while len(self._evicted) > self.capacity:
+            self._evicted.popitem(last=False)
+            self.dropped += 1
+        if len(self._evicted) >= self.archive_batch_size and self._archive_task is None:
+            self._archive_task = asyncio.get_running_loop().create_task(self._archive_loop())
+
+    async def _archive_loop(self):
+        try:
+            while len(self._evicted) >= self.archive_batch_size:
+                if not await self.flush_archive():
+                    break
+        finally:
+            self._archive_task = None
+
+    async def flush_archive(self) -> bool:
+        """Write all evicted-but-unarchived alerts; False if the write failed"""
+        if not self._evicted or self.archive is None:
+            return True
+        self._archiving, self._evicted = self._evicted, OrderedDict()
+        batch = list(self._archiving.values())
+        try:
+            await self.archive.save(batch)
+        except Exception as e:
+            self.archive_failures += 1
+            # Back in front of anything evicted meanwhile
+            merged, self._archiving = self._archiving, {}
+            merged.update(self._evicted)
+            self._evicted = merged
+            print(f"[Alert Agent] Failed to archive {len(batch)} alerts: {e}")
+            return False
+        finally:
+            self._archiving = {}
+        self.archived += len(batch)
+        return True
+
+    async def drain_archive(self):
+        """Wait for a background archive write, then archive whatever is left"""
+        if self._archive_task is not None:
+            await asyncio.gather(self._archive_task, return_exceptions=True)
+        await self.flush_archive()
+
+    async def close(self) -> bool:
+        """
+        On shutdown: archive evicted and still-held alerts, and persist the
+        id high-water mark; False if anything could not be written
+        """
+        if self.archive is None:
+            return True
+        if self._reserve_task is not None:
+            await asyncio.gather(self._reserve_task, return_exceptions=True)
+        await self.drain_archive()
+        saved = True
+        try:
+            if self._alerts:
+                await self.archive.save(list(self._alerts.values()))
+                self.archived += len(self._alerts)
+            if self._seq > self._reserved:
+                self._reserved = await self.archive.reserve_sequence(self._seq, 0)
+        except Exception as e:
+            self.archive_failures += 1
+            saved = False
+            print(f"[Alert Agent] Failed to archive alerts on shutdown: {e}")
+        return saved and not self._evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters; constant time regardless of history size"""
+        return {
+            "retained": len(self._alerts),
+            "capacity": self.capacity,
+            "total_created": self._seq,
+            "by_status": {status: n for status, n in self.status_counts.items() if n},
+            "by_severity": dict(self.severity_counts),
+            "evicted": self.evicted,
+            "archived": self.archived,
+            "pending_archive": len(self._evicted),
+            "archive_failures": self.archive_failures,
+            "reserved_seq": self._reserved,
+            "sequence_failures": self.sequence_failures,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,246 @@
+"""
+Content-addressed response cache for Gemini analysis
+Contexts are normalized and hashed, responses are kept with a TTL in an LRU,
+identical concurrent requests share one in-flight model call, and entries
+can optionally be persisted to a JSON file across restarts
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Context keys that change on every call without changing the question asked
+VOLATILE_KEYS = frozenset({"sensors_tracked", "timestamp"})
+
+
+def _normalize(value: Any, precision: int) -> Any:
+    if isinstance(value, dict):
+        return {
+            str(k): _normalize(v, precision)
+            for k, v in value.items()
+            if k not in VOLATILE_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v, precision) for v in value]
+    if isinstance(value, float):
+        return round(value, precision)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def context_key(context: Dict[str, Any], precision: int = 3) -> str:
+    """
+    Stable hash of an analysis context
+    Key order, float noise below `precision` decimals, whitespace and
+    volatile counters do not change the key
+    """
+    canonical = json.dumps(_normalize(context, precision), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GeminiResponseCache:
+    """
+    TTL + LRU cache with single-flight loading
+
+    Only successful results are stored; a failed call is raised to every
+    caller waiting on it and the next request tries again. A load runs in
+    its own task, so cancelling the caller that started it doesn't cancel
+    the others waiting on it. Callers get their own copy of the value.
+    """
+
+    def __init__(self,
+                 ttl: float = 300.0,
+                 max_entries: int = 1024,
+                 persist_path: Optional[str] = None,
+                 persist_every: int = 20):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.persist_every = persist_every
+
+        # key -> (expires_at wall-clock seconds, value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._dirty = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if persist_path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh cached value or None (does not count as a hit or miss)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._dirty += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, join an identical in-flight call, or compute it"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return copy.deepcopy(value)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._inflight[key] = asyncio.create_task(self._load(key, compute))
+            # Nobody may be left waiting; mark a failure as retrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+        except BaseException:
+            self.errors += 1
+            raise
+        else:
+            self.put(key, value)
+        finally:
+            del self._inflight[key]
+
+        if self.persist_path and self._dirty >= self.persist_every:
+            await self.save()
+        return value
+
+    def load(self):
+        """Read unexpired entries from persist_path (missing or bad files are ignored)"""
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (expires_at, value) in stored.items():
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _write(self, snapshot: Dict[str, Any]):
+        directory = os.path.dirname(os.path.abspath(self.persist_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, default=str)
+        os.replace(tmp_path, self.persist_path)
+
+    async def save(self):
+        """Write unexpired entries to persist_path without blocking the loop"""
+        if not self.persist_path:
+            return
+        now = time.time()
+        snapshot = {key: [expires_at, value] for key, (expires_at, value) in self._entries.items() if expires_at > now}
+        self._dirty = 0
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+        except OSError as e:
+            print(f"[Prediction Agent] Failed to persist Gemini cache: {e}")
+
+    def clear(self):
+        self._entries.clear()
+        self._dirty += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalesce counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._inflight),
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "persistent": bool(self.persist_path),
+        }
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel
+    Answers batched prompts (see model_scheduler.build_batch_prompt) with one
+    canned result per item, single prompts with the canned result, and
+    records calls. Latency is delay + per_item_delay * items.
+    """
+
+    class Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    def __init__(self,
+                 response: Optional[Dict[str, Any]] = None,
+                 delay: float = 0.0,
+                 per_item_delay: float = 0.0,
+                 fail: bool = False):
+        self.response = response or {
+            "disruption_type": "Port Congestion",
+            "confidence": 0.87,
+            "affected_routes": 12,
+            "recommended_actions": ["Reroute shipments", "Increase buffer", "Alert stakeholders"],
+        }
+        self.delay = delay
+        self.per_item_delay = per_item_delay
+        self.fail = fail
+        self.calls = 0
+        self.items = 0
+        self.prompts = []
+
+    def generate_content(self, prompt: str) -> "FakeGenerativeModel.Response":
+        # Called through asyncio.to_thread like the real client
+        from agents.model_scheduler import ITEMS_MARKER
+
+        self.calls += 1
+        self.prompts.append(prompt)
+
+        item_ids = None
+        for line in prompt.splitlines():
+            if line.startswith(ITEMS_MARKER):
+                item_ids = [item["id"] for item in json.loads(line[len(ITEMS_MARKER):])]
+                break
+        count = len(item_ids) if item_ids is not None else 1
+        self.items += count
+
+        latency = self.delay + self.per_item_delay * count
+        if latency:
+            time.sleep(latency)
+        if self.fail:
+            raise RuntimeError("fake model failure")
+        if item_ids is None:
+            return self.Response(json.dumps(self.response))
+        return self.Response(json.dumps([{"id": i, **self.response} for i in item_ids]))
@@ -0,0 +1,250 @@
+"""
+Micro-batched, rate-limited Gemini calls
+Prediction contexts submitted within a short window are sent as one
+structured multi-item prompt; the JSON answer is split back into per-item
+results. Request and token budgets are enforced with token buckets and the
+number of concurrent model calls is capped.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Marks the line of the prompt that carries the items as JSON
+ITEMS_MARKER = "ITEMS:"
+
+# Rough output allowance per item when budgeting tokens
+OUTPUT_TOKENS_PER_ITEM = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Async token bucket; rate <= 0 disables limiting
+    Waiters are served in arrival order. A request larger than the capacity
+    waits for a full bucket and leaves it in debt, so later requests wait
+    until the excess has been paid back at `rate`
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens, waiting as needed; returns seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        needed = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return time.monotonic() - started
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+
+def build_batch_prompt(contexts: List[Dict[str, Any]]) -> str:
+    """One prompt asking for a JSON result per numbered context"""
+    items = [
+        {
+            "id": i,
+            "satellite_analysis": context.get("satellite_data", {}),
+            "iot_sensor_data": context.get("iot_data", {}),
+            "recent_news": context.get("news_data", "No recent news"),
+        }
+        for i, context in enumerate(contexts)
+    ]
+    return (
+        "Analyze each of the following supply chain situations and predict potential disruptions.\n"
+        "Respond with only a JSON array containing one object per item, with keys:\n"
+        '  "id" (the item id), "disruption_type" (string, or null if none),\n'
+        '  "confidence" (0-1), "affected_routes" (integer), "recommended_actions" (list of strings).\n'
+        f"{ITEMS_MARKER} {json.dumps(items, default=str)}\n"
+    )
+
+
+def _extract_json(text: str) -> Any:
+    text = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Fall back to the outermost array in surrounding prose
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def parse_prediction(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce one model result into the prediction shape used downstream"""
+    try:
+        confidence = float(item.get("confidence", 0.0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    try:
+        affected_routes = int(item.get("affected_routes", 0))
+    except (TypeError, ValueError):
+        affected_routes = 0
+    actions = item.get("recommended_actions") or []
+    if isinstance(actions, str):
+        actions = [actions]
+    return {
+        "disruption_type": item.get("disruption_type") or "None",
+        "confidence": min(max(confidence, 0.0), 1.0),
+        "affected_routes": max(affected_routes, 0),
+        "recommended_actions": [str(a) for a in actions],
+    }
+
+
+def parse_batch_response(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """Per-item predictions in submission order; None where the model skipped an item"""
+    data = _extract_json(text)
+    if isinstance(data, dict):
+        data = data.get("results", data.get("items", [data]))
+    if not isinstance(data, list):
+        raise ValueError("model response is not a JSON array")
+
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("id", position)
+        if isinstance(index, int) and 0 <= index < count and results[index] is None:
+            results[index] = parse_prediction(item)
+    return results
+
+
+class ModelCallScheduler:
+    """
+    Coalesces submit() calls into batched model requests
+
+    A batch is dispatched when max_batch contexts are waiting or `window`
+    seconds after the first one arrived, whichever is first.
+    """
+
+    def __init__(self,
+                 model,
+                 window: float = 0.05,
+                 max_batch: int = 8,
+                 requests_per_minute: float = 60,
+                 tokens_per_minute: float = 120000,
+                 max_concurrency: int = 4):
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.items_submitted = 0
+        self.requests_sent = 0
+        self.items_dispatched = 0
+        self.items_completed = 0
+        self.failed_requests = 0
+        self.missing_items = 0
+        self.tokens_reserved = 0
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+        self.throttled_total = 0.0
+        self.call_time_total = 0.0
+
+    async def submit(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a context for the next batch and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((context, future, time.monotonic()))
+        self.items_submitted += 1
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        prompt = build_batch_prompt([context for context, _, _ in batch])
+        tokens = estimate_tokens(prompt) + OUTPUT_TOKENS_PER_ITEM * len(batch)
+
+        throttled = await self.request_bucket.acquire(1)
+        throttled += await self.token_bucket.acquire(tokens)
+        self.throttled_total += throttled
+        self.tokens_reserved += tokens
+
+        try:
+            async with self._semaphore:
+                dispatched = time.monotonic()
+                self.items_dispatched += len(batch)
+                for _, _, submitted in batch:
+                    delay = dispatched - submitted
+                    self.queue_delay_total += delay
+                    self.queue_delay_max = max(self.queue_delay_max, delay)
+                self.requests_sent += 1
+                response = await asyncio.to_thread(self.model.generate_content, prompt)
+                self.call_time_total += time.monotonic() - dispatched
+            results = parse_batch_response(response.text, len(batch))
+        except Exception as e:
+            self.failed_requests += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if result is None:
+                self.missing_items += 1
+                future.set_exception(ValueError("model response omitted this item"))
+            else:
+                self.items_completed += 1
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching, throttling and latency counters"""
+        dispatched = self.items_dispatched
+        return {
+            "items_submitted": self.items_submitted,
+            "items_completed": self.items_completed,
+            "queued": len(self._pending),
+            "requests_sent": self.requests_sent,
+            "failed_requests": self.failed_requests,
+            "missing_items": self.missing_items,
+            "avg_batch_size": round(dispatched / self.requests_sent, 2) if self.requests_sent else 0.0,
+            "tokens_reserved": self.tokens_reserved,
+            "avg_queue_delay_ms": round(self.queue_delay_total / dispatched * 1000, 3) if dispatched else 0.0,
+            "max_queue_delay_ms": round(self.queue_delay_max * 1000, 3),
+            "throttled_seconds": round(self.throttled_total, 3),
+            "avg_call_ms": round(self.call_time_total / self.requests_sent * 1000, 3) if self.requests_sent else 0.0,
+        }
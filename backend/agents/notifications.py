@@ -0,0 +1,144 @@
+"""
+Notification dispatcher for the Alert Agent
+Fans notifications out in the background with per-channel concurrency
+limits, folds alerts for the same stakeholder/channel into one digest per
+short window, and retries failed sends without holding up alert creation
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# sender(channel, stakeholder, alerts) delivers one (digest) message
+Sender = Callable[[str, str, List[Dict[str, Any]]], Awaitable[Any]]
+
+DEFAULT_CHANNEL_LIMITS = {"email": 10, "sms": 5, "slack": 10}
+
+
+class NotificationDispatcher:
+    """
+    Batched, concurrent notification delivery
+
+    enqueue() only buffers the alert and returns. The first alert for a
+    (stakeholder, channel) pair starts a digest window; when it closes (or
+    the digest reaches max_digest_size) everything buffered for that pair is
+    sent as one message. Sends run as background tasks bounded by a
+    semaphore per channel and retry with exponential backoff.
+    """
+
+    def __init__(self,
+                 sender: Sender,
+                 channel_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = 5,
+                 digest_window: float = 2.0,
+                 max_digest_size: int = 50,
+                 max_retries: int = 3,
+                 retry_base_delay: float = 0.5):
+        self.sender = sender
+        self.channel_limits = {**DEFAULT_CHANNEL_LIMITS, **(channel_limits or {})}
+        self.default_limit = default_limit
+        self.digest_window = digest_window
+        self.max_digest_size = max_digest_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._inflight: Set[asyncio.Task] = set()
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=1000)
+
+        self.alerts_enqueued = 0
+        self.messages_sent = 0
+        self.alerts_delivered = 0
+        self.retries = 0
+        self.failures = 0
+        self.send_time_total = 0.0
+
+    def _semaphore(self, channel: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(channel)
+        if semaphore is None:
+            limit = self.channel_limits.get(channel, self.default_limit)
+            semaphore = self._semaphores[channel] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def enqueue(self, alert: Dict[str, Any], stakeholders: List[str], channels: List[str]) -> int:
+        """
+        Buffer an alert for every stakeholder/channel pair; returns the number of pairs
+        """
+        loop = asyncio.get_running_loop()
+        queued = 0
+        for stakeholder in stakeholders:
+            for channel in channels:
+                key = (stakeholder, channel)
+                batch = self._pending.setdefault(key, [])
+                batch.append(alert)
+                queued += 1
+                if len(batch) >= self.max_digest_size:
+                    self._flush(key)
+                elif key not in self._timers:
+                    self._timers[key] = loop.call_later(self.digest_window, self._flush, key)
+        self.alerts_enqueued += 1
+        return queued
+
+    def _flush(self, key: Tuple[str, str]):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        alerts = self._pending.pop(key, None)
+        if not alerts:
+            return
+        task = asyncio.get_running_loop().create_task(self._deliver(key, alerts))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, key: Tuple[str, str], alerts: List[Dict[str, Any]]):
+        stakeholder, channel = key
+        semaphore = self._semaphore(channel)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    started = time.perf_counter()
+                    await self.sender(channel, stakeholder, alerts)
+                    self.send_time_total += time.perf_counter() - started
+                self.messages_sent += 1
+                self.alerts_delivered += len(alerts)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    self.dead_letters.append({
+                        "stakeholder": stakeholder,
+                        "channel": channel,
+                        "alert_ids": [a.get("id") for a in alerts],
+                        "error": str(e),
+                    })
+                    print(f"[Alert Agent] Giving up on {channel} digest for {stakeholder}: {e}")
+                    return
+                self.retries += 1
+                # Back off outside the semaphore so other sends keep flowing
+                await asyncio.sleep(self.retry_base_delay * (2 ** attempt))
+
+    async def drain(self):
+        """Send everything buffered now and wait for in-flight deliveries"""
+        for key in list(self._pending):
+            self._flush(key)
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Delivery counters"""
+        return {
+            "alerts_enqueued": self.alerts_enqueued,
+            "pending_digests": len(self._pending),
+            "pending_alerts": sum(len(batch) for batch in self._pending.values()),
+            "inflight_sends": len(self._inflight),
+            "messages_sent": self.messages_sent,
+            "alerts_delivered": self.alerts_delivered,
+            "avg_alerts_per_message": round(self.alerts_delivered / self.messages_sent, 2) if self.messages_sent else 0.0,
+            "avg_send_ms": round(self.send_time_total / self.messages_sent * 1000, 3) if self.messages_sent else 0.0,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
@@ -3,9 +3,17 @@ Optimization Agent - Uses Google ADK
 Receives disruption predictions and calculates optimal routes and inventory
 """
 
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
 
+from agents.route_graph import RouteGraph
+from profiling import profiled
+from spatial_index import LaneIndex
+
+# Cost model for converting extra transit hours into dollars
+COST_PER_HOUR = 1875
+
 class OptimizationAgent:
     """
     AI Agent for optimizing supply chain routes and inventory
@@ -15,24 +23,122 @@ class OptimizationAgent:
     def __init__(self):
         self.name = "optimization_agent"
         self.status = "active"
+        self.tasks_completed = 0
+        # Set when an AgentPipeline forwards results to the next agent
+        self.pipeline_managed = False
+
+        # Port/lane graph, loaded from the routes table at startup
+        self.route_graph: Optional[RouteGraph] = None
+        self.alternatives_per_route = int(os.getenv("ALTERNATIVE_ROUTES_K", "3"))
+
+        # Lane geometry for proximity queries, loaded alongside the graph
+        self.route_index: Optional[LaneIndex] = None
+        self.impact_radius_km = float(os.getenv("DISRUPTION_IMPACT_RADIUS_KM", "300"))
+        self.spatial_cell_degrees = float(os.getenv("SPATIAL_CELL_DEGREES", "5"))
+
+    async def load_route_graph(self, session_maker):
+        """
+        Build the lane graph and spatial index from the routes table
+        """
+        from sqlalchemy import select
+        from models import Route
+
+        async with session_maker() as session:
+            result = await session.execute(select(Route))
+            rows = [
+                {
+                    "id": route.id,
+                    "origin_port": route.origin_port,
+                    "destination_port": route.destination_port,
+                    "current_status": route.current_status,
+                    "estimated_delay_hours": route.estimated_delay_hours,
+                    "risk_score": route.risk_score,
+                }
+                for route in result.scalars()
+            ]
+
+        self.route_graph = RouteGraph.from_rows(rows)
+        print(f"[Optimization Agent] Loaded route graph: {self.route_graph.get_stats()}")
+        self.route_index = LaneIndex.from_rows(rows, cell_degrees=self.spatial_cell_degrees)
+        print(f"[Optimization Agent] Loaded route index: {self.route_index.get_stats()}")
+
+    def affected_lanes(self, disruption: Dict[str, Any]) -> List[str]:
+        """
+        Ids of lanes a disruption touches: lanes passing within the impact
+        radius of its location, plus lanes at its port (which covers ports
+        the spatial index has no coordinates for)
+        """
+        affected = []
+        location = disruption.get("location")
+        if self.route_index is not None and location:
+            affected = [lane_id for lane_id, _ in
+                        self.route_index.lanes_near(location[0], location[1], self.impact_radius_km)]
+        if self.route_graph is not None and disruption.get("locationName"):
+            seen = set(affected)
+            affected.extend(l for l in self.route_graph.lanes_at_port(disruption["locationName"]) if l not in seen)
+        return affected
+
+    def block_disruption(self, disruption: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        """
+        Mark a disrupted port as unusable for transit
+        Returns whether the port was blocked (each block needs a
+        release_disruption) and the ids of lanes touching it, which may be
+        empty once every lane at the port has been removed
+        """
+        if not self.route_graph:
+            return False, []
+        name = disruption.get("locationName", "")
+        if not self.route_graph.block_port(name):
+            return False, []
+        return True, self.route_graph.lanes_at_port(name)
+
+    def release_disruption(self, disruption: Dict[str, Any]):
+        """Release a previously blocked disruption"""
+        if self.route_graph:
+            self.route_graph.unblock_port(disruption.get("locationName", ""))
+
+    def _describe_alternative(self, lane_id: str, path) -> Dict[str, Any]:
+        graph = self.route_graph
+        original = graph.lanes[lane_id]
+        path_lanes = [graph.lanes[l] for l in path.lanes]
+
+        original_hours = graph.hop_hours + original.delay_hours
+        alternative_hours = graph.hop_hours * len(path_lanes) + sum(l.delay_hours for l in path_lanes)
+        extra_hours = alternative_hours - original_hours
+
+        return {
+            "original_route": lane_id,
+            "alternative_route": " > ".join(path.lanes),
+            "path": [graph.port_names[n] for n in path.nodes],
+            "additional_cost": round(max(extra_hours, 0) * COST_PER_HOUR),
+            "additional_time_hours": round(extra_hours, 1),
+            "risk_reduction": round(original.risk_score - max(l.risk_score for l in path_lanes), 2)
+        }
 
     async def calculate_alternative_routes(self, affected_routes: List[str]) -> List[Dict[str, Any]]:
         """
         Calculate alternative routes when disruptions are predicted
-        Uses graph algorithms to find optimal paths
+        Runs k-shortest-path searches over the lane graph, avoiding ports
+        with active disruptions
         """
-        # Simulate route calculation
-        await asyncio.sleep(0.5)  # Simulate processing time
+        if not self.route_graph:
+            # Graph not loaded (no database) - fall back to placeholder plans
+            return [
+                {
+                    "original_route": route_id,
+                    "alternative_route": f"{route_id}-alt",
+                    "additional_cost": 15000,
+                    "additional_time_hours": 8,
+                    "risk_reduction": 0.45
+                }
+                for route_id in affected_routes
+            ]
 
         alternatives = []
         for route_id in affected_routes:
-            alternatives.append({
-                "original_route": route_id,
-                "alternative_route": f"{route_id}-alt",
-                "additional_cost": 15000,
-                "additional_time_hours": 8,
-                "risk_reduction": 0.45
-            })
+            lane_id = str(route_id) if str(route_id).startswith("route-") else f"route-{route_id}"
+            for path in self.route_graph.lane_alternatives(lane_id, self.alternatives_per_route):
+                alternatives.append(self._describe_alternative(lane_id, path))
 
         return alternatives
 
@@ -69,6 +175,7 @@ class OptimizationAgent:
 
         return (cost_score * 0.8) + (time_score * 0.9) + (risk_score * 0.95)
 
+    @profiled("optimization.optimize")
     async def optimize(self, prediction: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main optimization workflow
@@ -98,6 +205,7 @@ class OptimizationAgent:
 
         # Send to Alert Agent
         await self.send_to_alert_agent(optimization_plan)
+        self.tasks_completed += 1
 
         return optimization_plan
 
@@ -105,6 +213,8 @@ class OptimizationAgent:
         """
         Send optimization results to Alert Agent
         """
+        if self.pipeline_managed:
+            return
         print(f"[Optimization Agent] Sending plan to Alert Agent: {optimization_plan}")
         # In production: await pubsub.publish("alert-topic", optimization_plan)
 
@@ -113,5 +223,7 @@ class OptimizationAgent:
         return {
             "name": self.name,
             "status": self.status,
-            "tasks_completed": 892
+            "tasks_completed": self.tasks_completed,
+            "route_graph": self.route_graph.get_stats() if self.route_graph else None,
+            "route_index": self.route_index.get_stats() if self.route_index else None
         }
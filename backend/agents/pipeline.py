@@ -0,0 +1,412 @@
+"""
+Agent pipeline runtime
+Moves work through prediction -> optimization -> alert over bounded queues
+with a configurable number of workers per stage. A full downstream queue
+blocks upstream workers, which in turn blocks submit(), so producers slow
+down instead of memory growing without bound.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import Histogram, MetricFamily
+
+# A stage handler returns the item for the next stage, or None to stop here
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+
+
+class InProcessTransport:
+    """Queues are plain bounded asyncio.Queue objects"""
+
+    name = "in-process"
+
+    def create_queue(self, name: str, maxsize: int) -> asyncio.Queue:
+        return asyncio.Queue(maxsize=maxsize)
+
+
+class BrokerQueue:
+    """
+    Queue that round-trips every message through JSON bytes, standing in for
+    an external broker topic (same interface as asyncio.Queue)
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.bytes_transferred = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._queue.maxsize
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    async def put(self, item: Any):
+        message = json.dumps(item, default=str).encode("utf-8")
+        self.bytes_transferred += len(message)
+        await self._queue.put(message)
+
+    def put_nowait(self, item: Any):
+        message = json.dumps(item, default=str).encode("utf-8")
+        self._queue.put_nowait(message)
+        self.bytes_transferred += len(message)
+
+    async def get(self) -> Any:
+        return json.loads(await self._queue.get())
+
+    def task_done(self):
+        self._queue.task_done()
+
+    async def join(self):
+        await self._queue.join()
+
+
+class LocalBrokerTransport:
+    """Local broker stand-in: serialized messages on per-stage topics"""
+
+    name = "local-broker"
+
+    def create_queue(self, name: str, maxsize: int) -> BrokerQueue:
+        return BrokerQueue(name, maxsize)
+
+
+class StageStats:
+    """Throughput and latency counters for one stage"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        # Items lost after the handler succeeded: forwarding or on_complete raised
+        self.forward_failed = 0
+        self.complete_failed = 0
+        self.busy_workers = 0
+        self.max_queue_depth = 0
+        self.service_time_total = 0.0
+        self.service_time_max = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.blocked_time_total = 0.0
+        self.service_times = Histogram()
+        self.queue_waits = Histogram()
+
+    def record(self, wait: float, service: float):
+        self.processed += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.service_time_total += service
+        self.service_time_max = max(self.service_time_max, service)
+        self.service_times.observe(service)
+        self.queue_waits.observe(wait)
+
+
+class Stage:
+    """One pipeline stage: an input queue drained by N workers"""
+
+    def __init__(self, name: str, handler: StageHandler, workers: int = 1, queue_size: int = 100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+        self.next_stage: Optional["Stage"] = None
+        self.stats = StageStats()
+        self._tasks: List[asyncio.Task] = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = self.stats
+        completed = s.processed + s.failed
+        uptime = max(time.monotonic() - s.started_at, 1e-9)
+        return {
+            "workers": self.workers,
+            "busy_workers": s.busy_workers,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "max_queue_depth": s.max_queue_depth,
+            "processed": s.processed,
+            "failed": s.failed,
+            "dropped": s.dropped,
+            "forward_failed": s.forward_failed,
+            "complete_failed": s.complete_failed,
+            "throughput_per_sec": round(s.processed / uptime, 3),
+            "avg_service_ms": round(s.service_time_total / s.processed * 1000, 3) if s.processed else 0.0,
+            "max_service_ms": round(s.service_time_max * 1000, 3),
+            "p95_service_ms": _ms(s.service_times.quantile(0.95)),
+            "p99_service_ms": _ms(s.service_times.quantile(0.99)),
+            "avg_queue_wait_ms": round(s.queue_wait_total / completed * 1000, 3) if completed else 0.0,
+            "max_queue_wait_ms": round(s.queue_wait_max * 1000, 3),
+            "blocked_on_downstream_ms": round(s.blocked_time_total * 1000, 3),
+        }
+
+
+class AgentPipeline:
+    """
+    Chain of stages connected by bounded queues from a pluggable transport
+
+    Items travel in envelopes carrying submit/enqueue timestamps so the
+    runtime can report queue wait per stage and end-to-end latency.
+    """
+
+    def __init__(self, stages: List[Stage], transport=None):
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self.stages = stages
+        self.transport = transport or InProcessTransport()
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.next_stage = next_stage
+
+        self.running = False
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.end_to_end_total = 0.0
+        self.end_to_end_max = 0.0
+        self.end_to_end_times = Histogram()
+        self.on_complete: Optional[Callable[[Any], Awaitable[None]]] = None
+
+    async def start(self):
+        """Create queues and spawn stage workers"""
+        if self.running:
+            return
+        for stage in self.stages:
+            stage.queue = self.transport.create_queue(stage.name, stage.queue_size)
+            stage.stats = StageStats()
+            stage._tasks = [
+                asyncio.create_task(self._worker(stage), name=f"{stage.name}-worker-{i}")
+                for i in range(stage.workers)
+            ]
+        self.running = True
+
+    async def stop(self, drain: bool = True, timeout: float = 10.0):
+        """Optionally wait for queued work, then cancel all workers"""
+        if not self.running:
+            return
+        if drain:
+            try:
+                for stage in self.stages:
+                    await asyncio.wait_for(stage.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print("[Pipeline] Timed out draining queues")
+        for stage in self.stages:
+            for task in stage._tasks:
+                task.cancel()
+            await asyncio.gather(*stage._tasks, return_exceptions=True)
+            stage._tasks = []
+        self.running = False
+
+    def _envelope(self, item: Any) -> Dict[str, Any]:
+        now = time.time()
+        return {"payload": item, "submitted_at": now, "enqueued_at": now}
+
+    async def submit(self, item: Any):
+        """Queue an item for the first stage, waiting while it is full"""
+        if not self.running:
+            raise RuntimeError("pipeline is not running")
+        first = self.stages[0]
+        await first.queue.put(self._envelope(item))
+        self.submitted += 1
+        first.stats.max_queue_depth = max(first.stats.max_queue_depth, first.queue.qsize())
+
+    def submit_nowait(self, item: Any) -> bool:
+        """Queue an item without waiting; returns False (load shed) when full"""
+        if not self.running:
+            raise RuntimeError("pipeline is not running")
+        first = self.stages[0]
+        try:
+            first.queue.put_nowait(self._envelope(item))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        first.stats.max_queue_depth = max(first.stats.max_queue_depth, first.queue.qsize())
+        return True
+
+    async def _worker(self, stage: Stage):
+        """
+        Run items through a stage until the worker is cancelled; a failing
+        handler, downstream put or on_complete only costs that item
+        """
+        while True:
+            envelope = await stage.queue.get()
+            try:
+                await self._process(stage, envelope)
+            except asyncio.CancelledError:
+                # stop() cancelling this worker, or something the item awaited being cancelled
+                if asyncio.current_task().cancelling():
+                    raise
+                stage.stats.failed += 1
+                print(f"[Pipeline] {stage.name} item was cancelled")
+            finally:
+                stage.queue.task_done()
+
+    async def _process(self, stage: Stage, envelope: Dict[str, Any]):
+        stats = stage.stats
+        started = time.time()
+        wait = started - envelope["enqueued_at"]
+        stats.busy_workers += 1
+        try:
+            result = await stage.handler(envelope["payload"])
+        except Exception as e:
+            stats.failed += 1
+            stats.queue_wait_total += wait
+            stats.queue_waits.observe(wait)
+            print(f"[Pipeline] {stage.name} failed: {e}")
+            return
+        finally:
+            stats.busy_workers -= 1
+
+        stats.record(wait, time.time() - started)
+
+        if result is None:
+            stats.dropped += 1
+        elif stage.next_stage is not None:
+            # Blocks while the downstream queue is full (backpressure)
+            blocked_from = time.time()
+            envelope = {
+                "payload": result,
+                "submitted_at": envelope["submitted_at"],
+                "enqueued_at": blocked_from,
+            }
+            try:
+                await stage.next_stage.queue.put(envelope)
+            except Exception as e:
+                stats.forward_failed += 1
+                print(f"[Pipeline] {stage.name} could not forward to {stage.next_stage.name}: {e}")
+                return
+            finally:
+                stats.blocked_time_total += time.time() - blocked_from
+            next_stats = stage.next_stage.stats
+            next_stats.max_queue_depth = max(next_stats.max_queue_depth, stage.next_stage.queue.qsize())
+        else:
+            latency = time.time() - envelope["submitted_at"]
+            self.completed += 1
+            self.end_to_end_total += latency
+            self.end_to_end_max = max(self.end_to_end_max, latency)
+            self.end_to_end_times.observe(latency)
+            if self.on_complete is not None:
+                try:
+                    await self.on_complete(result)
+                except Exception as e:
+                    stats.complete_failed += 1
+                    print(f"[Pipeline] on_complete failed: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Per-stage and end-to-end counters"""
+        return {
+            "running": self.running,
+            "transport": self.transport.name,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "avg_end_to_end_ms": round(self.end_to_end_total / self.completed * 1000, 3) if self.completed else 0.0,
+            "max_end_to_end_ms": round(self.end_to_end_max * 1000, 3),
+            "p95_end_to_end_ms": _ms(self.end_to_end_times.quantile(0.95)),
+            "p99_end_to_end_ms": _ms(self.end_to_end_times.quantile(0.99)),
+            "stages": {stage.name: stage.get_stats() for stage in self.stages},
+        }
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Metrics registry collector: stage timings, counts and queue depths"""
+        def per_stage(value):
+            return [({"stage": stage.name}, value(stage)) for stage in self.stages]
+
+        return [
+            MetricFamily("pipeline_stage_service_seconds", "histogram", "Agent stage handler time",
+                         per_stage(lambda stage: stage.stats.service_times)),
+            MetricFamily("pipeline_stage_queue_wait_seconds", "histogram", "Time items wait in a stage queue",
+                         per_stage(lambda stage: stage.stats.queue_waits)),
+            MetricFamily("pipeline_stage_processed", "counter", "Items a stage handled successfully",
+                         per_stage(lambda stage: stage.stats.processed)),
+            MetricFamily("pipeline_stage_failed", "counter", "Items a stage handler raised on",
+                         per_stage(lambda stage: stage.stats.failed)),
+            MetricFamily("pipeline_stage_forward_failed", "counter", "Items lost forwarding to the next stage",
+                         per_stage(lambda stage: stage.stats.forward_failed)),
+            MetricFamily("pipeline_stage_complete_failed", "counter", "Items whose on_complete callback raised",
+                         per_stage(lambda stage: stage.stats.complete_failed)),
+            MetricFamily("pipeline_stage_queue_depth", "gauge", "Items waiting in a stage queue",
+                         per_stage(lambda stage: stage.queue.qsize() if stage.queue is not None else 0)),
+            MetricFamily("pipeline_stage_busy_workers", "gauge", "Stage workers currently running a handler",
+                         per_stage(lambda stage: stage.stats.busy_workers)),
+            MetricFamily("pipeline_submitted", "counter", "Items submitted to the pipeline", [({}, self.submitted)]),
+            MetricFamily("pipeline_rejected", "counter", "Items shed because the first queue was full",
+                         [({}, self.rejected)]),
+            MetricFamily("pipeline_end_to_end_seconds", "histogram", "Submit to last stage completion",
+                         [({}, self.end_to_end_times)]),
+        ]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def build_agent_pipeline(prediction_agent,
+                         optimization_agent,
+                         alert_agent,
+                         workers: Optional[Dict[str, int]] = None,
+                         queue_size: int = 100,
+                         transport=None) -> AgentPipeline:
+    """
+    Wire the three agents into a prediction -> optimization -> alert pipeline
+
+    Accepts two kinds of input:
+      {"kind": "disruption", "disruption": {...}}   detected disruption events
+      {"kind": "sensor_batch", "readings": [...]}   ingested IoT readings; only
+                                                     batches with anomalies continue
+    """
+    workers = workers or {}
+
+    # The runtime now does the hand-offs the agents used to print
+    for agent in (prediction_agent, optimization_agent):
+        agent.pipeline_managed = True
+
+    async def predict(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if item.get("kind") == "sensor_batch":
+            iot_analysis = await prediction_agent.analyze_iot_data(item["readings"])
+            if not iot_analysis["anomaly_detected"]:
+                return None
+            prediction = await prediction_agent.predict_disruption(iot_analysis=iot_analysis)
+            disruption = {
+                "type": prediction.get("disruption_type", "Sensor Anomaly"),
+                "confidence": prediction.get("confidence", 0.0),
+                "anomalous_sensors": iot_analysis["anomalous_sensors"],
+            }
+        else:
+            disruption = item["disruption"]
+            prediction = await prediction_agent.predict_disruption()
+        return {"disruption": disruption, "prediction": prediction}
+
+    async def optimize(item: Dict[str, Any]) -> Dict[str, Any]:
+        disruption = item["disruption"]
+        affected = optimization_agent.affected_lanes(disruption)
+        prediction = dict(item["prediction"])
+        if affected:
+            prediction["affected_routes"] = affected
+        plan = await optimization_agent.optimize(prediction)
+        item["plan"] = plan
+        item["affected_lanes"] = affected
+        return item
+
+    async def alert(item: Dict[str, Any]) -> Dict[str, Any]:
+        disruption = item["disruption"]
+        context = {
+            **disruption,
+            "confidence": disruption.get("confidence", item["prediction"].get("confidence", 0)),
+            "affected_routes": len(item["affected_lanes"]) or disruption.get("affectedRoutes", 0),
+        }
+        return await alert_agent.process_alert(context, item["plan"])
+
+    return AgentPipeline(
+        [
+            Stage("prediction", predict, workers.get("prediction", 2), queue_size),
+            Stage("optimization", optimize, workers.get("optimization", 2), queue_size),
+            Stage("alert", alert, workers.get("alert", 2), queue_size),
+        ],
+        transport=transport
+    )
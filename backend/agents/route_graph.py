@@ -0,0 +1,470 @@
+"""
+Port/lane graph for alternative route search
+Ports are nodes and routes-table rows are lanes (edges) weighted by
+transit hops, estimated delay and risk score. Alternatives come from
+Yen's k-shortest loopless paths over A* (guided by exact distances
+from a reverse Dijkstra tree), cached per (origin, destination) and
+invalidated incrementally as disruptions and lanes change.
+"""
+
+import heapq
+import re
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Matches one ('origin', 'destination', 'status', delay, risk) tuple in seed SQL
+_SEED_ROW = re.compile(r"\('([^']+)',\s*'([^']+)',\s*'([^']+)',\s*(\d+),\s*([\d.]+)\)")
+
+
+def port_key(name: str) -> str:
+    """Normalize a port name so 'Shanghai' and 'Shanghai, China' match"""
+    return name.split(",")[0].strip().lower()
+
+
+class Lane:
+    """One directed-or-bidirectional lane between two ports"""
+
+    __slots__ = ("id", "u", "v", "status", "delay_hours", "risk_score", "weight")
+
+    def __init__(self, lane_id: str, u: int, v: int, status: str, delay_hours: float, risk_score: float):
+        self.id = lane_id
+        self.u = u
+        self.v = v
+        self.status = status
+        self.delay_hours = delay_hours
+        self.risk_score = risk_score
+        self.weight = 0.0
+
+
+class PathResult:
+    """A path through the graph with its accumulated cost"""
+
+    __slots__ = ("cost", "nodes", "lanes")
+
+    def __init__(self, cost: float, nodes: List[int], lanes: List[str]):
+        self.cost = cost
+        self.nodes = nodes
+        self.lanes = lanes
+
+
+class _CacheEntry:
+    __slots__ = ("paths", "transit_nodes", "lanes", "blocked")
+
+    def __init__(self, paths: List[PathResult], blocked: FrozenSet[int]):
+        self.paths = paths
+        self.transit_nodes = {n for p in paths for n in p.nodes[1:-1]}
+        self.lanes = {lane for p in paths for lane in p.lanes}
+        self.blocked = blocked
+
+
+class RouteGraph:
+    """
+    Lane graph with precomputed adjacency and a k-shortest-path cache
+
+    Disrupted ports are blocked as transit points (a path may still start or
+    end there). Cache entries remember which lanes and transit ports their
+    paths use and which ports were blocked when they were computed, so a
+    change only evicts the entries it can actually affect:
+      - blocking a port or making a lane worse evicts entries routed through it
+      - unblocking a port evicts entries computed while it was blocked
+      - adding a lane or making one cheaper clears the cache
+    """
+
+    def __init__(self,
+                 hop_hours: float = 24.0,
+                 risk_penalty_hours: float = 48.0,
+                 bidirectional: bool = True,
+                 cache_size: int = 50000,
+                 tree_cache_size: int = 256):
+        self.hop_hours = hop_hours
+        self.risk_penalty_hours = risk_penalty_hours
+        self.bidirectional = bidirectional
+
+        self.port_names: List[str] = []
+        self._port_index: Dict[str, int] = {}
+        self.lanes: Dict[str, Lane] = {}
+        self._adjacency: List[List[Tuple[int, str]]] = []
+        self._reverse: List[List[Tuple[int, str]]] = []
+
+        self._blocked: Dict[int, int] = {}  # port -> number of active disruptions
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        self._by_transit: Dict[int, Set[Tuple]] = {}
+        self._by_lane: Dict[str, Set[Tuple]] = {}
+        self._by_blocked: Dict[int, Set[Tuple]] = {}
+
+        # Unconstrained distance-to-target trees used as A* heuristics. They stay
+        # admissible while lanes only get removed, blocked or more expensive.
+        self.tree_cache_size = tree_cache_size
+        self._trees: "OrderedDict[int, Dict[int, float]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], **kwargs) -> "RouteGraph":
+        """
+        Build from route dicts with id, origin_port, destination_port,
+        current_status, estimated_delay_hours and risk_score
+        """
+        graph = cls(**kwargs)
+        for row in rows:
+            graph.add_lane(row, invalidate=False)
+        return graph
+
+    @classmethod
+    def from_seed_sql(cls, path: str, **kwargs) -> "RouteGraph":
+        """Build from the routes INSERT in database/seed_data.sql (ids follow insert order)"""
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        start = sql.index("INSERT INTO routes")
+        end = sql.index(";", start)
+        rows = []
+        for i, match in enumerate(_SEED_ROW.finditer(sql[start:end]), start=1):
+            origin, destination, status, delay, risk = match.groups()
+            rows.append({
+                "id": i,
+                "origin_port": origin,
+                "destination_port": destination,
+                "current_status": status,
+                "estimated_delay_hours": int(delay),
+                "risk_score": float(risk),
+            })
+        return cls.from_rows(rows, **kwargs)
+
+    def _port(self, name: str) -> int:
+        key = port_key(name)
+        index = self._port_index.get(key)
+        if index is None:
+            index = self._port_index[key] = len(self.port_names)
+            self.port_names.append(name)
+            self._adjacency.append([])
+            self._reverse.append([])
+        return index
+
+    def port_id(self, name: str) -> Optional[int]:
+        """Node id for a port name, None if the port is unknown"""
+        return self._port_index.get(port_key(name))
+
+    def _lane_weight(self, lane: Lane) -> float:
+        return self.hop_hours + lane.delay_hours + self.risk_penalty_hours * lane.risk_score
+
+    def add_lane(self, row: Dict[str, Any], invalidate: bool = True) -> Lane:
+        """Add (or replace) a lane from a routes row"""
+        lane_id = f"route-{row['id']}" if not str(row["id"]).startswith("route-") else str(row["id"])
+        if lane_id in self.lanes:
+            self.remove_lane(lane_id)
+
+        lane = Lane(
+            lane_id,
+            self._port(row["origin_port"]),
+            self._port(row["destination_port"]),
+            row.get("current_status") or "normal",
+            float(row.get("estimated_delay_hours") or 0),
+            float(row.get("risk_score") or 0.0),
+        )
+        lane.weight = self._lane_weight(lane)
+        self.lanes[lane_id] = lane
+        self._adjacency[lane.u].append((lane.v, lane_id))
+        self._reverse[lane.v].append((lane.u, lane_id))
+        if self.bidirectional:
+            self._adjacency[lane.v].append((lane.u, lane_id))
+            self._reverse[lane.u].append((lane.v, lane_id))
+
+        if invalidate:
+            # A new edge can shorten any path
+            self.clear_cache()
+        return lane
+
+    def remove_lane(self, lane_id: str):
+        """Remove a lane and evict cached paths that used it"""
+        lane = self.lanes.pop(lane_id, None)
+        if lane is None:
+            return
+        for node in (lane.u, lane.v):
+            self._adjacency[node] = [(v, l) for v, l in self._adjacency[node] if l != lane_id]
+            self._reverse[node] = [(v, l) for v, l in self._reverse[node] if l != lane_id]
+        self._evict_keys(self._by_lane.get(lane_id, ()))
+
+    def update_lane(self, lane_id: str, delay_hours: Optional[float] = None,
+                    risk_score: Optional[float] = None, status: Optional[str] = None):
+        """Change a lane's delay/risk/status and invalidate what it can affect"""
+        lane = self.lanes.get(lane_id)
+        if lane is None:
+            return
+        if delay_hours is not None:
+            lane.delay_hours = float(delay_hours)
+        if risk_score is not None:
+            lane.risk_score = float(risk_score)
+        if status is not None:
+            lane.status = status
+
+        old_weight = lane.weight
+        lane.weight = self._lane_weight(lane)
+        if lane.weight < old_weight:
+            self.clear_cache()
+        elif lane.weight > old_weight:
+            self._evict_keys(self._by_lane.get(lane_id, ()))
+
+    def lanes_at_port(self, port_name: str) -> List[str]:
+        """Ids of lanes that start or end at a port"""
+        node = self.port_id(port_name)
+        if node is None:
+            return []
+        return sorted({lane_id for _, lane_id in self._adjacency[node] + self._reverse[node]})
+
+    # ------------------------------------------------------------------
+    # Disruptions
+    # ------------------------------------------------------------------
+
+    def block_port(self, port_name: str) -> bool:
+        """Mark a port as disrupted; returns False for unknown ports"""
+        node = self.port_id(port_name)
+        if node is None:
+            return False
+        count = self._blocked.get(node, 0)
+        self._blocked[node] = count + 1
+        if count == 0:
+            self._evict_keys(self._by_transit.get(node, ()))
+        return True
+
+    def unblock_port(self, port_name: str):
+        """Release one disruption on a port"""
+        node = self.port_id(port_name)
+        if node is None or node not in self._blocked:
+            return
+        self._blocked[node] -= 1
+        if self._blocked[node] <= 0:
+            del self._blocked[node]
+            self._evict_keys(self._by_blocked.get(node, ()))
+
+    @property
+    def blocked_ports(self) -> List[str]:
+        return [self.port_names[n] for n in self._blocked]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _distance_tree(self, target: int) -> Dict[int, float]:
+        """Unconstrained cost from every port to target (reverse Dijkstra)"""
+        tree = self._trees.get(target)
+        if tree is not None:
+            self._trees.move_to_end(target)
+            return tree
+
+        lanes = self.lanes
+        reverse = self._reverse
+        tree = {}
+        heap = [(0.0, target)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node in tree:
+                continue
+            tree[node] = cost
+            for neighbor, lane_id in reverse[node]:
+                if neighbor not in tree:
+                    heapq.heappush(heap, (cost + lanes[lane_id].weight, neighbor))
+
+        self._trees[target] = tree
+        while len(self._trees) > self.tree_cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _shortest_path(self, source: int, target: int,
+                       banned_lanes: Set[str], banned_nodes: Set[int],
+                       tree: Dict[int, float]) -> Optional[PathResult]:
+        """A* search using the unconstrained distance tree to target as its bound"""
+        if source not in tree:
+            return None
+
+        blocked = self._blocked
+        lanes = self.lanes
+        adjacency = self._adjacency
+
+        best = {source: 0.0}
+        previous: Dict[int, Tuple[int, str]] = {}
+        heap = [(tree[source], 0.0, source)]
+        done: Set[int] = set()
+
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                nodes, path_lanes = [target], []
+                while node != source:
+                    node, lane_id = previous[node]
+                    nodes.append(node)
+                    path_lanes.append(lane_id)
+                nodes.reverse()
+                path_lanes.reverse()
+                return PathResult(cost, nodes, path_lanes)
+            if node in done:
+                continue
+            done.add(node)
+
+            for neighbor, lane_id in adjacency[node]:
+                if neighbor in done or neighbor in banned_nodes or lane_id in banned_lanes:
+                    continue
+                # Disrupted ports may only be endpoints
+                if neighbor != target and neighbor in blocked:
+                    continue
+                remaining = tree.get(neighbor)
+                if remaining is None:
+                    continue
+                new_cost = cost + lanes[lane_id].weight
+                if new_cost < best.get(neighbor, float("inf")):
+                    best[neighbor] = new_cost
+                    previous[neighbor] = (node, lane_id)
+                    heapq.heappush(heap, (new_cost + remaining, new_cost, neighbor))
+
+        return None
+
+    def k_shortest_paths(self, source: int, target: int, k: int = 3,
+                         banned_lanes: Optional[Set[str]] = None) -> List[PathResult]:
+        """Yen's algorithm for the k cheapest loopless paths"""
+        banned_lanes = set(banned_lanes or ())
+        tree = self._distance_tree(target)
+        first = self._shortest_path(source, target, banned_lanes, set(), tree)
+        if first is None:
+            return []
+
+        paths = [first]
+        candidates: List[Tuple[float, int, PathResult]] = []
+        seen = {tuple(first.lanes)}
+        counter = 0
+
+        while len(paths) < k:
+            last = paths[-1]
+            for i in range(len(last.nodes) - 1):
+                spur_node = last.nodes[i]
+                root_nodes = last.nodes[:i + 1]
+                root_lanes = last.lanes[:i]
+
+                # Compare lanes, not ports: parallel lanes join the same ports,
+                # and a path through a sibling lane must not ban this spur
+                removed = set(banned_lanes)
+                for path in paths:
+                    if path.lanes[:i] == root_lanes and len(path.lanes) > i:
+                        removed.add(path.lanes[i])
+
+                spur = self._shortest_path(spur_node, target, removed, set(root_nodes[:-1]), tree)
+                if spur is None:
+                    continue
+
+                lanes = root_lanes + spur.lanes
+                key = tuple(lanes)
+                if key in seen:
+                    continue
+                seen.add(key)
+                cost = sum(self.lanes[l].weight for l in lanes)
+                counter += 1
+                heapq.heappush(candidates, (cost, counter, PathResult(cost, root_nodes[:-1] + spur.nodes, lanes)))
+
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates)[2])
+
+        return paths
+
+    def alternatives(self, origin: str, destination: str, k: int = 3,
+                     exclude_lane: Optional[str] = None) -> List[PathResult]:
+        """
+        Cached k-shortest paths between two ports, optionally excluding one lane
+        """
+        source, target = self.port_id(origin), self.port_id(destination)
+        if source is None or target is None or source == target:
+            return []
+
+        key = (source, target, k, exclude_lane)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return entry.paths
+
+        self.cache_misses += 1
+        banned = {exclude_lane} if exclude_lane else None
+        if self.bidirectional and target not in self._trees and source in self._trees:
+            # Lanes cost the same both ways, so search towards the port whose
+            # distance tree is already built and flip the results
+            paths = [
+                PathResult(p.cost, p.nodes[::-1], p.lanes[::-1])
+                for p in self.k_shortest_paths(target, source, k, banned)
+            ]
+        else:
+            paths = self.k_shortest_paths(source, target, k, banned)
+        blocked = frozenset(n for n in self._blocked if n != source and n != target)
+        self._store(key, _CacheEntry(paths, blocked))
+        return paths
+
+    def reroute_port(self, port_name: str, k: int = 3) -> Dict[str, List[PathResult]]:
+        """Alternatives for every lane touching a port (shares one distance tree)"""
+        node = self.port_id(port_name)
+        if node is None:
+            return {}
+        self._distance_tree(node)
+        return {lane_id: self.lane_alternatives(lane_id, k) for lane_id in self.lanes_at_port(port_name)}
+
+    def lane_alternatives(self, lane_id: str, k: int = 3) -> List[PathResult]:
+        """Alternatives for one lane that avoid the lane itself"""
+        lane = self.lanes.get(lane_id)
+        if lane is None:
+            return []
+        return self.alternatives(self.port_names[lane.u], self.port_names[lane.v], k, exclude_lane=lane_id)
+
+    # ------------------------------------------------------------------
+    # Cache bookkeeping
+    # ------------------------------------------------------------------
+
+    def _store(self, key: Tuple, entry: _CacheEntry):
+        self._cache[key] = entry
+        for node in entry.transit_nodes:
+            self._by_transit.setdefault(node, set()).add(key)
+        for lane_id in entry.lanes:
+            self._by_lane.setdefault(lane_id, set()).add(key)
+        for node in entry.blocked:
+            self._by_blocked.setdefault(node, set()).add(key)
+        while len(self._cache) > self.cache_size:
+            oldest = next(iter(self._cache))
+            self._evict_keys([oldest])
+
+    def _evict_keys(self, keys: Iterable[Tuple]):
+        for key in list(keys):
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                continue
+            for node in entry.transit_nodes:
+                self._discard(self._by_transit, node, key)
+            for lane_id in entry.lanes:
+                self._discard(self._by_lane, lane_id, key)
+            for node in entry.blocked:
+                self._discard(self._by_blocked, node, key)
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[Tuple]], item: Any, key: Tuple):
+        keys = index.get(item)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[item]
+
+    def clear_cache(self):
+        self._trees.clear()
+        self._cache.clear()
+        self._by_transit.clear()
+        self._by_lane.clear()
+        self._by_blocked.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ports": len(self.port_names),
+            "lanes": len(self.lanes),
+            "blocked_ports": len(self._blocked),
+            "cached_paths": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
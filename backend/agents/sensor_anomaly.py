@@ -0,0 +1,213 @@
+"""
+Streaming per-sensor anomaly detection for IoT readings
+Keeps online statistics per sensor_id (Welford mean/variance and EWMA
+mean/variance) in NumPy arrays so each batch updates state in O(batch)
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class SensorAnomalyDetector:
+    """
+    Online z-score detector keyed by sensor_id
+
+    Readings are scored against each sensor's EWMA baseline as it was before
+    the batch (so a burst cannot hide itself), then folded into the state.
+    Multiple readings from one sensor in a batch are merged as a group:
+    Chan's parallel update for the long-run mean/variance and a weight of
+    1 - (1 - alpha)^n for the EWMA.
+    """
+
+    def __init__(self,
+                 fields: Sequence[str] = ("delay_minutes", "temperature"),
+                 alpha: float = 0.1,
+                 z_threshold: float = 3.0,
+                 min_samples: int = 10,
+                 min_std: float = 1e-6,
+                 initial_capacity: int = 1024):
+        self.fields = tuple(fields)
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.min_std = min_std
+
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._allocate(initial_capacity)
+
+        self.readings_processed = 0
+        self.anomalies_flagged = 0
+
+    def _allocate(self, capacity: int):
+        shape = (capacity, len(self.fields))
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.ewma = np.zeros(shape, dtype=np.float64)
+        self.ewvar = np.zeros(shape, dtype=np.float64)
+
+    def _grow(self, needed: int):
+        capacity = self.count.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name in ("count", "mean", "m2", "ewma", "ewvar"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity, old.shape[1]), dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    @property
+    def sensor_count(self) -> int:
+        """Number of sensors with state"""
+        return len(self._ids)
+
+    def _sensor_indices(self, unique_ids: np.ndarray) -> np.ndarray:
+        slots = np.empty(len(unique_ids), dtype=np.int64)
+        for i, sensor_id in enumerate(unique_ids):
+            slot = self._index.get(sensor_id)
+            if slot is None:
+                slot = self._index[sensor_id] = len(self._ids)
+                self._ids.append(sensor_id)
+            slots[i] = slot
+        self._grow(len(self._ids))
+        return slots
+
+    def update(self, readings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Score and absorb a batch of reading dicts
+        """
+        if not readings:
+            return self._empty_result()
+
+        sensor_ids = [str(r.get("sensor_id") or "unknown") for r in readings]
+        values = np.array(
+            [[np.nan if r.get(field) is None else r[field] for field in self.fields] for r in readings],
+            dtype=np.float64
+        )
+        return self.update_arrays(sensor_ids, values)
+
+    def update_arrays(self, sensor_ids: Sequence[str], values: np.ndarray) -> Dict[str, Any]:
+        """
+        Score and absorb a batch given as sensor ids plus an (n, len(fields)) value matrix
+        NaN marks a missing value
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(len(sensor_ids), len(self.fields))
+        if values.shape[0] == 0:
+            return self._empty_result()
+
+        unique_ids, inverse = np.unique(np.asarray(sensor_ids, dtype=object), return_inverse=True)
+        slots = self._sensor_indices(unique_ids)
+        rows = slots[inverse]
+
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        # Score against the pre-batch baseline
+        baseline = self.ewma[rows]
+        ready = self.count[rows] >= self.min_samples
+        std = np.maximum(np.sqrt(self.ewvar[rows]), self.min_std)
+        z = np.where(valid & ready, (filled - baseline) / std, 0.0)
+        abs_z = np.abs(z)
+
+        # Per-sensor batch aggregates
+        k = len(unique_ids)
+        batch_count = np.zeros((k, len(self.fields)), dtype=np.float64)
+        batch_sum = np.zeros_like(batch_count)
+        batch_sq = np.zeros_like(batch_count)
+        for f in range(len(self.fields)):
+            batch_count[:, f] = np.bincount(inverse, weights=valid[:, f], minlength=k)
+            batch_sum[:, f] = np.bincount(inverse, weights=filled[:, f], minlength=k)
+            batch_sq[:, f] = np.bincount(inverse, weights=filled[:, f] ** 2, minlength=k)
+
+        has_data = batch_count > 0
+        safe_count = np.where(has_data, batch_count, 1.0)
+        batch_mean = batch_sum / safe_count
+        batch_m2 = np.maximum(batch_sq - batch_count * batch_mean ** 2, 0.0)
+        batch_var = batch_m2 / safe_count
+
+        # Welford / Chan merge of long-run statistics
+        n_a = self.count[slots].astype(np.float64)
+        n_total = n_a + batch_count
+        safe_total = np.where(n_total > 0, n_total, 1.0)
+        delta = batch_mean - self.mean[slots]
+        new_mean = self.mean[slots] + delta * batch_count / safe_total
+        new_m2 = self.m2[slots] + batch_m2 + delta ** 2 * n_a * batch_count / safe_total
+
+        # EWMA merge, seeded from the first batch a sensor reports
+        weight = 1.0 - (1.0 - self.alpha) ** batch_count
+        ew_delta = batch_mean - self.ewma[slots]
+        ewma = self.ewma[slots] + weight * ew_delta
+        ewvar = (1.0 - weight) * (self.ewvar[slots] + weight * ew_delta ** 2) + weight * batch_var
+        first = n_a == 0
+        ewma = np.where(first, batch_mean, ewma)
+        ewvar = np.where(first, batch_var, ewvar)
+
+        self.mean[slots] = np.where(has_data, new_mean, self.mean[slots])
+        self.m2[slots] = np.where(has_data, new_m2, self.m2[slots])
+        self.ewma[slots] = np.where(has_data, ewma, self.ewma[slots])
+        self.ewvar[slots] = np.where(has_data, ewvar, self.ewvar[slots])
+        self.count[slots] += batch_count.astype(np.int64)
+
+        # Collapse reading-level scores to the worst reading per sensor
+        row_max = abs_z.max(axis=1)
+        row_field = abs_z.argmax(axis=1)
+        order = np.lexsort((-row_max, inverse))
+        group_starts = np.concatenate(([0], np.nonzero(np.diff(inverse[order]))[0] + 1))
+        worst_rows = order[group_starts]
+        flagged_rows = row_max > self.z_threshold
+        flagged_counts = np.bincount(inverse, weights=flagged_rows, minlength=k)
+
+        anomalous = []
+        for u in np.nonzero(row_max[worst_rows] > self.z_threshold)[0]:
+            worst = worst_rows[u]
+            field = int(row_field[worst])
+            anomalous.append({
+                "sensor_id": unique_ids[u],
+                "z_score": round(float(z[worst, field]), 3),
+                "field": self.fields[field],
+                "value": float(values[worst, field]),
+                "baseline_mean": round(float(baseline[worst, field]), 3),
+                "anomalous_readings": int(flagged_counts[u]),
+            })
+        anomalous.sort(key=lambda a: abs(a["z_score"]), reverse=True)
+
+        self.readings_processed += values.shape[0]
+        self.anomalies_flagged += int(flagged_rows.sum())
+
+        counts = valid.sum(axis=0)
+        batch_means = np.where(counts > 0, filled.sum(axis=0) / np.maximum(counts, 1), 0.0)
+        return {
+            "readings": int(values.shape[0]),
+            "sensors_in_batch": int(k),
+            "batch_mean": {field: float(batch_means[f]) for f, field in enumerate(self.fields)},
+            "anomalous_sensors": anomalous,
+        }
+
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
+            "readings": 0,
+            "sensors_in_batch": 0,
+            "batch_mean": {field: 0.0 for field in self.fields},
+            "anomalous_sensors": [],
+        }
+
+    def get_sensor_stats(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        """Current statistics for one sensor, None if never seen"""
+        slot = self._index.get(sensor_id)
+        if slot is None:
+            return None
+
+        stats = {}
+        for f, field in enumerate(self.fields):
+            n = int(self.count[slot, f])
+            stats[field] = {
+                "count": n,
+                "mean": float(self.mean[slot, f]),
+                "std": float(np.sqrt(self.m2[slot, f] / (n - 1))) if n > 1 else 0.0,
+                "ewma": float(self.ewma[slot, f]),
+                "ew_std": float(np.sqrt(self.ewvar[slot, f])),
+            }
+        return stats
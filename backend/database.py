@@ -4,9 +4,12 @@ PostgreSQL with async support using SQLAlchemy
 """
 
 import os
+import time
+from typing import Any, Dict
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
 
 # Database configuration
 DATABASE_USER = os.getenv("POSTGRES_USER", "postgres")
@@ -18,13 +21,143 @@ DATABASE_NAME = os.getenv("POSTGRES_DB", "supply_chain")
 # Create async database URL
 DATABASE_URL = f"postgresql+asyncpg://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
 
-# Create async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    poolclass=NullPool,  # Use NullPool for Cloud Run (no connection pooling)
-    echo=True,  # Log SQL queries (disable in production)
+# Engine profile: "pooled" (default), "serverless" (no pooling) or "debug" (pooled + SQL echo).
+# When DB_ENGINE_PROFILE is unset the profile follows ENVIRONMENT.
+ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
+DB_ENGINE_PROFILE = os.getenv(
+    "DB_ENGINE_PROFILE",
+    "debug" if ENVIRONMENT == "development" else "pooled"
 )
 
+# Pool sizing (ignored by the serverless profile)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# asyncpg prepared statement cache (set to 0 behind pgbouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+
+class PoolStats:
+    """
+    Live connection pool counters, updated from pool events
+    """
+
+    def __init__(self):
+        self.waiting = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.connect_time_total = 0.0
+        self.connect_time_max = 0.0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+
+    def record_connect(self, seconds: float):
+        self.connects += 1
+        self.connect_time_total += seconds
+        self.connect_time_max = max(self.connect_time_max, seconds)
+
+    def record_acquire(self, seconds: float):
+        self.checkouts += 1
+        self.acquire_time_total += seconds
+        self.acquire_time_max = max(self.acquire_time_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that tracks how many callers are waiting for a connection
+    and how long each checkout takes
+    """
+
+    def _do_get(self):
+        pool_stats.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.waiting -= 1
+            pool_stats.record_acquire(time.perf_counter() - start)
+
+
+def build_engine_options(profile: str) -> Dict[str, Any]:
+    """
+    Build create_async_engine() keyword arguments for an engine profile
+    """
+    connect_args = {
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+
+    if profile == "serverless":
+        # No connection pooling - each session opens its own connection
+        return {"poolclass": NullPool, "echo": False, "connect_args": connect_args}
+
+    if profile not in ("pooled", "debug"):
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE: {profile}")
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "echo": profile == "debug",  # Log SQL queries only when debugging
+        "connect_args": connect_args,
+    }
+
+
+# Create async engine
+engine = create_async_engine(DATABASE_URL, **build_engine_options(DB_ENGINE_PROFILE))
+
+
+@event.listens_for(engine.sync_engine, "do_connect")
+def _on_do_connect(dialect, conn_rec, cargs, cparams):
+    """Remember when a new DBAPI connection attempt started"""
+    conn_rec.info["connect_started"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    """Record how long opening the DBAPI connection took"""
+    started = connection_record.info.pop("connect_started", None)
+    if started is not None:
+        pool_stats.record_connect(time.perf_counter() - started)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of the engine's connection pool for sizing and monitoring
+    """
+    pool = engine.sync_engine.pool
+    stats = {
+        "profile": DB_ENGINE_PROFILE,
+        "pool_class": type(pool).__name__,
+        "connects": pool_stats.connects,
+        "avg_connect_ms": round(pool_stats.connect_time_total / pool_stats.connects * 1000, 3) if pool_stats.connects else 0.0,
+        "max_connect_ms": round(pool_stats.connect_time_max * 1000, 3),
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "waiting": pool_stats.waiting,
+            "checkouts": pool_stats.checkouts,
+            "avg_acquire_ms": round(pool_stats.acquire_time_total / pool_stats.checkouts * 1000, 3) if pool_stats.checkouts else 0.0,
+            "max_acquire_ms": round(pool_stats.acquire_time_max * 1000, 3),
+        })
+
+    return stats
+
 # Create async session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -0,0 +1,283 @@
+"""
+Fixed-capacity ring buffer for recent disruptions
+Keeps secondary indexes by severity, type, location name and time, plus a
+spatial grid over coordinates, so filtered and radius queries cost time
+proportional to the result, not the store size
+"""
+
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Response
+
+from spatial_index import PointIndex
+
+# Disruption fields that get a secondary index
+INDEXED_FIELDS = ("severity", "type", "locationName")
+
+
+def to_epoch(value: Union[str, datetime]) -> float:
+    """
+    Convert an ISO timestamp or datetime to epoch seconds (naive values are UTC)
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _IndexBucket:
+    """
+    Ascending list of sequence numbers for one indexed value
+    Evicted entries are dropped from the front lazily, amortized O(1)
+    """
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int):
+        self.seqs.append(seq)
+
+    def evict(self, seq: int):
+        if self.head < len(self.seqs) and self.seqs[self.head] == seq:
+            self.head += 1
+            # Compact once the dead prefix dominates the list
+            if self.head > 64 and self.head * 2 > len(self.seqs):
+                del self.seqs[:self.head]
+                self.head = 0
+
+    def position_before(self, seq: int) -> int:
+        """Index of the newest entry with sequence number < seq"""
+        return bisect_left(self.seqs, seq, self.head) - 1
+
+
+class DisruptionStore:
+    """
+    Ring buffer of disruptions, newest first on read
+
+    Every disruption gets a monotonically increasing sequence number which
+    doubles as its slot (seq % capacity) and as the pagination cursor. The
+    per-slot times used by `since` queries never decrease: a disruption
+    without a timestamp gets the time it was added, and one older than its
+    predecessor is filed at the predecessor's time.
+    """
+
+    def __init__(self, capacity: int = 1000, cell_degrees: float = 5.0):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._times: List[float] = [0.0] * capacity
+        self._next_seq = 0
+        self._indexes: Dict[str, Dict[Any, _IndexBucket]] = {field: {} for field in INDEXED_FIELDS}
+        # Sequence numbers of disruptions with a [lng, lat] location
+        self._locations = PointIndex(cell_degrees)
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    @property
+    def total_added(self) -> int:
+        """Number of disruptions ever added (survives eviction)"""
+        return self._next_seq
+
+    @property
+    def _oldest_seq(self) -> int:
+        return max(0, self._next_seq - self.capacity)
+
+    def add(self, disruption: Dict[str, Any]) -> int:
+        """
+        Add a disruption, evicting the oldest one when full. O(1)
+        """
+        seq = self._next_seq
+        slot = seq % self.capacity
+
+        evicted = self._slots[slot]
+        if evicted is not None:
+            self._unindex(seq - self.capacity, evicted)
+
+        self._slots[slot] = disruption
+        timestamp = disruption.get("timestamp")
+        added_at = to_epoch(timestamp) if timestamp else time.time()
+        if seq > 0:
+            # Keep the time ring sorted for _first_seq_since
+            added_at = max(added_at, self._times[(seq - 1) % self.capacity])
+        self._times[slot] = added_at
+
+        for field in INDEXED_FIELDS:
+            value = disruption.get(field)
+            if value is None:
+                continue
+            bucket = self._indexes[field].get(value)
+            if bucket is None:
+                bucket = self._indexes[field][value] = _IndexBucket()
+            bucket.append(seq)
+
+        location = disruption.get("location")
+        if location:
+            self._locations.add(seq, location[0], location[1])
+
+        self._next_seq = seq + 1
+        return seq
+
+    def _unindex(self, seq: int, disruption: Dict[str, Any]):
+        self._locations.remove(seq)
+        for field in INDEXED_FIELDS:
+            value = disruption.get(field)
+            bucket = self._indexes[field].get(value)
+            if bucket is None:
+                continue
+            bucket.evict(seq)
+            if not bucket:
+                del self._indexes[field][value]
+
+    def _first_seq_since(self, since: float) -> int:
+        """Binary search the time-ordered ring for the first entry at or after since"""
+        lo, hi = self._oldest_seq, self._next_seq
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[mid % self.capacity] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Look up a disruption by sequence number, None if evicted"""
+        if self._oldest_seq <= seq < self._next_seq:
+            return self._slots[seq % self.capacity]
+        return None
+
+    def query(self,
+              filters: Optional[Dict[str, Any]] = None,
+              since: Optional[Union[str, datetime]] = None,
+              cursor: Optional[int] = None,
+              limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return up to `limit` disruptions newest first, plus the cursor for the next page
+
+        The smallest matching index bucket drives the scan, so the cost is
+        bounded by that bucket rather than by the whole buffer.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        for field in filters:
+            if field not in self._indexes:
+                raise ValueError(f"Field is not indexed: {field}")
+
+        min_seq = self._oldest_seq
+        if since is not None:
+            min_seq = max(min_seq, self._first_seq_since(to_epoch(since)))
+
+        upper = self._next_seq if cursor is None else min(cursor, self._next_seq)
+
+        results: List[Dict[str, Any]] = []
+        last_seq = None
+
+        if not filters:
+            seq = upper - 1
+            while seq >= min_seq and len(results) < limit:
+                results.append(self._slots[seq % self.capacity])
+                last_seq = seq
+                seq -= 1
+            has_more = seq >= min_seq
+        else:
+            buckets = []
+            for field, value in filters.items():
+                bucket = self._indexes[field].get(value)
+                if bucket is None:
+                    return [], None
+                buckets.append((len(bucket), field, bucket))
+            buckets.sort(key=lambda b: b[0])
+            driver = buckets[0][2]
+            checks = [(field, filters[field]) for _, field, _ in buckets[1:]]
+
+            pos = driver.position_before(upper)
+            has_more = False
+            while pos >= driver.head:
+                seq = driver.seqs[pos]
+                if seq < min_seq:
+                    break
+                disruption = self._slots[seq % self.capacity]
+                if all(disruption.get(field) == value for field, value in checks):
+                    if len(results) == limit:
+                        has_more = True
+                        break
+                    results.append(disruption)
+                    last_seq = seq
+                pos -= 1
+
+        next_cursor = last_seq if has_more and last_seq is not None else None
+        return results, next_cursor
+
+    def near(self,
+             lng: float,
+             lat: float,
+             radius_km: float,
+             severity: Optional[str] = None,
+             since: Optional[Union[str, datetime]] = None,
+             limit: int = 50) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Up to `limit` (disruption, distance_km) pairs within radius_km of
+        (lng, lat), nearest first
+        """
+        min_seq = self._oldest_seq
+        if since is not None:
+            min_seq = max(min_seq, self._first_seq_since(to_epoch(since)))
+
+        results = []
+        for seq, distance in self._locations.near(lng, lat, radius_km):
+            if seq < min_seq:
+                continue
+            disruption = self._slots[seq % self.capacity]
+            if severity is not None and disruption.get("severity") != severity:
+                continue
+            results.append((disruption, distance))
+            if len(results) == limit:
+                break
+        return results
+
+    def index_sizes(self) -> Dict[str, Dict[Any, int]]:
+        """Number of live entries per indexed value"""
+        return {
+            field: {value: len(bucket) for value, bucket in index.items()}
+            for field, index in self._indexes.items()
+        }
+
+
+def disruptions_page(store: DisruptionStore,
+                     response: Response,
+                     severity: Optional[str] = None,
+                     type: Optional[str] = None,
+                     location: Optional[str] = None,
+                     since: Optional[datetime] = None,
+                     cursor: Optional[str] = None,
+                     limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Body of the /api/disruptions endpoint shared by both apps: one page of
+    filtered results, with the next page cursor in the X-Next-Cursor header
+    """
+    try:
+        start = int(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    results, next_cursor = store.query(
+        filters={"severity": severity, "type": type, "locationName": location},
+        since=since,
+        cursor=start,
+        limit=limit
+    )
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+
+    return results
@@ -3,21 +3,32 @@ FastAPI Backend for Global Supply Chain Intelligence Network
 Handles API requests, WebSocket connections, and orchestrates AI agents
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import socketio
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import asyncio
-from typing import List
+from typing import List, Optional
 import random
+import os
+import hmac
+from sqlalchemy import event, select
 
-from database import engine, Base, get_db
+from disruption_store import DisruptionStore, disruptions_page
+from metrics import MetricFamily, MetricsMiddleware, MetricsRegistry, PROMETHEUS_CONTENT_TYPE, stats_collector
+from profiling import PROFILING_ENABLED, PROFILING_TOKEN, ProfilingMiddleware, profiler
+from response_cache import ResponseCache
+from realtime import RegionBroadcaster
+from sensor_ingest import IngestAborted, SensorIngestor
+from sensor_rollups import SensorRollupManager
+from database import engine, Base, get_db, get_pool_stats, async_session_maker
 from models import Disruption, Route, SensorReading
 from agents.prediction_agent import PredictionAgent
 from agents.optimization_agent import OptimizationAgent
 from agents.alert_agent import AlertAgent
+from agents.pipeline import build_agent_pipeline, InProcessTransport, LocalBrokerTransport
 
 # Initialize Socket.IO
 sio = socketio.AsyncServer(
@@ -25,11 +36,32 @@ sio = socketio.AsyncServer(
     cors_allowed_origins='*'
 )
 
+# Region-scoped, per-tick batched disruption broadcasts
+broadcaster = RegionBroadcaster(
+    sio,
+    tick=float(os.getenv("REALTIME_TICK_SECONDS", "0.25")),
+    cell_degrees=float(os.getenv("REALTIME_CELL_DEGREES", "10"))
+)
+
 # Agents
 prediction_agent = PredictionAgent()
 optimization_agent = OptimizationAgent()
 alert_agent = AlertAgent()
 
+# Prediction -> optimization -> alert pipeline over bounded queues
+agent_pipeline = build_agent_pipeline(
+    prediction_agent,
+    optimization_agent,
+    alert_agent,
+    workers={
+        "prediction": int(os.getenv("PIPELINE_PREDICTION_WORKERS", "2")),
+        "optimization": int(os.getenv("PIPELINE_OPTIMIZATION_WORKERS", "2")),
+        "alert": int(os.getenv("PIPELINE_ALERT_WORKERS", "4")),
+    },
+    queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "100")),
+    transport=LocalBrokerTransport() if os.getenv("PIPELINE_TRANSPORT") == "local-broker" else InProcessTransport()
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -37,12 +69,27 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # Build the port/lane graph used for rerouting
+    await optimization_agent.load_route_graph(async_session_maker)
+
+    # Archive alerts that age out of the in-memory history
+    await alert_agent.attach_archive(async_session_maker)
+
     # Start background tasks
+    await agent_pipeline.start()
+    broadcaster.start()
     asyncio.create_task(simulate_disruption_detection())
+    if SENSOR_ROLLUP_INTERVAL > 0:
+        asyncio.create_task(sensor_rollups.run_forever(interval=SENSOR_ROLLUP_INTERVAL))
 
     yield
 
     # Shutdown
+    await broadcaster.stop()
+    await agent_pipeline.stop()
+    await alert_agent.dispatcher.drain()
+    await alert_agent.alerts.close()
+    await prediction_agent.gemini_cache.save()
     await engine.dispose()
 
 app = FastAPI(
@@ -59,13 +106,153 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Runtime metrics for /api/metrics and /metrics (Prometheus)
+metrics = MetricsRegistry(rate_window=float(os.getenv("METRICS_RATE_WINDOW_SECONDS", "60")))
+app.add_middleware(MetricsMiddleware, registry=metrics, routes=lambda: app.routes)
+disruptions_detected = metrics.counter("disruptions_detected", "Disruptions detected and published", ("severity",))
+sensor_readings_ingested = metrics.counter("sensor_readings_ingested", "Bulk-ingested sensor readings", ("result",))
+socketio_connections = metrics.counter("socketio_connections", "Socket.IO clients that connected")
+socketio_disconnections = metrics.counter("socketio_disconnections", "Socket.IO clients that disconnected")
+
+# On-demand request profiling (X-Profile: 1 or ?profile=1), only when enabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, token=PROFILING_TOKEN)
+
 # Wrap with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
-# In-memory store for demo (replace with database queries in production)
-disruptions_store: List[dict] = []
+# In-memory ring buffer of recent disruptions (replace with database queries in production)
+disruptions_store = DisruptionStore(
+    capacity=int(os.getenv("DISRUPTION_STORE_CAPACITY", "1000")),
+    cell_degrees=float(os.getenv("SPATIAL_CELL_DEGREES", "5"))
+)
+
+# Pre-serialized /api/routes response, dropped once a write to routes commits
+routes_cache = ResponseCache(ttl=float(os.getenv("ROUTES_CACHE_TTL", "30")))
+routes_cache.invalidate_on_commit(engine.sync_engine, Route.__table__, "routes")
+
+def _sync_route_graph(mapper, connection, target):
+    """Apply an inserted/updated route to the optimization agent's lane graph and spatial index"""
+    row = {
+        "id": target.id,
+        "origin_port": target.origin_port,
+        "destination_port": target.destination_port,
+        "current_status": target.current_status,
+        "estimated_delay_hours": target.estimated_delay_hours,
+        "risk_score": target.risk_score
+    }
+    if optimization_agent.route_index is not None:
+        optimization_agent.route_index.add_lane(row)
+    graph = optimization_agent.route_graph
+    if graph is None:
+        return
+    lane = graph.lanes.get(f"route-{target.id}")
+    if lane is not None and graph.port_names[lane.u] == target.origin_port and graph.port_names[lane.v] == target.destination_port:
+        graph.update_lane(lane.id, target.estimated_delay_hours, target.risk_score, target.current_status)
+    else:
+        graph.add_lane(row)
+
+def _remove_from_route_graph(mapper, connection, target):
+    if optimization_agent.route_graph is not None:
+        optimization_agent.route_graph.remove_lane(f"route-{target.id}")
+    if optimization_agent.route_index is not None:
+        optimization_agent.route_index.remove_lane(f"route-{target.id}")
+
+event.listen(Route, "after_insert", _sync_route_graph)
+event.listen(Route, "after_update", _sync_route_graph)
+event.listen(Route, "after_delete", _remove_from_route_graph)
+
+# How long a high/critical disruption keeps its port blocked for rerouting
+DISRUPTION_ACTIVE_SECONDS = float(os.getenv("DISRUPTION_ACTIVE_SECONDS", "21600"))
+
+# Bulk IoT sensor ingestion (COPY-based)
+sensor_ingestor = SensorIngestor(
+    engine,
+    async_session_maker,
+    batch_size=int(os.getenv("SENSOR_INGEST_BATCH_SIZE", "5000"))
+)
+
+# Ingested batches handed to the pipeline vs. shed because its first queue was full
+sensor_batch_feed = {"submitted": 0, "shed": 0}
+
+async def _feed_sensor_batch(records):
+    """
+    Send ingested readings through the agent pipeline for anomaly detection
+
+    Never waits on the pipeline: a batch that doesn't fit is shed so a slow
+    pipeline can't stall bulk ingestion.
+    """
+    accepted = agent_pipeline.submit_nowait({
+        "kind": "sensor_batch",
+        "readings": [
+            {
+                "sensor_id": record[0],
+                "temperature": float(record[3]) if record[3] is not None else None,
+                "delay_minutes": record[4]
+            }
+            for record in records
+        ]
+    })
+    sensor_batch_feed["submitted" if accepted else "shed"] += 1
+
+sensor_ingestor.batch_listeners.append(_feed_sensor_batch)
+
+def _collect_agent_metrics():
+    """Per-agent task counts and the stores behind them"""
+    agents = (prediction_agent, optimization_agent, alert_agent)
+    return [
+        MetricFamily("agent_tasks_completed", "counter", "Workflows each agent completed",
+                     [({"agent": agent.name}, agent.tasks_completed) for agent in agents]),
+        MetricFamily("alerts_active", "gauge", "Alerts in the active state",
+                     [({}, alert_agent.alerts.status_counts["active"])]),
+        MetricFamily("disruptions_retained", "gauge", "Disruptions held in the in-memory store",
+                     [({}, len(disruptions_store))]),
+        MetricFamily("sensor_batches_shed", "counter", "Ingested sensor batches the agent pipeline had no room for",
+                     [({}, sensor_batch_feed["shed"])]),
+    ]
+
+metrics.register_collector(_collect_agent_metrics)
+metrics.register_collector(agent_pipeline.collect_metrics)
+metrics.register_collector(stats_collector(
+    "realtime", broadcaster.get_stats, help="Socket.IO subscriptions and broadcast fan-out",
+    counters=("events_published", "ticks", "messages_encoded", "deliveries", "msgpack_bytes")
+))
+metrics.register_collector(stats_collector(
+    "db_pool", get_pool_stats, help="Database connection pool", counters=("connects", "checkouts")
+))
+metrics.register_collector(stats_collector(
+    "notifications", alert_agent.dispatcher.get_stats, help="Alert notification delivery",
+    counters=("alerts_enqueued", "messages_sent", "alerts_delivered", "retries", "failures")
+))
+metrics.register_collector(stats_collector(
+    "alert_store", alert_agent.alerts.get_stats, help="Alert history store",
+    counters=("total_created", "evicted", "archived", "archive_failures", "dropped")
+))
+metrics.register_collector(stats_collector(
+    "gemini_cache", prediction_agent.gemini_cache.get_stats, help="Gemini response cache",
+    counters=("hits", "misses", "coalesced", "errors", "evictions", "expirations")
+))
+if prediction_agent.model_scheduler is not None:
+    metrics.register_collector(stats_collector(
+        "model_scheduler", prediction_agent.model_scheduler.get_stats, help="Gemini request batching and rate limits",
+        counters=("items_submitted", "items_completed", "requests_sent", "failed_requests", "missing_items", "tokens_reserved")
+    ))
+metrics.register_collector(stats_collector(
+    "routes_cache", routes_cache.get_stats, help="/api/routes response cache",
+    counters=("hits", "misses", "not_modified", "discarded_loads")
+))
+
+# Sensor minute/hour rollups, retention and optional partition maintenance
+SENSOR_ROLLUP_INTERVAL = float(os.getenv("SENSOR_ROLLUP_INTERVAL", "60"))
+sensor_rollups = SensorRollupManager(
+    engine,
+    raw_retention_days=float(os.getenv("SENSOR_RAW_RETENTION_DAYS", "7")),
+    minute_retention_days=float(os.getenv("SENSOR_MINUTE_RETENTION_DAYS", "30")),
+    partitioning=os.getenv("SENSOR_PARTITIONING", "false").lower() == "true"
+)
 
 @app.get("/")
 async def root():
@@ -82,63 +269,245 @@ async def root():
     }
 
 @app.get("/api/disruptions")
-async def get_disruptions():
-    """Get all recent disruptions"""
-    return disruptions_store[:50]  # Return last 50 disruptions
+async def get_disruptions(
+    response: Response,
+    severity: Optional[str] = None,
+    type: Optional[str] = None,
+    location: Optional[str] = Query(None, alias="locationName"),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Get recent disruptions, newest first
+    Supports filtering by severity/type/locationName, a `since` timestamp and
+    cursor pagination (next page cursor is returned in the X-Next-Cursor header)
+    """
+    return disruptions_page(disruptions_store, response, severity, type, location, since, cursor, limit)
 
-@app.get("/api/routes")
-async def get_routes():
-    """Get all supply chain routes"""
+@app.get("/api/disruptions/near")
+async def get_disruptions_near(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    radius_km: float = Query(500.0, gt=0, le=20000),
+    severity: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Get recent disruptions within radius_km of a point, nearest first
+    Each result carries its great-circle distance_km
+    """
     return [
-        {
-            "id": "route-1",
-            "origin": "Shanghai",
-            "destination": "Los Angeles",
-            "status": "normal",
-            "estimated_delay": 0,
-            "risk_score": 0.15
-        },
-        {
-            "id": "route-2",
-            "origin": "Rotterdam",
-            "destination": "New York",
-            "status": "warning",
-            "estimated_delay": 12,
-            "risk_score": 0.67
-        },
-        {
-            "id": "route-3",
-            "origin": "Singapore",
-            "destination": "Dubai",
-            "status": "normal",
-            "estimated_delay": 0,
-            "risk_score": 0.22
-        }
+        {**disruption, "distance_km": round(distance, 1)}
+        for disruption, distance in disruptions_store.near(lng, lat, radius_km, severity=severity, since=since, limit=limit)
     ]
 
-@app.get("/api/metrics")
-async def get_metrics():
-    """Get system performance metrics"""
+def serialize_route(route: Route) -> dict:
+    """Convert a Route row to the API representation"""
     return {
-        "prediction_accuracy": 0.987,
-        "avg_warning_time_hours": 48,
-        "cost_saved_today": 2400000,
-        "disruptions_prevented": 23,
-        "routes_optimized": 156,
-        "active_agents": 3
+        "id": f"route-{route.id}",
+        "origin": route.origin_port,
+        "destination": route.destination_port,
+        "status": route.current_status,
+        "estimated_delay": route.estimated_delay_hours or 0,
+        "risk_score": float(route.risk_score or 0.0)
     }
 
+async def load_routes() -> List[dict]:
+    """Load all routes from the database"""
+    async with async_session_maker() as session:
+        result = await session.execute(select(Route).order_by(Route.id))
+        return [serialize_route(route) for route in result.scalars()]
+
+@app.get("/api/routes")
+async def get_routes(request: Request):
+    """
+    Get all supply chain routes
+    Served from a pre-serialized cache; unchanged polls get a 304 via If-None-Match
+    """
+    entry = await routes_cache.get_or_load("routes", load_routes)
+    return routes_cache.respond(request, entry)
+
+@app.get("/api/routes/at-risk")
+async def get_routes_at_risk(
+    radius_km: Optional[float] = Query(None, gt=0, le=20000),
+    min_severity: Optional[str] = Query(None, pattern="^(low|medium|high|critical)$"),
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Get routes passing within radius_km of a recent disruption
+    Defaults to DISRUPTION_IMPACT_RADIUS_KM and disruptions from the last
+    DISRUPTION_ACTIVE_SECONDS; most severe and closest first
+    """
+    index = optimization_agent.route_index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Route index not loaded")
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(seconds=DISRUPTION_ACTIVE_SECONDS)
+    disruptions, _ = disruptions_store.query(since=since, limit=disruptions_store.capacity)
+    return index.at_risk(disruptions, radius_km or optimization_agent.impact_radius_km, min_severity)[:limit]
+
+@app.post("/api/sensors/readings/bulk")
+async def ingest_sensor_readings(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    method: str = Query("copy", pattern="^(copy|insert)$")
+):
+    """
+    Bulk-ingest IoT sensor readings from a streamed NDJSON or CSV body
+    Rows are validated as they arrive and written in batches with COPY;
+    method=insert uses per-row ORM inserts for benchmarking
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    try:
+        report = await sensor_ingestor.ingest(request.stream(), fmt=format, method=method)
+    except IngestAborted as e:
+        # Earlier batches stay committed; tell the client how far it got
+        sensor_readings_ingested.labels("accepted").inc(e.report["accepted"])
+        raise HTTPException(status_code=400, detail={"error": str(e), **e.report})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    sensor_readings_ingested.labels("accepted").inc(report["accepted"])
+    sensor_readings_ingested.labels("rejected").inc(report["rejected"])
+    return report
+
+@app.get("/api/sensors/{sensor_id}/series")
+async def get_sensor_series(
+    sensor_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=10000)
+):
+    """
+    Get a downsampled time series for one sensor (defaults to the last 24 hours)
+    Served from raw readings, minute or hour rollups depending on the window
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=1)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return await sensor_rollups.query_series(sensor_id, start, end, max_points)
+
+@app.post("/api/sensors/rollups/refresh")
+async def refresh_sensor_rollups():
+    """Fold new sensor readings into the rollup tables now"""
+    return await sensor_rollups.refresh()
+
+@app.get("/api/metrics")
+async def get_metrics(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """
+    Get runtime metrics: request latency histograms, agent stage timings,
+    queue depths, event rates, DB pool and Socket.IO client counts
+    format=prometheus returns the Prometheus text exposition format
+    """
+    if format == "prometheus":
+        return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+    return metrics.snapshot()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+def require_profiling_admin(x_profile_token: Optional[str] = Header(None)):
+    """Profiling admin endpoints exist only when enabled and, if configured, need the token"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if PROFILING_TOKEN and not hmac.compare_digest(x_profile_token or "", PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_profiling_admin)])
+async def list_profiles(name: Optional[str] = None, kind: Optional[str] = Query(None, pattern="^(request|workflow)$")):
+    """List buffered request/workflow profiles, newest first"""
+    return {"profiler": profiler.get_status(), "profiles": profiler.list_profiles(name, kind)}
+
+@app.get("/api/admin/profiles/collapsed", dependencies=[Depends(require_profiling_admin)])
+async def download_merged_profile(name: Optional[str] = None, kind: Optional[str] = Query(None, pattern="^(request|workflow)$")):
+    """
+    Merge every buffered profile matching name/kind into one collapsed-stack
+    file (flamegraph.pl, speedscope, inferno)
+    """
+    return Response(profiler.collapsed(name=name, kind=kind), media_type="text/plain")
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_profiling_admin)])
+async def download_profile(profile_id: int):
+    """Download one profile as collapsed stacks"""
+    collapsed = profiler.collapsed(profile_id=profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have been evicted)")
+    return Response(collapsed, media_type="text/plain",
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'})
+
+@app.put("/api/admin/profiles/workflow-sampling", dependencies=[Depends(require_profiling_admin)])
+async def set_workflow_sampling(rate: float = Query(..., ge=0, le=1)):
+    """Set the fraction of agent workflow runs (predict/optimize/alert) to profile"""
+    profiler.workflow_sample_rate = rate
+    return profiler.get_status()
+
+@app.delete("/api/admin/profiles", dependencies=[Depends(require_profiling_admin)])
+async def clear_profiles():
+    """Drop all buffered profiles"""
+    profiler.clear()
+    return profiler.get_status()
+
+@app.get("/api/pipeline/status")
+async def get_pipeline_status():
+    """Get agent pipeline queue depths, throughput and latency"""
+    return {**agent_pipeline.get_status(), "sensor_batches": dict(sensor_batch_feed)}
+
+@app.get("/api/realtime/status")
+async def get_realtime_status():
+    """Get Socket.IO subscription and broadcast fan-out statistics"""
+    return broadcaster.get_stats()
+
+@app.get("/api/system/db-pool")
+async def get_db_pool():
+    """Get live database connection pool statistics"""
+    return get_pool_stats()
+
 @sio.event
 async def connect(sid, environ):
     """Handle WebSocket connection"""
     print(f"Client connected: {sid}")
-    await sio.emit('connection_established', {'sid': sid})
+    broadcaster.connect(sid)
+    socketio_connections.inc()
+    await sio.emit('connection_established', {'sid': sid}, to=sid)
 
 @sio.event
 async def disconnect(sid):
     """Handle WebSocket disconnection"""
+    broadcaster.disconnect(sid)
+    socketio_disconnections.inc()
     print(f"Client disconnected: {sid}")
 
+@sio.event
+async def subscribe(sid, data):
+    """
+    Limit disruption_batch messages to regions and/or bounding boxes
+    data: {"regions": [...], "bboxes": [[min_lng, min_lat, max_lng, max_lat], ...], "format": "json" | "msgpack"}
+    Empty regions and bboxes subscribe to everything
+    """
+    data = data or {}
+    try:
+        return broadcaster.subscribe(
+            sid,
+            regions=data.get("regions"),
+            bboxes=data.get("bboxes") or ([data["bbox"]] if data.get("bbox") else None),
+            fmt=data.get("format", "json")
+        )
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+
 async def simulate_disruption_detection():
     """
     Background task that simulates the AI agents detecting disruptions
@@ -173,7 +542,7 @@ async def simulate_disruption_detection():
             # Simulate prediction agent detecting a disruption
             location = random.choice(locations)
             disruption = {
-                "id": f"disruption-{len(disruptions_store) + 1}",
+                "id": f"disruption-{disruptions_store.total_added + 1}",
                 "type": random.choice(disruption_types),
                 "location": [location[0], location[1]],
                 "locationName": location[2],
@@ -183,14 +552,26 @@ async def simulate_disruption_detection():
                 "timestamp": datetime.utcnow().isoformat(),
                 "description": f"AI agents detected potential disruption in {location[2]}"
             }
+            if optimization_agent.route_index is not None:
+                disruption["affectedRoutes"] = len(optimization_agent.affected_lanes(disruption))
 
             # Store disruption
-            disruptions_store.insert(0, disruption)
-            if len(disruptions_store) > 100:
-                disruptions_store.pop()
+            disruptions_store.add(disruption)
+            disruptions_detected.labels(disruption["severity"]).inc()
+
+            # Block severe disruptions in the lane graph until they expire
+            if disruption["severity"] in ("high", "critical"):
+                blocked, _ = optimization_agent.block_disruption(disruption)
+                if blocked:
+                    asyncio.get_running_loop().call_later(
+                        DISRUPTION_ACTIVE_SECONDS, optimization_agent.release_disruption, disruption
+                    )
+
+            # Queue for the next broadcast tick to clients watching this area
+            broadcaster.publish(disruption, disruption["location"])
 
-            # Emit to all connected clients
-            await sio.emit('disruption_update', disruption)
+            # Hand off to the agents (waits here if the pipeline is backed up)
+            await agent_pipeline.submit({"kind": "disruption", "disruption": disruption})
 
             print(f"New disruption detected: {disruption['type']} in {disruption['locationName']}")
 
@@ -3,13 +3,19 @@ Simplified FastAPI Backend - Works WITHOUT Database
 For quick demo when Docker/PostgreSQL is not available
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import asyncio
 import random
-from typing import List
+import os
+from typing import Optional
+
+from disruption_store import DisruptionStore, disruptions_page
+from metrics import MetricFamily, MetricsMiddleware, MetricsRegistry, PROMETHEUS_CONTENT_TYPE, stats_collector
+from realtime import RegionBroadcaster
+from spatial_index import LaneIndex
 
 # Initialize Socket.IO
 sio = socketio.AsyncServer(
@@ -17,6 +23,13 @@ sio = socketio.AsyncServer(
     cors_allowed_origins='*'
 )
 
+# Region-scoped, per-tick batched disruption broadcasts
+broadcaster = RegionBroadcaster(
+    sio,
+    tick=float(os.getenv("REALTIME_TICK_SECONDS", "0.25")),
+    cell_degrees=float(os.getenv("REALTIME_CELL_DEGREES", "10"))
+)
+
 app = FastAPI(
     title="Global Supply Chain Intelligence API (Simple Mode)",
     description="Running without database - simulated data only",
@@ -30,13 +43,97 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Runtime metrics for /api/metrics and /metrics (Prometheus)
+metrics = MetricsRegistry(rate_window=float(os.getenv("METRICS_RATE_WINDOW_SECONDS", "60")))
+app.add_middleware(MetricsMiddleware, registry=metrics, routes=lambda: app.routes)
+disruptions_detected = metrics.counter("disruptions_detected", "Disruptions detected and published", ("severity",))
+socketio_connections = metrics.counter("socketio_connections", "Socket.IO clients that connected")
+socketio_disconnections = metrics.counter("socketio_disconnections", "Socket.IO clients that disconnected")
+
 # Wrap with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
-# In-memory store
-disruptions_store: List[dict] = []
+# In-memory ring buffer store
+SPATIAL_CELL_DEGREES = float(os.getenv("SPATIAL_CELL_DEGREES", "5"))
+disruptions_store = DisruptionStore(
+    capacity=int(os.getenv("DISRUPTION_STORE_CAPACITY", "1000")),
+    cell_degrees=SPATIAL_CELL_DEGREES
+)
+
+# Sample supply chain routes (the /api/routes representation)
+SAMPLE_ROUTES = [
+    {
+        "id": "route-1",
+        "origin": "Shanghai, China",
+        "destination": "Los Angeles, USA",
+        "status": "normal",
+        "estimated_delay": 0,
+        "risk_score": 0.15
+    },
+    {
+        "id": "route-2",
+        "origin": "Rotterdam, Netherlands",
+        "destination": "New York, USA",
+        "status": "warning",
+        "estimated_delay": 12,
+        "risk_score": 0.67
+    },
+    {
+        "id": "route-3",
+        "origin": "Singapore",
+        "destination": "Dubai, UAE",
+        "status": "normal",
+        "estimated_delay": 0,
+        "risk_score": 0.22
+    },
+    {
+        "id": "route-4",
+        "origin": "Hong Kong, China",
+        "destination": "Vancouver, Canada",
+        "status": "critical",
+        "estimated_delay": 48,
+        "risk_score": 0.92
+    },
+    {
+        "id": "route-5",
+        "origin": "Hamburg, Germany",
+        "destination": "Miami, USA",
+        "status": "normal",
+        "estimated_delay": 4,
+        "risk_score": 0.28
+    }
+]
+
+# Sample routes as great-circle lanes, for disruption impact queries
+route_index = LaneIndex.from_rows(
+    [
+        {
+            "id": route["id"],
+            "origin_port": route["origin"],
+            "destination_port": route["destination"],
+            "current_status": route["status"],
+            "estimated_delay_hours": route["estimated_delay"],
+            "risk_score": route["risk_score"]
+        }
+        for route in SAMPLE_ROUTES
+    ],
+    cell_degrees=SPATIAL_CELL_DEGREES
+)
+# A disruption affects lanes within this radius while it is active
+DISRUPTION_IMPACT_RADIUS_KM = float(os.getenv("DISRUPTION_IMPACT_RADIUS_KM", "300"))
+DISRUPTION_ACTIVE_SECONDS = float(os.getenv("DISRUPTION_ACTIVE_SECONDS", "21600"))
+
+metrics.register_collector(lambda: [
+    MetricFamily("disruptions_retained", "gauge", "Disruptions held in the in-memory store",
+                 [({}, len(disruptions_store))])
+])
+metrics.register_collector(stats_collector(
+    "realtime", broadcaster.get_stats, help="Socket.IO subscriptions and broadcast fan-out",
+    counters=("events_published", "ticks", "messages_encoded", "deliveries", "msgpack_bytes")
+))
 
 @app.get("/")
 async def root():
@@ -54,84 +151,108 @@ async def root():
     }
 
 @app.get("/api/disruptions")
-async def get_disruptions():
-    """Get all recent disruptions"""
-    return disruptions_store[:50]
+async def get_disruptions(
+    response: Response,
+    severity: Optional[str] = None,
+    type: Optional[str] = None,
+    location: Optional[str] = Query(None, alias="locationName"),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Get recent disruptions, newest first
+    Supports filtering by severity/type/locationName, a `since` timestamp and
+    cursor pagination (next page cursor is returned in the X-Next-Cursor header)
+    """
+    return disruptions_page(disruptions_store, response, severity, type, location, since, cursor, limit)
+
+@app.get("/api/disruptions/near")
+async def get_disruptions_near(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    radius_km: float = Query(500.0, gt=0, le=20000),
+    severity: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Get recent disruptions within radius_km of a point, nearest first
+    Each result carries its great-circle distance_km
+    """
+    return [
+        {**disruption, "distance_km": round(distance, 1)}
+        for disruption, distance in disruptions_store.near(lng, lat, radius_km, severity=severity, since=since, limit=limit)
+    ]
 
 @app.get("/api/routes")
 async def get_routes():
     """Get sample supply chain routes"""
-    return [
-        {
-            "id": "route-1",
-            "origin": "Shanghai, China",
-            "destination": "Los Angeles, USA",
-            "status": "normal",
-            "estimated_delay": 0,
-            "risk_score": 0.15
-        },
-        {
-            "id": "route-2",
-            "origin": "Rotterdam, Netherlands",
-            "destination": "New York, USA",
-            "status": "warning",
-            "estimated_delay": 12,
-            "risk_score": 0.67
-        },
-        {
-            "id": "route-3",
-            "origin": "Singapore",
-            "destination": "Dubai, UAE",
-            "status": "normal",
-            "estimated_delay": 0,
-            "risk_score": 0.22
-        },
-        {
-            "id": "route-4",
-            "origin": "Hong Kong, China",
-            "destination": "Vancouver, Canada",
-            "status": "critical",
-            "estimated_delay": 48,
-            "risk_score": 0.92
-        },
-        {
-            "id": "route-5",
-            "origin": "Hamburg, Germany",
-            "destination": "Miami, USA",
-            "status": "normal",
-            "estimated_delay": 4,
-            "risk_score": 0.28
-        }
-    ]
+    return SAMPLE_ROUTES
+
+@app.get("/api/routes/at-risk")
+async def get_routes_at_risk(
+    radius_km: float = Query(DISRUPTION_IMPACT_RADIUS_KM, gt=0, le=20000),
+    min_severity: Optional[str] = Query(None, pattern="^(low|medium|high|critical)$"),
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Get sample routes passing within radius_km of a recent disruption
+    (by default one from the last DISRUPTION_ACTIVE_SECONDS), most severe
+    and closest first
+    """
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(seconds=DISRUPTION_ACTIVE_SECONDS)
+    disruptions, _ = disruptions_store.query(since=since, limit=disruptions_store.capacity)
+    return route_index.at_risk(disruptions, radius_km, min_severity)[:limit]
 
 @app.get("/api/metrics")
-async def get_metrics():
-    """Get system performance metrics"""
-    return {
-        "prediction_accuracy": 0.987,
-        "avg_warning_time_hours": 48,
-        "cost_saved_today": 2400000,
-        "disruptions_prevented": 23,
-        "routes_optimized": 156,
-        "active_agents": 3,
-        "mode": "demo"
-    }
+async def get_metrics(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """Get runtime metrics as JSON, or Prometheus text with format=prometheus"""
+    if format == "prometheus":
+        return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+    return {**metrics.snapshot(), "mode": "demo"}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 @sio.event
 async def connect(sid, environ):
     """Handle WebSocket connection"""
     print(f"✅ Client connected: {sid}")
-    await sio.emit('connection_established', {'sid': sid, 'mode': 'simple'})
+    broadcaster.connect(sid)
+    socketio_connections.inc()
+    await sio.emit('connection_established', {'sid': sid, 'mode': 'simple'}, to=sid)
 
 @sio.event
 async def disconnect(sid):
     """Handle WebSocket disconnection"""
+    broadcaster.disconnect(sid)
+    socketio_disconnections.inc()
     print(f"❌ Client disconnected: {sid}")
 
+@sio.event
+async def subscribe(sid, data):
+    """Limit disruption_batch messages to regions and/or bounding boxes"""
+    data = data or {}
+    try:
+        return broadcaster.subscribe(
+            sid,
+            regions=data.get("regions"),
+            bboxes=data.get("bboxes") or ([data["bbox"]] if data.get("bbox") else None),
+            fmt=data.get("format", "json")
+        )
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks"""
     asyncio.create_task(simulate_disruption_detection())
+    broadcaster.start()
     print("🚀 Backend started in SIMPLE mode (no database)")
     print("📊 Generating simulated disruptions...")
 
@@ -169,22 +290,21 @@ async def simulate_disruption_detection():
 
             location = random.choice(locations)
             disruption = {
-                "id": f"disruption-{len(disruptions_store) + 1}",
+                "id": f"disruption-{disruptions_store.total_added + 1}",
                 "type": random.choice(disruption_types),
                 "location": [location[0], location[1]],
                 "locationName": location[2],
                 "severity": random.choice(["low", "medium", "high", "critical"]),
                 "confidence": round(random.uniform(0.75, 0.99), 2),
-                "affectedRoutes": random.randint(1, 15),
                 "timestamp": datetime.utcnow().isoformat(),
                 "description": f"AI agents detected potential {random.choice(disruption_types).lower()} in {location[2]}"
             }
+            disruption["affectedRoutes"] = len(route_index.lanes_near(location[0], location[1], DISRUPTION_IMPACT_RADIUS_KM))
 
-            disruptions_store.insert(0, disruption)
-            if len(disruptions_store) > 100:
-                disruptions_store.pop()
+            disruptions_store.add(disruption)
+            disruptions_detected.labels(disruption["severity"]).inc()
 
-            await sio.emit('disruption_update', disruption)
+            broadcaster.publish(disruption, disruption["location"])
             print(f"🚨 New disruption: {disruption['type']} in {disruption['locationName']}")
 
         except Exception as e:
@@ -0,0 +1,398 @@
+"""
+Runtime metrics
+Counters and fixed-bucket latency histograms for the hot path, plus
+collectors that read gauges (queue depths, pool and socket stats) from the
+existing get_stats() dicts at scrape time. Rendered as Prometheus text
+exposition or as a JSON snapshot for /api/metrics.
+
+Recording takes no locks: every thread writes its own shard of counts and
+scrapes add the shards up, so an observation is a thread-local lookup, a
+bisect and two additions.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Starlette appends "; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class _Sharded:
+    """Per-thread lists of numbers, summed when read"""
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+
+    def _shard(self) -> List[float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            # First record from this thread; list.append is atomic
+            shard = [0] * self._width
+            self._local.shard = shard
+            self._shards.append(shard)
+            return shard
+
+    def _totals(self) -> List[float]:
+        totals = [0] * self._width
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    """Monotonic count of events"""
+
+    kind = "counter"
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """Observations counted into fixed upper-bound buckets (seconds by convention)"""
+
+    kind = "histogram"
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket, one for +Inf, then the running sum
+        super().__init__(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall time"""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """(per-bucket counts incl. +Inf, sum, count)"""
+        totals = self._totals()
+        counts = totals[:-1]
+        return counts, totals[-1], sum(counts)
+
+    def quantile(self, q: float, snapshot: Optional[Tuple[List[int], float, int]] = None) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        counts, _, count = snapshot or self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # beyond the last bound
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        counts, total, count = snapshot
+
+        def ms(q):
+            value = self.quantile(q, snapshot)
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": ms(0.5),
+            "p95_ms": ms(0.95),
+            "p99_ms": ms(0.99),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Family:
+    """A metric name with labelled children, e.g. one histogram per route"""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            # setdefault keeps the first child if two threads race here
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def samples(self) -> List[Tuple[Dict[str, str], Any]]:
+        return [(dict(zip(self.labelnames, values)), child) for values, child in list(self._children.items())]
+
+
+class MetricFamily:
+    """Samples produced by a collector at scrape time"""
+
+    def __init__(self, name: str, kind: str, help: str, samples: List[Tuple[Dict[str, str], Any]]):
+        self.name = name
+        self.kind = kind  # "counter", "gauge" or "histogram"
+        self.help = help
+        self.samples = samples
+
+
+def stats_collector(prefix: str, get_stats: Callable[[], Dict[str, Any]],
+                    counters: Iterable[str] = (), help: str = "") -> Callable[[], List[MetricFamily]]:
+    """
+    Collector exporting the numeric fields of a get_stats()-style dict as
+    `<prefix>_<field>` gauges (or counters for the names in `counters`);
+    nested dicts are flattened with underscores
+    """
+    counters = set(counters)
+
+    def flatten(stats: Dict[str, Any], path: str):
+        for key, value in stats.items():
+            name = f"{path}_{key}"
+            if isinstance(value, dict):
+                yield from flatten(value, name)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield key, name, value
+
+    def collect() -> List[MetricFamily]:
+        return [
+            MetricFamily(name, "counter" if key in counters else "gauge", help or prefix, [({}, value)])
+            for key, name, value in flatten(get_stats(), prefix)
+        ]
+
+    return collect
+
+
+class MetricsRegistry:
+    """Named instruments and scrape-time collectors"""
+
+    def __init__(self, rate_window: float = 60.0):
+        self.started_at = time.time()
+        self.rate_window = rate_window
+        self._families: Dict[str, Family] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._history: deque = deque()
+
+    def _family(self, name: str, help: str, kind: str, labelnames: Sequence[str], factory):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families.setdefault(name, Family(name, help, kind, labelnames, factory))
+        return family if family.labelnames else family.labels()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        """A Counter, or a Family of them when labelnames are given"""
+        return self._family(name, help, "counter", labelnames, Counter)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """A Histogram, or a Family of them when labelnames are given"""
+        return self._family(name, help, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = [
+            MetricFamily(family.name, family.kind, family.help, family.samples())
+            for family in list(self._families.values())
+        ]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"[Metrics] Collector failed: {e}")
+        return families
+
+    # ------------------------------------------------------------------
+    # Prometheus text exposition
+    # ------------------------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for family in self.collect():
+            name = family.name
+            if family.kind == "counter" and not name.endswith("_total"):
+                name += "_total"
+            lines.append(f"# HELP {name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for labels, value in family.samples:
+                if family.kind == "histogram":
+                    counts, total, count = value.snapshot()
+                    cumulative = 0
+                    for bound, n in zip(value.buckets + (math.inf,), counts):
+                        cumulative += n
+                        le = "+Inf" if bound == math.inf else repr(float(bound))
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+                else:
+                    if isinstance(value, Counter):
+                        value = value.value
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    # ------------------------------------------------------------------
+    # JSON snapshot
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Every metric by name; histograms are summarized as count/avg/p50/p95/p99
+        and counters carry a per-second rate over the last rate_window seconds
+        (since start on the first scrape)
+        """
+        now = time.time()
+        families = self.collect()
+        current: Dict[Tuple[str, Tuple], float] = {}
+        result: Dict[str, Any] = {}
+
+        for family in families:
+            entries = []
+            for labels, value in family.samples:
+                if family.kind == "histogram":
+                    entry = value.summary()
+                    current[(family.name, tuple(sorted(labels.items())))] = entry["count"]
+                else:
+                    if isinstance(value, Counter):
+                        value = value.value
+                    entry = {"value": value}
+                    if family.kind == "counter":
+                        current[(family.name, tuple(sorted(labels.items())))] = value
+                if labels:
+                    entry = {"labels": labels, **entry}
+                entries.append(entry)
+            result[family.name] = {"type": family.kind, "help": family.help, "samples": entries}
+
+        self._add_rates(result, current, now)
+        return {
+            "uptime_seconds": round(now - self.started_at, 3),
+            "rate_window_seconds": self.rate_window,
+            "metrics": result,
+        }
+
+    def _add_rates(self, result: Dict[str, Any], current: Dict[Tuple[str, Tuple], float], now: float):
+        # Baseline: the oldest scrape inside the window, else process start
+        while len(self._history) > 1 and now - self._history[1][0] >= self.rate_window:
+            self._history.popleft()
+        if self._history and now - self._history[0][0] <= self.rate_window * 2:
+            since, previous = self._history[0]
+        else:
+            since, previous = self.started_at, {}
+        elapsed = max(now - since, 1e-9)
+
+        for name, family in result.items():
+            for entry in family["samples"]:
+                key = (name, tuple(sorted(entry.get("labels", {}).items())))
+                if key in current:
+                    delta = current[key] - previous.get(key, 0)
+                    entry["rate_per_sec"] = round(max(delta, 0) / elapsed, 3)
+
+        self._history.append((now, current))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per method, route template and
+    status class; requests that match no route share one label so scanners
+    cannot blow up the number of series
+    """
+
+    def __init__(self, app, registry: MetricsRegistry, routes: Optional[Callable[[], Iterable[Any]]] = None):
+        self.app = app
+        self.routes = routes
+        self.latency = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by method, route and status class",
+            ("method", "route", "status")
+        )
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_of(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", "<unmatched>")
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        path = self._route_paths.get(endpoint)
+        if path is None and self.routes is not None:
+            # Endpoint -> template map, rebuilt when routes are added later
+            self._route_paths = {getattr(r, "endpoint", None): getattr(r, "path", "") for r in self.routes()}
+            path = self._route_paths.get(endpoint)
+        return path or "<unmatched>"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.latency.labels(scope["method"], self._route_of(scope), f"{status[0] // 100}xx").observe(
+                time.perf_counter() - started
+            )
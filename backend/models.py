@@ -2,7 +2,7 @@
 SQLAlchemy models for database tables
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ARRAY, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ARRAY, JSON, text
 from sqlalchemy.sql import func
 from database import Base
 
@@ -44,3 +44,57 @@ class SensorReading(Base):
     temperature = Column(Float)
     delay_minutes = Column(Integer)
     sensor_metadata = Column(JSON)  # Additional sensor data (renamed from 'metadata' to avoid SQLAlchemy conflict)
+    # Id of the writing transaction; the rollups fold rows in this (commit-safe) order
+    ingest_xid = Column(BigInteger, nullable=False, index=True,
+                        server_default=text("(pg_current_xact_id()::text::bigint)"))
+
+class SensorRollupColumns:
+    """Aggregate columns shared by the sensor rollup tables"""
+
+    sensor_id = Column(String(50), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True, index=True)
+    reading_count = Column(Integer, nullable=False, default=0)
+    delay_count = Column(Integer, nullable=False, default=0)
+    delay_sum = Column(BigInteger)
+    delay_min = Column(Integer)
+    delay_max = Column(Integer)
+    temp_count = Column(Integer, nullable=False, default=0)
+    temp_sum = Column(Float)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+
+class SensorRollupMinute(SensorRollupColumns, Base):
+    """Per-sensor one-minute aggregates of sensor_readings"""
+    __tablename__ = "sensor_readings_1m"
+
+class SensorRollupHour(SensorRollupColumns, Base):
+    """Per-sensor one-hour aggregates of sensor_readings"""
+    __tablename__ = "sensor_readings_1h"
+
+class SensorRollupState(Base):
+    """Watermark of raw readings already folded into the rollups"""
+    __tablename__ = "sensor_rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    last_xid = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class AlertRecord(Base):
+    """Alerts archived from the Alert Agent's in-memory history (on eviction and at shutdown)"""
+    __tablename__ = "alerts"
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=False)
+    alert_id = Column(String(50), nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    severity = Column(String(20), nullable=False, index=True)
+    status = Column(String(20), nullable=False, index=True)
+    payload = Column(JSON, nullable=False)  # Full alert document
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AlertSequence(Base):
+    """High-water mark of alert ids reserved by the Alert Agent"""
+    __tablename__ = "alert_sequence"
+
+    name = Column(String(50), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,316 @@
+"""
+On-demand sampling profiler
+Profiles individual requests (X-Profile header or ?profile=1) and a sampled
+fraction of agent workflow runs. While at least one capture is active a
+background thread samples the event loop thread every few milliseconds and
+attributes each sample to the captures whose coroutine is running (the
+Python stack) or suspended (the chain of awaits it is parked on), so
+profiles show wall time, including time spent waiting on I/O.
+
+Finished profiles are kept in a bounded buffer and exported in the collapsed
+stack format ("root;caller;leaf count") read by flamegraph.pl, speedscope
+and inferno. With no capture active nothing runs: the sampler thread exits,
+the request middleware is not installed unless PROFILING_ENABLED is set,
+and @profiled methods return their coroutine untouched.
+"""
+
+import functools
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Distinct stacks kept per profile; further samples count towards one overflow stack
+MAX_STACKS_PER_PROFILE = 2000
+OVERFLOW_STACK = "[stack limit reached]"
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    """Samples collected for one request or workflow run"""
+
+    def __init__(self, profile_id: int, name: str, kind: str, root, thread_id: int, max_seconds: float):
+        self.id = profile_id
+        self.name = name
+        self.kind = kind
+        self.root = root  # coroutine whose execution is being profiled
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.deadline = self.started + max_seconds
+        self.duration = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.cpu_samples = 0
+
+    def add(self, stack: str, on_cpu: bool):
+        self.samples += 1
+        self.cpu_samples += on_cpu
+        if stack in self.stacks or len(self.stacks) < MAX_STACKS_PER_PROFILE:
+            self.stacks[stack] += 1
+        else:
+            self.stacks[OVERFLOW_STACK] += 1
+
+    def collapsed(self) -> str:
+        prefix = f"{self.kind}:{self.name}"
+        return "".join(f"{prefix};{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "samples": self.samples,
+            "cpu_samples": self.cpu_samples,
+            "stacks": len(self.stacks),
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler for coroutines on one event loop
+
+    interval: seconds between samples (GIL-bound; CPU-heavy code is sampled
+              less often than requested)
+    workflow_sample_rate: fraction of @profiled workflow runs to capture
+    """
+
+    def __init__(self,
+                 interval: float = 0.005,
+                 buffer_size: int = 50,
+                 max_seconds: float = 30.0,
+                 workflow_sample_rate: float = 0.0):
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.max_seconds = max_seconds
+        self.workflow_sample_rate = workflow_sample_rate
+        self.profiles: "OrderedDict[int, Profile]" = OrderedDict()
+        self.captures_started = 0
+        self.samples_taken = 0
+        self._active: Dict[int, Profile] = {}
+        self._ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        # Guards _active and _sampling so a capture never starts just as the
+        # sampler thread decides to exit
+        self._lock = threading.Lock()
+        self._sampling = False
+        self._switch_interval: Optional[float] = None
+
+    def should_sample_workflow(self) -> bool:
+        return self.workflow_sample_rate > 0 and random.random() < self.workflow_sample_rate
+
+    # ------------------------------------------------------------------
+    # Captures
+    # ------------------------------------------------------------------
+
+    def start(self, name: str, kind: str, root) -> Profile:
+        """Begin attributing samples to `root` (a coroutine run on this thread)"""
+        profile = Profile(next(self._ids), name, kind, root, threading.get_ident(), self.max_seconds)
+        self.captures_started += 1
+        if self._switch_interval is None:
+            # CPU-bound code on the loop only yields the GIL every switch
+            # interval (5 ms by default); shorten it while sampling
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        with self._lock:
+            self._active[profile.id] = profile
+            if not self._sampling:
+                self._sampling = True
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def finish(self, profile: Profile):
+        """Stop sampling a capture and keep it in the buffer"""
+        with self._lock:
+            self._active.pop(profile.id, None)
+        if not self._active and self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+        profile.duration = time.perf_counter() - profile.started
+        profile.root = None
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.buffer_size:
+            self.profiles.popitem(last=False)
+
+    async def run(self, name: str, kind: str, coro):
+        """Await `coro` while profiling it"""
+        profile = self.start(name, kind, coro)
+        try:
+            return await coro
+        finally:
+            self.finish(profile)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampling = False
+                    return
+                active = list(self._active.values())
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for profile in active:
+                if now > profile.deadline:
+                    continue  # over max_seconds; keeps its samples until finished
+                sample = self._sample(profile, frames.get(profile.thread_id))
+                if sample is not None:
+                    profile.add(*sample)
+                    self.samples_taken += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _sample(profile: Profile, frame):
+        root = profile.root
+        root_frame = getattr(root, "cr_frame", None)
+        if root_frame is None:
+            return None  # not started yet, or finished
+
+        # Running: the loop thread's stack passes through the root frame
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code))
+            if frame is root_frame:
+                return ";".join(reversed(labels)), True
+            frame = frame.f_back
+
+        # Suspended: follow the await chain down to what it is parked on
+        labels = []
+        awaitable = root
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) \
+                or getattr(awaitable, "ag_frame", None)
+            if frame is None:
+                labels.append(f"[await {type(awaitable).__name__}]")
+                break
+            labels.append(_frame_label(frame.f_code))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) \
+                or getattr(awaitable, "ag_await", None)
+        return ";".join(labels), False
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def list_profiles(self, name: Optional[str] = None, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Buffered profiles, most recently finished first"""
+        return [
+            profile.summary()
+            for profile in reversed(list(self.profiles.values()))
+            if (name is None or profile.name == name) and (kind is None or profile.kind == kind)
+        ]
+
+    def collapsed(self, profile_id: Optional[int] = None, name: Optional[str] = None,
+                  kind: Optional[str] = None) -> Optional[str]:
+        """
+        Collapsed stacks for one profile, or merged across every buffered
+        profile matching name/kind; None when profile_id is unknown
+        """
+        if profile_id is not None:
+            profile = self.profiles.get(profile_id)
+            return profile.collapsed() if profile is not None else None
+        merged: Counter = Counter()
+        for profile in list(self.profiles.values()):
+            if (name is None or profile.name == name) and (kind is None or profile.kind == kind):
+                prefix = f"{profile.kind}:{profile.name}"
+                for stack, count in profile.stacks.items():
+                    merged[f"{prefix};{stack}"] += count
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def clear(self):
+        self.profiles.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "active_captures": len(self._active),
+            "buffered_profiles": len(self.profiles),
+            "buffer_size": self.buffer_size,
+            "captures_started": self.captures_started,
+            "samples_taken": self.samples_taken,
+            "interval_ms": round(self.interval * 1000, 3),
+            "max_seconds": self.max_seconds,
+            "workflow_sample_rate": self.workflow_sample_rate,
+        }
+
+
+def profiled(name: str):
+    """
+    Make an async method a profiling point for workflow sampling; when the
+    run is not sampled the original coroutine is returned as-is
+    """
+    def decorate(fn: Callable):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            coro = fn(*args, **kwargs)
+            rate = profiler.workflow_sample_rate
+            if rate and random.random() < rate:
+                return profiler.run(name, "workflow", coro)
+            return coro
+        return wrapper
+    return decorate
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that carry `X-Profile: 1` (or the
+    configured token) or `?profile=1`; the response gets an X-Profile-Id header
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler, token: str = ""):
+        self.app = app
+        self.profiler = profiler
+        self.token = token.encode()
+
+    def _requested(self, scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                return value == self.token if self.token else value in (b"1", b"true")
+        if not self.token and b"profile=" in scope["query_string"]:
+            return any(part in (b"profile=1", b"profile=true") for part in scope["query_string"].split(b"&"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        coro = self.app(scope, receive, send_wrapper)
+        profile = self.profiler.start(f"{scope['method']} {scope['path']}", "request", coro)
+        try:
+            await coro
+        finally:
+            self.profiler.finish(profile)
+
+
+# Off by default: no middleware, no workflow sampling, admin endpoints return 404
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# When set, X-Profile must carry this token and admin calls need X-Profile-Token
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+
+# Process-wide profiler shared by the request middleware and @profiled workflows
+profiler = SamplingProfiler(
+    interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+    buffer_size=int(os.getenv("PROFILE_BUFFER_SIZE", "50")),
+    max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "30")),
+    workflow_sample_rate=float(os.getenv("PROFILE_WORKFLOW_SAMPLE_RATE", "0")) if PROFILING_ENABLED else 0.0
+)
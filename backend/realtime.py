@@ -0,0 +1,282 @@
+"""
+Region-scoped, coalesced Socket.IO broadcasting
+Clients subscribe to named regions or bounding boxes, which map onto a
+fixed lat/lng grid of cells. Published events are buffered per cell and
+flushed once per tick: every client receives at most one batch message per
+tick containing only events from the cells it watches, and clients that
+watch the same set of dirty cells share one encoded payload.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients fall back to JSON
+    msgpack = None
+
+# Named regions as (min_lng, min_lat, max_lng, max_lat)
+REGIONS: Dict[str, Tuple[float, float, float, float]] = {
+    "north_america": (-170.0, 5.0, -50.0, 75.0),
+    "south_america": (-90.0, -60.0, -30.0, 15.0),
+    "europe": (-25.0, 34.0, 45.0, 72.0),
+    "africa": (-20.0, -36.0, 55.0, 38.0),
+    "middle_east": (25.0, 12.0, 65.0, 42.0),
+    "asia": (60.0, -11.0, 150.0, 55.0),
+    "oceania": (110.0, -50.0, 180.0, 0.0),
+}
+
+FORMATS = ("json", "msgpack")
+
+Cell = Tuple[int, int]
+
+
+class _Subscription:
+    __slots__ = ("cells", "format")
+
+    def __init__(self, cells: Optional[frozenset], fmt: str):
+        self.cells = cells  # None means every cell
+        self.format = fmt
+
+
+class RegionBroadcaster:
+    """
+    Per-cell subscription index plus a tick-based batch flusher
+
+    Flush cost is proportional to the subscribers of cells that actually
+    received events, not to the number of connected clients.
+    """
+
+    def __init__(self,
+                 sio,
+                 event: str = "disruption_batch",
+                 tick: float = 0.25,
+                 cell_degrees: float = 10.0,
+                 max_batch: int = 500):
+        self.sio = sio
+        self.event = event
+        self.tick = tick
+        self.cell_degrees = cell_degrees
+        self.max_batch = max_batch
+        self._columns = math.ceil(360 / cell_degrees)
+        self._rows = math.ceil(180 / cell_degrees)
+
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._cell_sids: Dict[Cell, Set[str]] = {}
+        self._global_sids: Dict[str, Set[str]] = {fmt: set() for fmt in FORMATS}
+
+        self._pending: Dict[Cell, List[Tuple[int, Any]]] = {}
+        self._pending_all: List[Tuple[int, Any]] = []
+        self._seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.events_published = 0
+        self.ticks = 0
+        self.messages_encoded = 0
+        self.deliveries = 0
+        self.msgpack_bytes = 0
+        self.flush_time_total = 0.0
+
+    # Cells
+
+    def cell_of(self, lng: float, lat: float) -> Cell:
+        x = int((lng + 180.0) // self.cell_degrees)
+        y = int((lat + 90.0) // self.cell_degrees)
+        return min(max(x, 0), self._columns - 1), min(max(y, 0), self._rows - 1)
+
+    def cells_for_bbox(self, bbox: Sequence[float]) -> Set[Cell]:
+        """Cells overlapping a bbox; min_lng > max_lng wraps the antimeridian"""
+        if len(bbox) != 4:
+            raise ValueError("bbox must be [min_lng, min_lat, max_lng, max_lat]")
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox)
+        if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise ValueError("bbox out of range")
+        spans = [(min_lng, max_lng)] if min_lng <= max_lng else [(min_lng, 180.0), (-180.0, max_lng)]
+
+        cells = set()
+        for west, east in spans:
+            x0, y0 = self.cell_of(west, min_lat)
+            x1, y1 = self.cell_of(east, max_lat)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cells.add((x, y))
+        return cells
+
+    # Subscriptions
+
+    def connect(self, sid: str):
+        """New clients watch everything as JSON until they subscribe"""
+        self._set_subscription(sid, _Subscription(None, "json"))
+
+    def disconnect(self, sid: str):
+        self._remove(sid)
+
+    def subscribe(self,
+                  sid: str,
+                  regions: Optional[Iterable[str]] = None,
+                  bboxes: Optional[Iterable[Sequence[float]]] = None,
+                  fmt: str = "json") -> Dict[str, Any]:
+        """
+        Replace a client's subscription; no regions and no bboxes means everything
+        Raises ValueError for unknown regions, bad bboxes or formats
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format: {fmt}")
+        if fmt == "msgpack" and msgpack is None:
+            raise ValueError("msgpack is not installed on the server")
+
+        regions = list(regions or [])
+        bboxes = list(bboxes or [])
+        unknown = [name for name in regions if name not in REGIONS]
+        if unknown:
+            raise ValueError(f"unknown regions: {', '.join(unknown)}")
+
+        cells: Optional[Set[Cell]] = None
+        if regions or bboxes:
+            cells = set()
+            for box in [REGIONS[name] for name in regions] + bboxes:
+                cells |= self.cells_for_bbox(box)
+
+        self._set_subscription(sid, _Subscription(frozenset(cells) if cells is not None else None, fmt))
+        return {
+            "regions": regions,
+            "bboxes": bboxes,
+            "cells": len(cells) if cells is not None else "all",
+            "format": fmt,
+        }
+
+    def _set_subscription(self, sid: str, subscription: _Subscription):
+        self._remove(sid)
+        self._subscriptions[sid] = subscription
+        if subscription.cells is None:
+            self._global_sids[subscription.format].add(sid)
+        else:
+            for cell in subscription.cells:
+                self._cell_sids.setdefault(cell, set()).add(sid)
+
+    def _remove(self, sid: str):
+        subscription = self._subscriptions.pop(sid, None)
+        if subscription is None:
+            return
+        if subscription.cells is None:
+            self._global_sids[subscription.format].discard(sid)
+            return
+        for cell in subscription.cells:
+            sids = self._cell_sids.get(cell)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._cell_sids[cell]
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscriptions)
+
+    # Publishing
+
+    def publish(self, payload: Any, location: Sequence[float]):
+        """Buffer an event at [lng, lat] for the next tick"""
+        self._seq += 1
+        entry = (self._seq, payload)
+        cell = self.cell_of(float(location[0]), float(location[1]))
+        # Only keep per-cell buffers somebody can receive
+        if cell in self._cell_sids:
+            self._pending.setdefault(cell, []).append(entry)
+        if self._global_sids["json"] or self._global_sids["msgpack"]:
+            self._pending_all.append(entry)
+        self.events_published += 1
+
+    def _encode(self, fmt: str, events: List[Any]) -> Any:
+        message = {"events": events, "count": len(events)}
+        if fmt == "msgpack":
+            data = msgpack.packb(message, default=str)
+            self.msgpack_bytes += len(data)
+            return data
+        # Socket.IO JSON-encodes the dict once per emit
+        return message
+
+    async def _emit(self, fmt: str, events: List[Any], sids: List[str]):
+        for start in range(0, len(events), self.max_batch):
+            data = self._encode(fmt, events[start:start + self.max_batch])
+            self.messages_encoded += 1
+            self.deliveries += len(sids)
+            await self.sio.emit(self.event, data, to=sids)
+
+    async def flush(self):
+        """Send one batch per client for everything published since the last flush"""
+        pending, self._pending = self._pending, {}
+        pending_all, self._pending_all = self._pending_all, []
+        if not pending and not pending_all:
+            return
+        started = time.perf_counter()
+
+        # Group cell subscribers by the exact set of dirty cells they watch
+        sid_cells: Dict[str, List[Cell]] = {}
+        for cell in pending:
+            for sid in self._cell_sids.get(cell, ()):
+                sid_cells.setdefault(sid, []).append(cell)
+
+        groups: Dict[Tuple[str, Tuple[Cell, ...]], List[str]] = {}
+        for sid, cells in sid_cells.items():
+            subscription = self._subscriptions.get(sid)
+            if subscription is None:
+                continue
+            groups.setdefault((subscription.format, tuple(sorted(cells))), []).append(sid)
+
+        sends = []
+        for (fmt, cells), sids in groups.items():
+            if len(cells) == 1:
+                entries = pending[cells[0]]
+            else:
+                entries = sorted((e for cell in cells for e in pending[cell]), key=lambda e: e[0])
+            sends.append(self._emit(fmt, [payload for _, payload in entries], sids))
+
+        if pending_all:
+            events = [payload for _, payload in pending_all]
+            for fmt, sids in self._global_sids.items():
+                if sids:
+                    sends.append(self._emit(fmt, events, list(sids)))
+
+        await asyncio.gather(*sends)
+        self.ticks += 1
+        self.flush_time_total += time.perf_counter() - started
+
+    async def run(self):
+        """Flush every tick until stopped"""
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Realtime] Broadcast flush failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop ticking and send anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Subscription and fan-out counters"""
+        return {
+            "clients": len(self._subscriptions),
+            "global_subscribers": {fmt: len(sids) for fmt, sids in self._global_sids.items()},
+            "active_cells": len(self._cell_sids),
+            "tick_seconds": self.tick,
+            "cell_degrees": self.cell_degrees,
+            "events_published": self.events_published,
+            "ticks": self.ticks,
+            "messages_encoded": self.messages_encoded,
+            "deliveries": self.deliveries,
+            "msgpack_bytes": self.msgpack_bytes,
+            "avg_flush_ms": round(self.flush_time_total / self.ticks * 1000, 3) if self.ticks else 0.0,
+            "msgpack_available": msgpack is not None,
+        }
@@ -0,0 +1,138 @@
+"""
+In-process cache of pre-serialized JSON responses with ETag support
+Used for endpoints the dashboard polls constantly
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Engine
+
+
+class CachedBody:
+    """Serialized response body plus its validator"""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+class ResponseCache:
+    """
+    Keyed cache of JSON bodies
+
+    Entries live until invalidated or until the TTL passes (the TTL only
+    guards against writes made outside this process). Concurrent misses for
+    the same key share one load. Every invalidation bumps a generation
+    counter, and a load that was overtaken by one returns its result without
+    storing it, so a stale read never outlives the write that replaced it.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries: Dict[str, CachedBody] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+        self._generation_all = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.discarded_loads = 0
+
+    def _generation(self, key: str):
+        return self._generation_all, self._generations.get(key, 0)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or everything when no key is given"""
+        if key is None:
+            self._entries.clear()
+            self._generation_all += 1
+        else:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_on_commit(self, engine: Engine, table: Table, key: Optional[str] = None):
+        """
+        Invalidate key whenever a transaction that wrote to table commits
+
+        Watches every INSERT/UPDATE/DELETE the engine executes, so ORM
+        flushes and Core/bulk statements are covered alike; raw SQL text is
+        left to the TTL. Pass engine.sync_engine for an AsyncEngine.
+        """
+        flag = f"response_cache:{id(self)}:{table.name}:{key}"
+
+        @event.listens_for(engine, "after_execute")
+        def _mark(conn, clauseelement, multiparams, params, execution_options, result):
+            target = getattr(clauseelement, "table", None) if getattr(clauseelement, "is_dml", False) else None
+            if target is not None and getattr(target, "name", None) == table.name:
+                conn.info[flag] = True
+
+        @event.listens_for(engine, "commit")
+        def _commit(conn):
+            if conn.info.pop(flag, False):
+                self.invalidate(key)
+
+        @event.listens_for(engine, "rollback")
+        def _rollback(conn):
+            conn.info.pop(flag, None)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> CachedBody:
+        """
+        Return the cached body for key, calling loader() and serializing its result on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have refilled the entry while we waited
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            generation = self._generation(key)
+            data = await loader()
+            entry = CachedBody(json.dumps(data, separators=(",", ":")).encode("utf-8"), self.ttl)
+            if self._generation(key) == generation:
+                self._entries[key] = entry
+            else:
+                # Invalidated while loading: the data may predate the write
+                self.discarded_loads += 1
+            return entry
+
+    def respond(self, request: Request, entry: CachedBody) -> Response:
+        """
+        Build the HTTP response, answering 304 when the client already has this version
+        """
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags:
+                self.not_modified += 1
+                return Response(status_code=304, headers=headers)
+
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "discarded_loads": self.discarded_loads,
+        }
@@ -0,0 +1,319 @@
+"""
+Bulk IoT sensor ingestion
+Parses streamed NDJSON or CSV bodies row by row and writes them to
+sensor_readings in large batches through asyncpg's COPY protocol
+"""
+
+import asyncio
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models import SensorReading
+
+# Column order used for COPY (id and created_at come from table defaults)
+COPY_COLUMNS = ["sensor_id", "timestamp", "location", "temperature", "delay_minutes", "sensor_metadata"]
+
+# CSV bodies must start with a header naming these columns (metadata is optional)
+CSV_COLUMNS = ["sensor_id", "timestamp", "lng", "lat", "temperature", "delay_minutes"]
+
+MAX_REPORTED_ERRORS = 20
+
+# Longer lines are rejected (and skipped) without being buffered
+MAX_LINE_BYTES = 64 * 1024
+
+
+class RowError(ValueError):
+    """Raised when a row fails validation"""
+
+
+class IngestAborted(ValueError):
+    """
+    Raised when a body can't be parsed any further; batches written before
+    that are committed and counted in `report`
+    """
+
+    def __init__(self, message: str, report: Dict[str, Any]):
+        super().__init__(message)
+        self.report = report
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if value in (None, ""):
+        return datetime.now(timezone.utc)
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise RowError(f"invalid timestamp: {value!r}")
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _parse_location(value: Any) -> List[float]:
+    if isinstance(value, dict):
+        value = [value.get("lng"), value.get("lat")]
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise RowError("location must be [lng, lat]")
+    try:
+        lng, lat = float(value[0]), float(value[1])
+    except (TypeError, ValueError):
+        raise RowError("location must be numeric")
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        raise RowError("location out of range")
+    return [lng, lat]
+
+
+def _parse_optional_number(value: Any, name: str, cast):
+    if value in (None, ""):
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise RowError(f"invalid {name}: {value!r}")
+
+
+def validate_reading(row: Dict[str, Any]) -> Tuple:
+    """
+    Validate one reading and return it as a COPY record tuple
+    """
+    sensor_id = row.get("sensor_id")
+    if not sensor_id or not isinstance(sensor_id, str):
+        raise RowError("sensor_id is required")
+    if len(sensor_id) > 50:
+        raise RowError("sensor_id longer than 50 characters")
+
+    temperature = _parse_optional_number(row.get("temperature"), "temperature", float)
+    if temperature is not None:
+        if abs(temperature) >= 1000:
+            raise RowError("temperature out of range")
+        temperature = Decimal(f"{temperature:.2f}")
+
+    delay_minutes = _parse_optional_number(row.get("delay_minutes"), "delay_minutes", lambda v: int(float(v)))
+
+    metadata = row.get("sensor_metadata", row.get("metadata"))
+    if isinstance(metadata, str) and metadata:
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            raise RowError("metadata is not valid JSON")
+
+    return (
+        sensor_id,
+        _parse_timestamp(row.get("timestamp")),
+        json.dumps(_parse_location(row.get("location"))),
+        temperature,
+        delay_minutes,
+        json.dumps(metadata) if metadata not in (None, "") else None,
+    )
+
+
+async def iter_lines(chunks: AsyncIterator[bytes],
+                     max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Union[str, RowError]]:
+    """
+    Split a streamed body into lines without buffering the whole request
+
+    Each chunk is scanned once. A line longer than max_line_bytes, or one
+    that isn't valid UTF-8, comes out as a RowError in its place; the rest of
+    an overlong line is dropped as it arrives.
+    """
+    pending = bytearray()
+    overlong = False
+
+    def finish(tail: bytes) -> Union[str, RowError]:
+        if overlong:
+            return RowError(f"line longer than {max_line_bytes} bytes")
+        try:
+            return (bytes(pending) + tail).decode("utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            return RowError("line is not valid UTF-8")
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                break
+            yield finish(chunk[start:end])
+            pending.clear()
+            overlong = False
+            start = end + 1
+        if not overlong and start < len(chunk):
+            pending += chunk[start:]
+            if len(pending) > max_line_bytes:
+                pending.clear()
+                overlong = True
+    if pending or overlong:
+        yield finish(b"")
+
+
+class IngestReport:
+    """Counters for one ingestion request"""
+
+    def __init__(self, method: str):
+        self.method = method
+        self.accepted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    def reject(self, line_number: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "method": self.method,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "elapsed_seconds": round(elapsed, 4),
+            "rows_per_second": round(self.accepted / elapsed, 1) if elapsed > 0 else 0.0,
+            "errors": self.errors,
+        }
+
+
+class SensorIngestor:
+    """
+    Streams validated sensor readings into the database in batches
+
+    method="copy" writes each batch with COPY; method="insert" does per-row
+    ORM inserts and exists only as a benchmark baseline.
+    """
+
+    def __init__(self, engine: AsyncEngine, session_maker, batch_size: int = 5000):
+        self.engine = engine
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        # Called with each batch of COPY records after it has been written
+        self.batch_listeners: List[Callable[[List[Tuple]], Awaitable[None]]] = []
+
+    async def _copy_batch(self, records: List[Tuple]):
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            async with driver.transaction():
+                await driver.copy_records_to_table(
+                    SensorReading.__tablename__,
+                    records=records,
+                    columns=COPY_COLUMNS
+                )
+
+    async def _insert_batch(self, records: List[Tuple]):
+        async with self.session_maker() as session:
+            for record in records:
+                values = dict(zip(COPY_COLUMNS, record))
+                values["location"] = json.loads(values["location"])
+                if values["sensor_metadata"] is not None:
+                    values["sensor_metadata"] = json.loads(values["sensor_metadata"])
+                session.add(SensorReading(**values))
+                await session.flush()
+            await session.commit()
+
+    async def _rows(self, lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+        """Yield (line_number, row, error) for every non-blank line"""
+        header: Optional[List[str]] = None
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if isinstance(line, RowError):
+                if fmt == "csv" and header is None:
+                    raise RowError(f"CSV header unreadable: {line}")
+                yield line_number, None, str(line)
+                continue
+            if not line.strip():
+                continue
+
+            if fmt == "ndjson":
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_number, None, "invalid JSON"
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, None, "row must be a JSON object"
+                    continue
+                yield line_number, row, None
+                continue
+
+            fields = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in fields]
+                missing = [name for name in ("sensor_id", "lng", "lat") if name not in header]
+                if missing:
+                    raise RowError(f"CSV header missing columns: {', '.join(missing)}")
+                continue
+            if len(fields) != len(header):
+                yield line_number, None, f"expected {len(header)} fields, got {len(fields)}"
+                continue
+            row = dict(zip(header, fields))
+            row["location"] = [row.pop("lng"), row.pop("lat")]
+            yield line_number, row, None
+
+    async def ingest(self, chunks: AsyncIterator[bytes], fmt: str = "ndjson", method: str = "copy") -> Dict[str, Any]:
+        """
+        Ingest a streamed body and return throughput/rejection counters
+
+        Parsing of the next batch overlaps with the write of the previous one;
+        at most one batch is in flight so memory stays bounded. Batches are
+        committed as they go: if the body turns out to be unparseable, the
+        batch in flight is finished and IngestAborted reports what was kept.
+        """
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        if method not in ("copy", "insert"):
+            raise ValueError(f"Unsupported method: {method}")
+
+        write = self._copy_batch if method == "copy" else self._insert_batch
+        report = IngestReport(method)
+        batch: List[Tuple] = []
+        in_flight: Optional[asyncio.Task] = None
+
+        async def flush(records: List[Tuple]):
+            await write(records)
+            report.accepted += len(records)
+            report.batches += 1
+            for listener in self.batch_listeners:
+                await listener(records)
+
+        try:
+            async for line_number, row, error in self._rows(iter_lines(chunks), fmt):
+                if error is None:
+                    try:
+                        batch.append(validate_reading(row))
+                    except RowError as e:
+                        error = str(e)
+                if error is not None:
+                    report.reject(line_number, error)
+                    continue
+
+                if len(batch) >= self.batch_size:
+                    if in_flight is not None:
+                        await in_flight
+                    in_flight = asyncio.create_task(flush(batch))
+                    batch = []
+
+            if in_flight is not None:
+                await in_flight
+            if batch:
+                await flush(batch)
+        except BaseException as e:
+            if in_flight is not None and not in_flight.done():
+                if not isinstance(e, Exception):
+                    # Cancelled (client went away): don't keep writing
+                    in_flight.cancel()
+                try:
+                    await in_flight
+                except (Exception, asyncio.CancelledError):
+                    pass  # the batch's own failure; e is what gets reported
+            if isinstance(e, ValueError):
+                raise IngestAborted(f"{e} ({report.accepted} rows already committed)", report.to_dict()) from e
+            raise
+
+        return report.to_dict()
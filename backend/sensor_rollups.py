@@ -0,0 +1,357 @@
+"""
+Rollups and downsampled queries for the sensor_readings time series
+Incrementally folds new raw readings into per-sensor minute and hour
+aggregates, answers range queries from the coarsest table that fits,
+and applies retention (optionally by dropping daily partitions)
+"""
+
+import asyncio
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+RAW_TABLE = "sensor_readings"
+STATE_NAME = "sensor_readings"
+
+# (name, bucket seconds, table, time column) from finest to coarsest
+RESOLUTIONS = [
+    ("raw", 0, RAW_TABLE, "timestamp"),
+    ("minute", 60, "sensor_readings_1m", "bucket"),
+    ("hour", 3600, "sensor_readings_1h", "bucket"),
+]
+
+_ROLLUP_UPSERT = """
+INSERT INTO {table} (sensor_id, bucket, reading_count, delay_count, delay_sum, delay_min, delay_max,
+                     temp_count, temp_sum, temp_min, temp_max)
+SELECT sensor_id, date_trunc('{unit}', timestamp), count(*), count(delay_minutes), sum(delay_minutes),
+       min(delay_minutes), max(delay_minutes), count(temperature), sum(temperature),
+       min(temperature), max(temperature)
+FROM sensor_readings
+WHERE ingest_xid >= :lo AND ingest_xid < :hi AND timestamp IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (sensor_id, bucket) DO UPDATE SET
+    reading_count = {table}.reading_count + EXCLUDED.reading_count,
+    delay_count = {table}.delay_count + EXCLUDED.delay_count,
+    delay_sum = COALESCE({table}.delay_sum, 0) + COALESCE(EXCLUDED.delay_sum, 0),
+    delay_min = LEAST({table}.delay_min, EXCLUDED.delay_min),
+    delay_max = GREATEST({table}.delay_max, EXCLUDED.delay_max),
+    temp_count = {table}.temp_count + EXCLUDED.temp_count,
+    temp_sum = COALESCE({table}.temp_sum, 0) + COALESCE(EXCLUDED.temp_sum, 0),
+    temp_min = LEAST({table}.temp_min, EXCLUDED.temp_min),
+    temp_max = GREATEST({table}.temp_max, EXCLUDED.temp_max)
+"""
+
+# Oldest transaction id still running; every lower one has committed or aborted
+_HORIZON = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+_ROLLUP_SERIES = """
+SELECT to_timestamp(floor(extract(epoch FROM bucket) / :step) * :step) AS t,
+       sum(reading_count) AS readings,
+       sum(delay_sum)::float / NULLIF(sum(delay_count), 0) AS delay_mean,
+       min(delay_min) AS delay_min,
+       max(delay_max) AS delay_max,
+       sum(temp_sum) / NULLIF(sum(temp_count), 0) AS temp_mean,
+       min(temp_min) AS temp_min,
+       max(temp_max) AS temp_max
+FROM {table}
+WHERE sensor_id = :sensor_id AND bucket >= :start AND bucket < :end
+GROUP BY 1
+ORDER BY 1
+"""
+
+_RAW_SERIES = """
+SELECT to_timestamp(floor(extract(epoch FROM timestamp) / :step) * :step) AS t,
+       count(*) AS readings,
+       avg(delay_minutes)::float AS delay_mean,
+       min(delay_minutes) AS delay_min,
+       max(delay_minutes) AS delay_max,
+       avg(temperature)::float AS temp_mean,
+       min(temperature)::float AS temp_min,
+       max(temperature)::float AS temp_max
+FROM sensor_readings
+WHERE sensor_id = :sensor_id AND timestamp >= :start AND timestamp < :end
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+def choose_resolution(start: datetime,
+                      end: datetime,
+                      max_points: int,
+                      retention_days: Dict[str, Optional[float]],
+                      now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Pick the coarsest resolution whose bucket still fits the requested step
+    (window / max_points) and that still retains data back to `start`
+    """
+    now = now or datetime.now(timezone.utc)
+    window = max((end - start).total_seconds(), 1.0)
+    step = max(window / max(max_points, 1), 1.0)
+
+    index = 0
+    for i, (_, seconds, _, _) in enumerate(RESOLUTIONS):
+        if seconds <= step:
+            index = i
+
+    # Fall back to coarser data when the finer table has already been pruned
+    while index < len(RESOLUTIONS) - 1:
+        days = retention_days.get(RESOLUTIONS[index][0])
+        if days is None or start >= now - timedelta(days=days):
+            break
+        index += 1
+
+    name, seconds, table, column = RESOLUTIONS[index]
+    if seconds:
+        step = math.ceil(step / seconds) * seconds
+    return {"resolution": name, "table": table, "step_seconds": int(math.ceil(step))}
+
+
+class SensorRollupManager:
+    """
+    Maintains sensor rollups from a watermark on sensor_readings.ingest_xid
+
+    Every raw row records the (64-bit) id of the transaction that wrote it.
+    Ids are handed out in start order, not commit order, so neither row ids
+    nor transaction ids can be folded as soon as they are visible: a COPY
+    that started earlier may still commit rows below them. Each refresh
+    therefore stops at the oldest transaction still running (the snapshot
+    xmin); everything below it has committed or aborted. Rows with
+    ingest_xid in [last_xid, horizon) are folded into both rollup tables and
+    the watermark advanced in the same transaction, so work is proportional
+    to new data only. The watermark row is locked during the refresh, which
+    keeps multiple backend instances from double counting.
+    """
+
+    def __init__(self,
+                 engine: AsyncEngine,
+                 chunk_size: int = 200000,
+                 raw_retention_days: Optional[float] = 7,
+                 minute_retention_days: Optional[float] = 30,
+                 partitioning: bool = False,
+                 partitions_ahead: int = 3):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.retention_days = {
+            "raw": raw_retention_days,
+            "minute": minute_retention_days,
+            "hour": None,
+        }
+        self.partitioning = partitioning
+        self.partitions_ahead = partitions_ahead
+        self.rows_rolled_up = 0
+        self.last_refresh: Optional[str] = None
+
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Fold all raw readings between the watermark and the oldest running
+        transaction into the rollups
+        """
+        processed = 0
+        while True:
+            async with self.engine.begin() as conn:
+                # Taken first: no transaction below this id can still commit rows
+                horizon = (await conn.execute(text(_HORIZON))).scalar_one()
+                await conn.execute(
+                    text("INSERT INTO sensor_rollup_state (name, last_xid) VALUES (:name, 0) ON CONFLICT (name) DO NOTHING"),
+                    {"name": STATE_NAME}
+                )
+                lo = (await conn.execute(
+                    text("SELECT last_xid FROM sensor_rollup_state WHERE name = :name FOR UPDATE"),
+                    {"name": STATE_NAME}
+                )).scalar_one()
+                if horizon <= lo:
+                    break
+
+                # Stop the chunk at a transaction boundary about chunk_size rows in
+                boundary = (await conn.execute(
+                    text("SELECT ingest_xid FROM sensor_readings WHERE ingest_xid >= :lo AND ingest_xid < :horizon "
+                         "ORDER BY ingest_xid OFFSET :chunk LIMIT 1"),
+                    {"lo": lo, "horizon": horizon, "chunk": self.chunk_size}
+                )).scalar_one_or_none()
+                hi = horizon if boundary is None else max(boundary, lo + 1)
+                for _, seconds, table, _ in RESOLUTIONS[1:]:
+                    unit = "minute" if seconds == 60 else "hour"
+                    await conn.execute(text(_ROLLUP_UPSERT.format(table=table, unit=unit)), {"lo": lo, "hi": hi})
+
+                count = (await conn.execute(
+                    text("SELECT count(*) FROM sensor_readings WHERE ingest_xid >= :lo AND ingest_xid < :hi"),
+                    {"lo": lo, "hi": hi}
+                )).scalar_one()
+                await conn.execute(
+                    text("UPDATE sensor_rollup_state SET last_xid = :hi, updated_at = now() WHERE name = :name"),
+                    {"hi": hi, "name": STATE_NAME}
+                )
+                processed += count
+
+            if hi == horizon:
+                break
+
+        self.rows_rolled_up += processed
+        self.last_refresh = datetime.now(timezone.utc).isoformat()
+        return {"rows_processed": processed, "last_refresh": self.last_refresh}
+
+    async def query_series(self,
+                           sensor_id: str,
+                           start: datetime,
+                           end: datetime,
+                           max_points: int = 500) -> Dict[str, Any]:
+        """
+        Downsampled series for one sensor, served from the coarsest table that fits
+        """
+        plan = choose_resolution(start, end, max_points, self.retention_days)
+        sql = _RAW_SERIES if plan["resolution"] == "raw" else _ROLLUP_SERIES.format(table=plan["table"])
+
+        async with self.engine.connect() as conn:
+            result = await conn.execute(text(sql), {
+                "sensor_id": sensor_id,
+                "start": start,
+                "end": end,
+                "step": plan["step_seconds"],
+            })
+            points = [
+                {
+                    "timestamp": row.t.isoformat(),
+                    "readings": int(row.readings),
+                    "delay_mean": row.delay_mean,
+                    "delay_min": row.delay_min,
+                    "delay_max": row.delay_max,
+                    "temperature_mean": row.temp_mean,
+                    "temperature_min": row.temp_min,
+                    "temperature_max": row.temp_max,
+                }
+                for row in result
+            ]
+
+        return {
+            "sensor_id": sensor_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "resolution": plan["resolution"],
+            "step_seconds": plan["step_seconds"],
+            "points": points,
+        }
+
+    async def _is_partitioned(self, conn) -> bool:
+        relkind = (await conn.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :name AND relnamespace = 'public'::regnamespace"),
+            {"name": RAW_TABLE}
+        )).scalar_one_or_none()
+        return relkind == "p"
+
+    async def ensure_partitions(self) -> List[str]:
+        """
+        Create daily partitions for today and the next few days
+        """
+        created = []
+        today = datetime.now(timezone.utc).date()
+        for offset in range(self.partitions_ahead + 1):
+            day = today + timedelta(days=offset)
+            name = f"{RAW_TABLE}_p{day:%Y%m%d}"
+            try:
+                async with self.engine.begin() as conn:
+                    if not await self._is_partitioned(conn):
+                        return created
+                    exists = (await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar_one()
+                    if exists:
+                        continue
+                    await conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {RAW_TABLE} "
+                        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                    ))
+                    created.append(name)
+            except Exception as e:
+                # Usually today's rows already sit in the default partition
+                print(f"Could not create partition {name}: {e}")
+        return created
+
+    async def prune(self, batch_size: int = 50000) -> Dict[str, Any]:
+        """
+        Apply retention: drop or delete raw rows past raw retention (only once
+        they are rolled up) and minute rollups past minute retention
+        """
+        now = datetime.now(timezone.utc)
+        dropped: List[str] = []
+        deleted = 0
+
+        raw_days = self.retention_days["raw"]
+        if raw_days is not None:
+            cutoff = now - timedelta(days=raw_days)
+            async with self.engine.begin() as conn:
+                watermark = (await conn.execute(
+                    text("SELECT last_xid FROM sensor_rollup_state WHERE name = :name"),
+                    {"name": STATE_NAME}
+                )).scalar_one_or_none() or 0
+                partitioned = self.partitioning and await self._is_partitioned(conn)
+
+            if partitioned:
+                async with self.engine.connect() as conn:
+                    names = (await conn.execute(text(
+                        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                        "WHERE i.inhparent = CAST(:parent AS regclass)"
+                    ), {"parent": RAW_TABLE})).scalars().all()
+
+                for name in names:
+                    suffix = name.rsplit("_p", 1)[-1]
+                    if not suffix.isdigit():
+                        continue
+                    day_end = datetime.strptime(suffix, "%Y%m%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+                    if day_end > cutoff:
+                        continue
+                    async with self.engine.begin() as conn:
+                        max_xid = (await conn.execute(text(f"SELECT COALESCE(MAX(ingest_xid), 0) FROM {name}"))).scalar_one()
+                        if max_xid >= watermark:
+                            continue
+                        await conn.execute(text(f"DROP TABLE {name}"))
+                        dropped.append(name)
+
+            # Delete in batches (covers the default partition and unpartitioned tables)
+            while True:
+                async with self.engine.begin() as conn:
+                    result = await conn.execute(text(
+                        "DELETE FROM sensor_readings WHERE id IN ("
+                        "SELECT id FROM sensor_readings WHERE timestamp < :cutoff AND ingest_xid < :watermark LIMIT :limit)"
+                    ), {"cutoff": cutoff, "watermark": watermark, "limit": batch_size})
+                deleted += result.rowcount or 0
+                if (result.rowcount or 0) < batch_size:
+                    break
+
+        minute_deleted = 0
+        minute_days = self.retention_days["minute"]
+        if minute_days is not None:
+            async with self.engine.begin() as conn:
+                result = await conn.execute(
+                    text("DELETE FROM sensor_readings_1m WHERE bucket < :cutoff"),
+                    {"cutoff": now - timedelta(days=minute_days)}
+                )
+                minute_deleted = result.rowcount or 0
+
+        return {"partitions_dropped": dropped, "raw_rows_deleted": deleted, "minute_rollups_deleted": minute_deleted}
+
+    async def run_forever(self, interval: float = 60.0, prune_every: int = 60):
+        """
+        Background loop: refresh every interval, maintain partitions and prune periodically
+        """
+        iteration = 0
+        while True:
+            try:
+                await self.refresh()
+                if iteration % prune_every == 0:
+                    if self.partitioning:
+                        await self.ensure_partitions()
+                    await self.prune()
+            except Exception as e:
+                print(f"Error in sensor rollup refresh: {e}")
+            iteration += 1
+            await asyncio.sleep(interval)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Rollup maintenance counters"""
+        return {
+            "rows_rolled_up": self.rows_rolled_up,
+            "last_refresh": self.last_refresh,
+            "retention_days": self.retention_days,
+            "partitioning": self.partitioning,
+        }
@@ -0,0 +1,483 @@
+"""
+Grid spatial index for ports, lanes and disruptions
+A fixed lat/lng grid of cells (like the realtime broadcaster's) maps each
+cell to the points and lanes that pass through it. Lanes are great-circle
+arcs between their ports' coordinates; a radius query only visits the
+cells around the query point and checks exact distances for the candidates
+found there, so its cost follows local density rather than the number of
+lanes. No PostGIS needed: init.sql keeps locations as plain JSON.
+"""
+
+import math
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from agents.route_graph import port_key
+
+EARTH_RADIUS_KM = 6371.0088
+
+# (lng, lat) for the ports in seed_data.sql and the disruption simulators, by port_key
+PORT_LOCATIONS: Dict[str, Tuple[float, float]] = {
+    "shanghai": (121.47, 31.23),
+    "shenzhen": (114.06, 22.54),
+    "hong kong": (114.17, 22.32),
+    "busan": (129.04, 35.10),
+    "tokyo": (139.77, 35.68),
+    "singapore": (103.85, 1.29),
+    "port klang": (101.39, 3.00),
+    "bangkok": (100.50, 13.75),
+    "ho chi minh": (106.70, 10.78),
+    "mumbai": (72.88, 19.08),
+    "dubai": (55.27, 25.20),
+    "jebel ali": (55.03, 25.01),
+    "rotterdam": (4.47, 51.92),
+    "hamburg": (9.99, 53.55),
+    "antwerp": (4.40, 51.22),
+    "felixstowe": (1.35, 51.96),
+    "le havre": (0.11, 49.49),
+    "marseille": (5.37, 43.30),
+    "barcelona": (2.17, 41.38),
+    "los angeles": (-118.24, 33.74),
+    "long beach": (-118.19, 33.77),
+    "oakland": (-122.27, 37.80),
+    "san francisco": (-122.42, 37.77),
+    "seattle": (-122.33, 47.61),
+    "vancouver": (-123.12, 49.28),
+    "new york": (-74.00, 40.71),
+    "norfolk": (-76.29, 36.85),
+    "charleston": (-79.93, 32.78),
+    "savannah": (-81.09, 32.08),
+    "miami": (-80.19, 25.77),
+    "houston": (-95.37, 29.76),
+    "balboa": (-79.57, 8.95),
+    "cartagena": (-75.51, 10.39),
+    "callao": (-77.15, -12.05),
+    "santos": (-46.33, -23.96),
+    "buenos aires": (-58.38, -34.60),
+    "lagos": (3.39, 6.45),
+    "durban": (31.03, -29.87),
+    "mombasa": (39.67, -4.04),
+    "sydney": (151.21, -33.87),
+    "melbourne": (144.96, -37.81),
+    "brisbane": (153.03, -27.47),
+    "auckland": (174.76, -36.85),
+}
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+Vector = Tuple[float, float, float]
+
+
+def locate_port(name: str) -> Optional[Tuple[float, float]]:
+    """(lng, lat) of a known port, None if it is not in PORT_LOCATIONS"""
+    return PORT_LOCATIONS.get(port_key(name))
+
+
+def to_vector(lng: float, lat: float) -> Vector:
+    """Unit vector on the sphere"""
+    lng, lat = math.radians(lng), math.radians(lat)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat))
+
+
+def _cross(a: Vector, b: Vector) -> Vector:
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def _dot(a: Vector, b: Vector) -> float:
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _norm(a: Vector) -> float:
+    return math.sqrt(a[0] * a[0] + a[1] * a[1] + a[2] * a[2])
+
+
+def angle_between(a: Vector, b: Vector) -> float:
+    """Central angle in radians (stable for tiny and near-antipodal angles)"""
+    return math.atan2(_norm(_cross(a, b)), _dot(a, b))
+
+
+def distance_km(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    return angle_between(to_vector(lng1, lat1), to_vector(lng2, lat2)) * EARTH_RADIUS_KM
+
+
+class _Grid:
+    """Cell arithmetic for a lat/lng grid with longitude wrap-around"""
+
+    def __init__(self, cell_degrees: float):
+        if cell_degrees <= 0:
+            raise ValueError("cell_degrees must be positive")
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360.0 / cell_degrees)
+        self.rows = math.ceil(180.0 / cell_degrees)
+
+    def cell_of(self, lng: float, lat: float) -> int:
+        column = math.floor((lng + 180.0) / self.cell_degrees) % self.columns
+        row = min(max(math.floor((lat + 90.0) / self.cell_degrees), 0), self.rows - 1)
+        return row * self.columns + column
+
+    def cells_within(self, lng: float, lat: float, angle: float) -> Iterable[int]:
+        """Every cell holding a point within `angle` radians of (lng, lat), plus a margin"""
+        delta_lat = math.degrees(angle)
+        lat_lo, lat_hi = lat - delta_lat, lat + delta_lat
+        row_lo = max(math.floor((lat_lo + 90.0) / self.cell_degrees), 0)
+        row_hi = min(math.floor((lat_hi + 90.0) / self.cell_degrees), self.rows - 1)
+
+        columns = range(self.columns)
+        if lat_lo > -90.0 and lat_hi < 90.0:
+            # Widest longitude span of the circle (it does not contain a pole)
+            ratio = math.sin(min(angle, math.pi / 2)) / math.cos(math.radians(lat))
+            if ratio < 1.0:
+                delta_lng = math.degrees(math.asin(ratio))
+                col_lo = math.floor((lng - delta_lng + 180.0) / self.cell_degrees)
+                col_hi = math.floor((lng + delta_lng + 180.0) / self.cell_degrees)
+                if col_hi - col_lo + 1 < self.columns:
+                    columns = [c % self.columns for c in range(col_lo, col_hi + 1)]
+
+        for row in range(row_lo, row_hi + 1):
+            base = row * self.columns
+            for column in columns:
+                yield base + column
+
+
+class PointIndex:
+    """Points keyed by any hashable id, with radius queries"""
+
+    def __init__(self, cell_degrees: float = 5.0):
+        self.grid = _Grid(cell_degrees)
+        self._points: Dict[Hashable, Tuple[Vector, int]] = {}
+        self._cells: Dict[int, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def add(self, key: Hashable, lng: float, lat: float):
+        if key in self._points:
+            self.remove(key)
+        cell = self.grid.cell_of(lng, lat)
+        self._points[key] = (to_vector(lng, lat), cell)
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable):
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return
+        members = self._cells[entry[1]]
+        members.discard(key)
+        if not members:
+            del self._cells[entry[1]]
+
+    def near(self, lng: float, lat: float, radius_km: float,
+             limit: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """(key, distance_km) within radius_km, nearest first"""
+        angle = radius_km / EARTH_RADIUS_KM
+        origin = to_vector(lng, lat)
+        found = []
+        for cell in self.grid.cells_within(lng, lat, angle):
+            for key in self._cells.get(cell, ()):
+                distance = angle_between(origin, self._points[key][0])
+                if distance <= angle:
+                    found.append((distance * EARTH_RADIUS_KM, key))
+        found.sort(key=lambda item: item[0])
+        if limit is not None:
+            found = found[:limit]
+        return [(key, distance) for distance, key in found]
+
+
+class _Lane:
+    __slots__ = ("id", "slot", "origin", "destination", "status", "delay_hours", "risk_score")
+
+    def __init__(self, lane_id: str, slot: int, row: Dict[str, Any]):
+        self.id = lane_id
+        self.slot = slot
+        self.origin = row["origin_port"]
+        self.destination = row["destination_port"]
+        self.status = row.get("current_status") or "normal"
+        self.delay_hours = row.get("estimated_delay_hours") or 0
+        self.risk_score = float(row.get("risk_score") or 0.0)
+
+
+def _angles(p: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Central angles from unit vector p to each row of points"""
+    return np.arctan2(np.linalg.norm(np.cross(points, p), axis=1), points @ p)
+
+
+class LaneIndex:
+    """
+    Routes-table lanes as great-circle arcs, plus their ports as points
+
+    Each lane is registered in the cells its arc passes through (sampled
+    every half cell). Queries widen their search by that sampling step, so
+    the candidate set never misses a lane, then compute exact distances for
+    all candidates at once with numpy. Lanes whose ports have no known
+    location are counted but not indexed.
+    """
+
+    def __init__(self,
+                 cell_degrees: float = 5.0,
+                 locate: Callable[[str], Optional[Tuple[float, float]]] = locate_port):
+        self.grid = _Grid(cell_degrees)
+        self.locate = locate
+        self.ports = PointIndex(cell_degrees)
+        self.port_names: Dict[str, str] = {}
+        self._port_vectors: Dict[str, Optional[Vector]] = {}
+        self.lanes: Dict[str, _Lane] = {}
+        self.unlocated: Set[str] = set()
+        self._step = math.radians(cell_degrees / 2)
+
+        # Arc geometry by slot: endpoints, unit normal of the great circle
+        # (zero for same-port/antipodal lanes) and slot -> lane id
+        self._a = np.zeros((0, 3))
+        self._b = np.zeros((0, 3))
+        self._normal = np.zeros((0, 3))
+        self._slot_ids: List[Optional[str]] = []
+        self._free: List[int] = []
+
+        self._cells: Dict[int, List[int]] = {}
+        self._cell_arrays: Dict[int, np.ndarray] = {}
+        self.queries = 0
+        self.candidates_checked = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], **kwargs) -> "LaneIndex":
+        """Build from routes rows (id, origin_port, destination_port, ...)"""
+        index = cls(**kwargs)
+        index.add_lanes(rows)
+        return index
+
+    def _add_port(self, name: str) -> Optional[Vector]:
+        if name in self._port_vectors:
+            return self._port_vectors[name]
+        location = self.locate(name)
+        vector = None
+        if location is not None:
+            key = port_key(name)
+            if key not in self.port_names:
+                self.port_names[key] = name
+                self.ports.add(key, *location)
+            vector = to_vector(*location)
+        self._port_vectors[name] = vector
+        return vector
+
+    def _allocate(self, count: int) -> List[int]:
+        slots = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        missing = count - len(slots)
+        if missing:
+            first = len(self._slot_ids)
+            self._slot_ids.extend([None] * missing)
+            if len(self._slot_ids) > len(self._a):
+                capacity = max(len(self._slot_ids), 2 * len(self._a), 64)
+                for name in ("_a", "_b", "_normal"):
+                    grown = np.zeros((capacity, 3))
+                    grown[:len(getattr(self, name))] = getattr(self, name)
+                    setattr(self, name, grown)
+            slots.extend(range(first, first + missing))
+        return slots
+
+    def add_lane(self, row: Dict[str, Any]) -> bool:
+        """Add (or replace) a lane; returns False if a port has no location"""
+        return self.add_lanes([row]) == 1
+
+    def add_lanes(self, rows: Iterable[Dict[str, Any]], chunk_size: int = 20000) -> int:
+        """Add (or replace) lanes in vectorized chunks; returns how many were located"""
+        located = []
+        count = 0
+        for row in rows:
+            lane_id = str(row["id"]) if str(row["id"]).startswith("route-") else f"route-{row['id']}"
+            self.remove_lane(lane_id)
+            a = self._add_port(row["origin_port"])
+            b = self._add_port(row["destination_port"])
+            if a is None or b is None:
+                self.unlocated.add(lane_id)
+                continue
+            located.append((lane_id, row, a, b))
+            if len(located) >= chunk_size:
+                count += self._add_located(located)
+                located = []
+        if located:
+            count += self._add_located(located)
+        return count
+
+    def _add_located(self, located: List[Tuple[str, Dict[str, Any], Vector, Vector]]) -> int:
+        slots = np.array(self._allocate(len(located)), dtype=np.int64)
+        a = np.array([item[2] for item in located])
+        b = np.array([item[3] for item in located])
+        normal = np.cross(a, b)
+        size = np.linalg.norm(normal, axis=1)
+        valid = size > 1e-9
+        normal[valid] /= size[valid, None]
+        normal[~valid] = 0.0
+        self._a[slots], self._b[slots], self._normal[slots] = a, b, normal
+
+        for (lane_id, row, _, _), slot in zip(located, slots.tolist()):
+            self.lanes[lane_id] = _Lane(lane_id, slot, row)
+            self._slot_ids[slot] = lane_id
+
+        # Register slots cell by cell rather than lane by lane
+        lane, cells = self._arc_cells(a, b)
+        order = np.argsort(cells, kind="stable")
+        cells, members = cells[order], slots[lane[order]]
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        for cell, group in zip(cells[starts].tolist(), np.split(members, starts[1:])):
+            self._cells.setdefault(cell, []).extend(group.tolist())
+            self._cell_arrays.pop(cell, None)
+        return len(located)
+
+    def _arc_cells(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distinct (lane, cell) pairs for the arcs a[i] -> b[i], from points
+        every half cell along each arc; returned as two arrays, by lane
+        """
+        length = np.arctan2(np.linalg.norm(np.cross(a, b), axis=1), np.einsum("ij,ij->i", a, b))
+        steps = np.maximum(1, np.ceil(length / self._step)).astype(np.int64)
+        lane = np.repeat(np.arange(len(a)), steps + 1)
+        starts = np.cumsum(steps + 1) - (steps + 1)
+        fraction = (np.arange(len(lane)) - starts[lane]) / steps[lane]
+
+        # Spherical interpolation; arcs too short or too close to antipodal
+        # for it fall back to linear interpolation, normalized below
+        theta = length[lane]
+        sin_theta = np.sin(theta)
+        stable = np.abs(sin_theta) > 1e-9
+        wa = np.where(stable, np.sin((1 - fraction) * theta) / np.where(stable, sin_theta, 1), 1 - fraction)
+        wb = np.where(stable, np.sin(fraction * theta) / np.where(stable, sin_theta, 1), fraction)
+        points = wa[:, None] * a[lane] + wb[:, None] * b[lane]
+        points /= np.maximum(np.linalg.norm(points, axis=1), 1e-12)[:, None]
+
+        lng = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+        lat = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+        cell_degrees = self.grid.cell_degrees
+        column = np.floor((lng + 180.0) / cell_degrees).astype(np.int64) % self.grid.columns
+        row = np.clip(np.floor((lat + 90.0) / cell_degrees).astype(np.int64), 0, self.grid.rows - 1)
+
+        # Consecutive samples mostly share a cell: drop those repeats, then
+        # sort so the rare re-entered cell is adjacent to its duplicate
+        total_cells = self.grid.rows * self.grid.columns
+        pairs = lane * total_cells + row * self.grid.columns + column
+        pairs = np.sort(pairs[np.r_[True, pairs[1:] != pairs[:-1]]])
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+        return pairs // total_cells, pairs % total_cells
+
+    def remove_lane(self, lane_id: str):
+        self.unlocated.discard(lane_id)
+        lane = self.lanes.pop(lane_id, None)
+        if lane is None:
+            return
+        slot = lane.slot
+        _, cells = self._arc_cells(self._a[slot:slot + 1], self._b[slot:slot + 1])
+        for cell in cells.tolist():
+            members = self._cells[cell]
+            members.remove(slot)
+            self._cell_arrays.pop(cell, None)
+            if not members:
+                del self._cells[cell]
+        self._slot_ids[slot] = None
+        self._free.append(slot)
+
+    def _cell_array(self, cell: int) -> Optional[np.ndarray]:
+        array = self._cell_arrays.get(cell)
+        if array is None:
+            members = self._cells.get(cell)
+            if not members:
+                return None
+            array = self._cell_arrays[cell] = np.array(members, dtype=np.int64)
+        return array
+
+    def _distances(self, slots: np.ndarray, p: np.ndarray) -> np.ndarray:
+        """Central angle from p to the nearest point of each slot's arc"""
+        a, b, n = self._a[slots], self._b[slots], self._normal[slots]
+        offset = n @ p
+        # Foot of the perpendicular on the great circle, and whether it lies on the arc
+        foot = p - offset[:, None] * n
+        inside = (np.einsum("ij,ij->i", np.cross(a, foot), n) >= 0) \
+            & (np.einsum("ij,ij->i", np.cross(foot, b), n) >= 0) \
+            & (np.linalg.norm(foot, axis=1) > 1e-12) \
+            & (np.abs(n).sum(axis=1) > 0)
+        to_arc = np.abs(np.arcsin(np.clip(offset, -1.0, 1.0)))
+        to_ends = np.minimum(_angles(p, a), _angles(p, b))
+        return np.where(inside, to_arc, to_ends)
+
+    def lanes_near(self, lng: float, lat: float, radius_km: float) -> List[Tuple[str, float]]:
+        """(lane_id, distance_km) of lanes passing within radius_km, nearest first"""
+        angle = radius_km / EARTH_RADIUS_KM
+        arrays = [
+            array for array in (self._cell_array(cell) for cell in self.grid.cells_within(lng, lat, angle + self._step))
+            if array is not None
+        ]
+        self.queries += 1
+        if not arrays:
+            return []
+        slots = np.unique(np.concatenate(arrays))
+        self.candidates_checked += len(slots)
+
+        distances = self._distances(slots, np.array(to_vector(lng, lat)))
+        within = np.nonzero(distances <= angle)[0]
+        within = within[np.argsort(distances[within], kind="stable")]
+        return [(self._slot_ids[slot], float(distance) * EARTH_RADIUS_KM)
+                for slot, distance in zip(slots[within].tolist(), distances[within].tolist())]
+
+    def ports_near(self, lng: float, lat: float, radius_km: float,
+                   limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(port name, distance_km) within radius_km, nearest first"""
+        return [(self.port_names[key], distance) for key, distance in self.ports.near(lng, lat, radius_km, limit)]
+
+    def describe(self, lane_id: str) -> Dict[str, Any]:
+        """A lane in the /api/routes representation"""
+        lane = self.lanes[lane_id]
+        return {
+            "id": lane_id,
+            "origin": lane.origin,
+            "destination": lane.destination,
+            "status": lane.status,
+            "estimated_delay": lane.delay_hours,
+            "risk_score": lane.risk_score,
+        }
+
+    def at_risk(self, disruptions: Iterable[Dict[str, Any]], radius_km: float,
+                min_severity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Routes passing within radius_km of any of the disruptions, most
+        severe and closest first, each with the disruptions that touch it
+        """
+        threshold = SEVERITY_RANK.get(min_severity, 0) if min_severity else 0
+        hits: Dict[str, List[Dict[str, Any]]] = {}
+        for disruption in disruptions:
+            location = disruption.get("location")
+            rank = SEVERITY_RANK.get(disruption.get("severity"), 0)
+            if not location or rank < threshold:
+                continue
+            for lane_id, distance in self.lanes_near(location[0], location[1], radius_km):
+                hits.setdefault(lane_id, []).append({
+                    "id": disruption.get("id"),
+                    "type": disruption.get("type"),
+                    "severity": disruption.get("severity"),
+                    "locationName": disruption.get("locationName"),
+                    "distance_km": round(distance, 1),
+                })
+
+        results = []
+        for lane_id, touching in hits.items():
+            touching.sort(key=lambda d: d["distance_km"])
+            worst = max(touching, key=lambda d: SEVERITY_RANK.get(d["severity"], 0))
+            results.append({
+                **self.describe(lane_id),
+                "max_severity": worst["severity"],
+                "min_distance_km": touching[0]["distance_km"],
+                "disruptions": touching,
+            })
+        results.sort(key=lambda r: (-SEVERITY_RANK.get(r["max_severity"], 0), r["min_distance_km"], -r["risk_score"]))
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = sum(len(slots) for slots in self._cells.values())
+        return {
+            "lanes": len(self.lanes),
+            "unlocated_lanes": len(self.unlocated),
+            "ports": len(self.ports),
+            "cell_degrees": self.grid.cell_degrees,
+            "occupied_cells": len(self._cells),
+            "cell_entries": entries,
+            "queries": self.queries,
+            "avg_candidates_per_query": round(self.candidates_checked / self.queries, 1) if self.queries else 0.0,
+        }
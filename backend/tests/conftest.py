@@ -0,0 +1,23 @@
+"""
+Shared fixtures for the backend tests
+Tests import backend modules the way main.py does (flat, from backend/).
+Database tests need TEST_DATABASE_URL pointing at a throwaway PostgreSQL
+database (postgresql+asyncpg://...); they are skipped without it.
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def database_url() -> str:
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    return url
@@ -0,0 +1,152 @@
+"""
+AlertStore: counters, eviction, archiving and id reservation across restarts
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from agents.alert_store import AlertArchive, AlertStore
+
+
+class MemoryArchive:
+    """AlertArchive's interface over dicts (stands in for the alerts tables)"""
+
+    def __init__(self):
+        self.rows = {}
+        self.last_seq = 0
+        self.fail = False
+
+    async def save(self, entries):
+        if self.fail:
+            raise ConnectionError("archive unavailable")
+        for seq, alert in entries:
+            self.rows[seq] = dict(alert)
+
+    async def get(self, alert_id):
+        return next((a for a in self.rows.values() if a["id"] == alert_id), None)
+
+    async def max_sequence(self):
+        return max(self.rows, default=0)
+
+    async def reserve_sequence(self, at_least, block):
+        self.last_seq = max(self.last_seq, at_least) + block
+        return self.last_seq
+
+
+def _add(store: AlertStore, status: str = "pending", severity: str = "low"):
+    alert = {"id": store.next_id(), "timestamp": datetime.utcnow().isoformat(),
+             "status": status, "severity": severity}
+    store.add(alert)
+    return alert
+
+
+def test_status_counts_only_cover_held_alerts():
+    async def scenario():
+        store = AlertStore(capacity=2)
+        first = _add(store)
+        store.set_status(first["id"], "active")
+        _add(store)
+        _add(store)  # evicts the active alert
+        assert store.status_counts["active"] == 0
+        assert store.status_counts["pending"] == 2
+        assert sum(store.severity_counts.values()) == 3
+        assert store.get_stats()["by_status"] == {"pending": 2}
+
+    asyncio.run(scenario())
+
+
+def test_lookup_finds_alerts_waiting_for_the_archive():
+    async def scenario():
+        archive = MemoryArchive()
+        store = AlertStore(capacity=1, archive_batch_size=100)
+        await store.attach_archive(archive)
+        evicted = _add(store)
+        _add(store)
+        assert store.get(evicted["id"]) is None
+        assert await store.lookup(evicted["id"]) is evicted
+
+        assert await store.flush_archive()
+        assert (await store.lookup(evicted["id"]))["id"] == evicted["id"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_archive_write_keeps_alerts_in_order():
+    async def scenario():
+        archive = MemoryArchive()
+        store = AlertStore(capacity=3, archive_batch_size=100)
+        await store.attach_archive(archive)
+        alerts = [_add(store) for _ in range(6)]
+        archive.fail = True
+        assert not await store.flush_archive()
+        assert store.get_stats()["pending_archive"] == 3
+        assert await store.lookup(alerts[0]["id"]) is alerts[0]
+
+        archive.fail = False
+        assert await store.flush_archive()
+        assert sorted(archive.rows) == [1, 2, 3]
+
+    asyncio.run(scenario())
+
+
+def test_restart_never_reuses_ids_of_unarchived_alerts():
+    async def scenario():
+        archive = MemoryArchive()
+        store = AlertStore(capacity=10, sequence_block=4)
+        await store.attach_archive(archive)
+        used = {_add(store)["id"] for _ in range(7)}
+        await asyncio.sleep(0)  # let the background reservation run
+        # Crash: nothing archived, only the reservations persisted
+        restarted = AlertStore(capacity=10, sequence_block=4)
+        await restarted.attach_archive(archive)
+        assert _add(restarted)["id"] not in used
+
+    asyncio.run(scenario())
+
+
+def test_close_archives_held_alerts_and_sequence():
+    async def scenario():
+        archive = MemoryArchive()
+        store = AlertStore(capacity=2, archive_batch_size=100)
+        await store.attach_archive(archive)
+        alerts = [_add(store) for _ in range(3)]
+        store.set_status(alerts[-1]["id"], "active")
+        assert await store.close()
+        assert sorted(archive.rows) == [1, 2, 3]
+        assert archive.rows[3]["status"] == "active"
+
+        restarted = AlertStore()
+        await restarted.attach_archive(archive)
+        assert _add(restarted)["id"] not in {a["id"] for a in alerts}
+
+    asyncio.run(scenario())
+
+
+def test_archive_upserts_and_reserves_in_postgres(database_url):
+    from database import Base
+    import models
+
+    async def scenario():
+        engine = create_async_engine(database_url)
+        tables = [Base.metadata.tables["alerts"], Base.metadata.tables["alert_sequence"]]
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: Base.metadata.drop_all(sync, tables=tables))
+            await conn.run_sync(lambda sync: Base.metadata.create_all(sync, tables=tables))
+        try:
+            archive = AlertArchive(async_sessionmaker(engine, expire_on_commit=False))
+            alert = {"id": "alert-1", "timestamp": datetime.utcnow().isoformat(),
+                     "status": "pending", "severity": "high"}
+            await archive.save([(1, alert)])
+            await archive.save([(1, dict(alert, status="resolved"))])
+            assert (await archive.get("alert-1"))["status"] == "resolved"
+            assert await archive.max_sequence() == 1
+
+            assert await archive.reserve_sequence(5, 10) == 15
+            assert await archive.reserve_sequence(3, 10) == 25
+            assert await archive.reserve_sequence(40, 0) == 40
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
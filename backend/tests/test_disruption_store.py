@@ -0,0 +1,60 @@
+"""
+DisruptionStore: `since` queries stay correct when timestamps are missing
+or arrive out of order, and the shared endpoint body pages with a cursor
+"""
+
+import pytest
+from fastapi import HTTPException, Response
+
+from disruption_store import DisruptionStore, disruptions_page
+
+
+def _disruption(name: str, timestamp=None, severity: str = "high"):
+    disruption = {"id": name, "severity": severity, "type": "Port Congestion", "locationName": name}
+    if timestamp is not None:
+        disruption["timestamp"] = timestamp
+    return disruption
+
+
+def test_missing_timestamp_does_not_hide_later_disruptions():
+    store = DisruptionStore(capacity=8)
+    store.add(_disruption("a", "2024-01-01T00:00:00Z"))
+    store.add(_disruption("b"))  # no timestamp: filed at the time it was added
+    store.add(_disruption("c", "2099-01-01T00:00:00Z"))
+    store.add(_disruption("d", "2099-01-02T00:00:00Z"))
+
+    results, _ = store.query(since="2098-12-31T00:00:00Z")
+    assert [d["id"] for d in results] == ["d", "c"]
+    results, _ = store.query(since="2023-12-31T00:00:00Z")
+    assert [d["id"] for d in results] == ["d", "c", "b", "a"]
+
+
+def test_out_of_order_timestamps_keep_since_queries_sorted():
+    store = DisruptionStore(capacity=4)
+    for name, day in (("a", 1), ("b", 3), ("c", 2), ("d", 4), ("e", 5)):
+        store.add(_disruption(name, f"2024-01-0{day}T00:00:00Z"))
+
+    # "c" is filed at "b"'s time, so it still shows up after day 2
+    results, _ = store.query(since="2024-01-02T12:00:00Z")
+    assert [d["id"] for d in results] == ["e", "d", "c", "b"]
+    results, _ = store.query(since="2024-01-04T00:00:00Z")
+    assert [d["id"] for d in results] == ["e", "d"]
+
+
+def test_disruptions_page_sets_the_next_cursor():
+    store = DisruptionStore(capacity=10)
+    for i in range(5):
+        store.add(_disruption(f"p{i}", "2024-01-01T00:00:00Z", severity="high" if i % 2 else "low"))
+
+    response = Response()
+    page = disruptions_page(store, response, severity="low", limit=2)
+    assert [d["id"] for d in page] == ["p4", "p2"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = Response()
+    page = disruptions_page(store, response, severity="low", cursor=cursor, limit=2)
+    assert [d["id"] for d in page] == ["p0"]
+    assert "X-Next-Cursor" not in response.headers
+
+    with pytest.raises(HTTPException):
+        disruptions_page(store, Response(), cursor="not-a-number")
@@ -0,0 +1,72 @@
+"""
+GeminiResponseCache: single-flight loads survive the starting caller being
+cancelled, and callers never share the cached object
+"""
+
+import asyncio
+
+import pytest
+
+from agents.gemini_cache import GeminiResponseCache
+
+
+def test_cancelling_the_first_caller_does_not_cancel_followers():
+    async def scenario():
+        cache = GeminiResponseCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return {"confidence": 0.9}
+
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await follower == {"confidence": 0.9}
+        assert leader.cancelled()
+        assert cache.get_stats()["coalesced"] == 1
+        assert cache.get("k") == {"confidence": 0.9}
+
+    asyncio.run(scenario())
+
+
+def test_callers_get_copies_of_cached_values():
+    async def scenario():
+        cache = GeminiResponseCache()
+
+        async def compute():
+            return {"actions": ["reroute"]}
+
+        first = await cache.get_or_compute("k", compute)
+        first["actions"].append("mutated")
+        second = await cache.get_or_compute("k", compute)
+        assert second == {"actions": ["reroute"]}
+        assert second is not await cache.get_or_compute("k", compute)
+
+    asyncio.run(scenario())
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = GeminiResponseCache()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model down")
+
+        results = await asyncio.gather(cache.get_or_compute("k", failing), cache.get_or_compute("k", failing),
+                                       return_exceptions=True)
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        assert len(calls) == 1
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("k", failing)
+        assert len(calls) == 2 and cache.get_stats()["errors"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+"""
+TokenBucket: requests above the capacity are charged in full
+"""
+
+import asyncio
+
+from agents.model_scheduler import TokenBucket
+
+
+def test_oversized_request_puts_the_bucket_in_debt():
+    async def scenario():
+        bucket = TokenBucket(rate=100.0, capacity=10)
+        assert await bucket.acquire(30) < 0.05  # a full bucket lets it through
+        assert bucket.tokens < 0
+        # The next request waits for the 20-token excess to be paid back
+        assert await bucket.acquire(1) >= 0.15
+
+    asyncio.run(scenario())
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    async def scenario():
+        bucket = TokenBucket(rate=100.0, capacity=10)
+        await bucket.acquire(10)
+        assert await bucket.acquire(50) >= 0.08
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+"""
+AgentPipeline workers: a failing handler, downstream put or on_complete
+costs only that item, and stop() still shuts the workers down
+"""
+
+import asyncio
+
+from agents.pipeline import AgentPipeline, LocalBrokerTransport, Stage
+
+
+async def _run(pipeline: AgentPipeline, items):
+    await pipeline.start()
+    for item in items:
+        await pipeline.submit(item)
+    await pipeline.stop(drain=True, timeout=1)
+
+
+def test_handler_cancellation_keeps_the_worker_alive():
+    async def handler(item):
+        if item == "cancel":
+            raise asyncio.CancelledError()
+        return None
+
+    async def scenario():
+        pipeline = AgentPipeline([Stage("only", handler, workers=1)])
+        await _run(pipeline, ["cancel", "ok", "cancel", "ok"])
+        stats = pipeline.get_status()["stages"]["only"]
+        assert stats["failed"] == 2
+        assert stats["dropped"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_forward_failure_is_counted_and_later_items_flow():
+    async def first(item):
+        if item != "bad":
+            return item
+        # Circular payloads can't be serialized, so the broker put raises
+        looped = {}
+        looped["self"] = looped
+        return looped
+
+    async def second(item):
+        return item
+
+    async def scenario():
+        pipeline = AgentPipeline([Stage("first", first), Stage("second", second)],
+                                 transport=LocalBrokerTransport())
+        done = []
+
+        async def on_complete(result):
+            done.append(result)
+
+        pipeline.on_complete = on_complete
+        await _run(pipeline, ["bad", "good"])
+        stages = pipeline.get_status()["stages"]
+        assert stages["first"]["forward_failed"] == 1
+        assert done == ["good"]
+
+    asyncio.run(scenario())
+
+
+def test_on_complete_failure_is_counted_and_later_items_complete():
+    async def handler(item):
+        return item
+
+    async def scenario():
+        pipeline = AgentPipeline([Stage("only", handler)])
+        done = []
+
+        async def on_complete(result):
+            if result == "boom":
+                raise RuntimeError("sink down")
+            done.append(result)
+
+        pipeline.on_complete = on_complete
+        await _run(pipeline, ["boom", "a", "b"])
+        assert pipeline.get_status()["stages"]["only"]["complete_failed"] == 1
+        assert done == ["a", "b"]
+        assert pipeline.completed == 3
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_workers_blocked_on_a_full_queue():
+    async def first(item):
+        return item
+
+    async def stuck(item):
+        await asyncio.Event().wait()
+
+    async def scenario():
+        pipeline = AgentPipeline([Stage("first", first), Stage("stuck", stuck, queue_size=1)])
+        await pipeline.start()
+        for i in range(4):
+            pipeline.submit_nowait(i)
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(pipeline.stop(drain=False), 2)
+        assert not pipeline.running
+
+    asyncio.run(scenario())
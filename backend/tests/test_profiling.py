@@ -0,0 +1,45 @@
+"""
+SamplingProfiler: a capture started while the sampler thread is winding
+down still gets sampled
+"""
+
+import threading
+import time
+
+from profiling import SamplingProfiler
+
+
+async def _idle():
+    pass
+
+
+def test_capture_started_while_the_sampler_exits_is_sampled(monkeypatch):
+    exited_loop = threading.Event()
+    release = threading.Event()
+
+    class SlowExitThread(threading.Thread):
+        """Stays alive for a while after its target returns"""
+
+        def run(self):
+            super().run()
+            exited_loop.set()
+            release.wait(2)
+
+    monkeypatch.setattr(threading, "Thread", SlowExitThread)
+    profiler = SamplingProfiler(interval=0.001)
+    roots = [_idle(), _idle()]
+    try:
+        first = profiler.start("first", "test", roots[0])
+        time.sleep(0.01)
+        profiler.finish(first)
+        assert exited_loop.wait(1)
+
+        second = profiler.start("second", "test", roots[1])
+        time.sleep(0.05)
+        profiler.finish(second)
+        assert first.samples > 0
+        assert second.samples > 0
+    finally:
+        release.set()
+        for root in roots:
+            root.close()
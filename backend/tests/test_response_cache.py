@@ -0,0 +1,96 @@
+"""
+ResponseCache: loads overtaken by an invalidation are not stored, and
+writes to a watched table invalidate only once they commit
+"""
+
+import asyncio
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import Session
+
+from response_cache import ResponseCache
+
+
+def test_invalidation_during_load_discards_the_result():
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        versions = iter(["stale", "fresh"])
+
+        async def loader():
+            value = next(versions)
+            if value == "stale":
+                cache.invalidate("routes")  # a write commits mid-load
+            return value
+
+        assert (await cache.get_or_load("routes", loader)).body == b'"stale"'
+        assert (await cache.get_or_load("routes", loader)).body == b'"fresh"'
+        assert cache.get_stats()["discarded_loads"] == 1
+        assert cache.get_stats()["misses"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_all_also_discards_running_loads():
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+
+        async def loader():
+            cache.invalidate()
+            return 1
+
+        await cache.get_or_load("routes", loader)
+        assert cache.get_stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+def _routes_engine():
+    from database import Base
+    from models import Route
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Route.__table__])
+    return engine
+
+
+def test_writes_invalidate_on_commit_only():
+    from models import Route
+
+    engine = _routes_engine()
+    cache = ResponseCache(ttl=60)
+    cache.invalidate_on_commit(engine, Route.__table__, "routes")
+
+    with Session(engine) as session:
+        session.add(Route(origin_port="A", destination_port="B"))
+        session.flush()
+        assert cache._generation("routes") == (0, 0)  # flushed, not committed
+        session.rollback()
+    assert cache._generation("routes") == (0, 0)
+
+    with Session(engine) as session:
+        session.add(Route(origin_port="A", destination_port="B"))
+        session.commit()
+    assert cache._generation("routes") == (0, 1)
+
+
+def test_core_and_bulk_writes_invalidate():
+    from models import Route
+
+    engine = _routes_engine()
+    cache = ResponseCache(ttl=60)
+    cache.invalidate_on_commit(engine, Route.__table__, "routes")
+
+    with engine.begin() as conn:
+        conn.execute(insert(Route.__table__), [{"origin_port": "A", "destination_port": "B"}])
+    assert cache._generation("routes") == (0, 1)
+
+    with Session(engine) as session:
+        session.execute(update(Route).values(risk_score=0.5))
+        session.commit()
+    assert cache._generation("routes") == (0, 2)
+
+    # Reads don't count as writes
+    with Session(engine) as session:
+        session.query(Route).all()
+        session.commit()
+    assert cache._generation("routes") == (0, 2)
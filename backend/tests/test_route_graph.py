@@ -0,0 +1,135 @@
+"""
+RouteGraph: Yen's k-shortest paths against brute force (including parallel
+lanes between the same ports) and cache invalidation on graph changes
+"""
+
+import random
+
+from agents.route_graph import RouteGraph
+
+
+def _random_rows(rng: random.Random, ports: int, lanes: int):
+    names = [f"P{i}" for i in range(ports)]
+    rows = []
+    for i in range(lanes):
+        u, v = rng.sample(names, 2)
+        rows.append({
+            "id": i + 1,
+            "origin_port": u,
+            "destination_port": v,
+            "current_status": "normal",
+            "estimated_delay_hours": rng.randint(0, 40),
+            "risk_score": round(rng.random(), 2),
+        })
+    return rows
+
+
+def _brute_force_costs(graph: RouteGraph, source: int, target: int, excluded=None):
+    """Costs of every loopless path, cheapest first"""
+    costs = []
+
+    def walk(node, visited, cost):
+        if node == target:
+            costs.append(cost)
+            return
+        for neighbor, lane_id in graph._adjacency[node]:
+            if neighbor in visited or lane_id == excluded:
+                continue
+            walk(neighbor, visited | {neighbor}, cost + graph.lanes[lane_id].weight)
+
+    walk(source, {source}, 0.0)
+    return sorted(costs)
+
+
+def _assert_matches_brute_force(graph: RouteGraph, k: int, excluded=None):
+    for source in range(len(graph.port_names)):
+        for target in range(len(graph.port_names)):
+            if source == target:
+                continue
+            found = graph.alternatives(graph.port_names[source], graph.port_names[target], k, exclude_lane=excluded)
+            expected = _brute_force_costs(graph, source, target, excluded)[:k]
+            assert [round(p.cost, 6) for p in found] == [round(c, 6) for c in expected]
+            for path in found:
+                assert len(set(path.nodes)) == len(path.nodes)
+                assert excluded not in path.lanes
+
+
+def test_k_shortest_paths_match_brute_force_with_parallel_lanes():
+    rng = random.Random(7)
+    for _ in range(25):
+        # Few ports, many lanes: plenty of duplicate and reversed port pairs
+        rows = _random_rows(rng, ports=6, lanes=14)
+        graph = RouteGraph.from_rows(rows)
+        _assert_matches_brute_force(graph, k=4)
+        _assert_matches_brute_force(graph, k=3, excluded=f"route-{rng.randint(1, len(rows))}")
+
+
+def test_parallel_lane_is_a_valid_alternative():
+    rows = [
+        {"id": 1, "origin_port": "A", "destination_port": "B", "estimated_delay_hours": 0, "risk_score": 0},
+        {"id": 2, "origin_port": "A", "destination_port": "B", "estimated_delay_hours": 10, "risk_score": 0},
+        {"id": 3, "origin_port": "B", "destination_port": "C", "estimated_delay_hours": 0, "risk_score": 0},
+        {"id": 4, "origin_port": "C", "destination_port": "B", "estimated_delay_hours": 5, "risk_score": 0},
+    ]
+    graph = RouteGraph.from_rows(rows)
+    paths = graph.alternatives("A", "C", k=4)
+    assert [p.lanes for p in paths] == [
+        ["route-1", "route-3"], ["route-1", "route-4"], ["route-2", "route-3"], ["route-2", "route-4"]
+    ]
+
+
+def _chain_graph() -> RouteGraph:
+    # A-B-D is the cheap way round, A-C-D the detour
+    rows = [
+        {"id": 1, "origin_port": "A", "destination_port": "B", "estimated_delay_hours": 0, "risk_score": 0},
+        {"id": 2, "origin_port": "B", "destination_port": "D", "estimated_delay_hours": 0, "risk_score": 0},
+        {"id": 3, "origin_port": "A", "destination_port": "C", "estimated_delay_hours": 10, "risk_score": 0},
+        {"id": 4, "origin_port": "C", "destination_port": "D", "estimated_delay_hours": 10, "risk_score": 0},
+    ]
+    return RouteGraph.from_rows(rows)
+
+
+def test_block_and_unblock_invalidate_cached_paths():
+    graph = _chain_graph()
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-1", "route-2"]
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-1", "route-2"]
+    assert graph.cache_hits == 1
+
+    assert graph.block_port("B")
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-3", "route-4"]
+
+    graph.unblock_port("B")
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-1", "route-2"]
+    assert not graph.block_port("Nowhere")
+
+
+def test_update_lane_invalidates_in_both_directions():
+    graph = _chain_graph()
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-1", "route-2"]
+
+    graph.update_lane("route-2", delay_hours=100)  # worse: evicts entries using it
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-3", "route-4"]
+
+    graph.update_lane("route-2", delay_hours=0)  # cheaper again: clears the cache
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-1", "route-2"]
+
+    graph.remove_lane("route-1")
+    assert graph.alternatives("A", "D", k=1)[0].lanes == ["route-3", "route-4"]
+
+
+def test_block_disruption_reports_a_block_on_a_port_without_lanes():
+    from agents.optimization_agent import OptimizationAgent
+
+    agent = OptimizationAgent()
+    agent.route_graph = _chain_graph()
+    agent.route_graph.remove_lane("route-1")
+    agent.route_graph.remove_lane("route-2")
+
+    disruption = {"locationName": "B"}
+    blocked, lanes = agent.block_disruption(disruption)
+    assert blocked and lanes == []
+    assert agent.route_graph.blocked_ports == ["B"]
+
+    agent.release_disruption(disruption)
+    assert agent.route_graph.blocked_ports == []
+    assert agent.block_disruption({"locationName": "Nowhere"}) == (False, [])
@@ -0,0 +1,133 @@
+"""
+Bulk sensor ingestion: line splitting, NDJSON/CSV parsing, rejection
+reporting, batch boundaries and aborting with a batch in flight
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from sensor_ingest import IngestAborted, RowError, SensorIngestor, iter_lines
+
+
+class MemoryIngestor(SensorIngestor):
+    """SensorIngestor writing COPY batches to a list instead of the database"""
+
+    def __init__(self, batch_size: int = 2, write_delay: float = 0.0, fail_writes: bool = False):
+        super().__init__(engine=None, session_maker=None, batch_size=batch_size)
+        self.written = []
+        self.write_delay = write_delay
+        self.fail_writes = fail_writes
+
+    async def _copy_batch(self, records):
+        await asyncio.sleep(self.write_delay)
+        if self.fail_writes:
+            raise ConnectionError("database went away")
+        self.written.append(list(records))
+
+
+async def _chunks(*parts, error: Exception = None):
+    for part in parts:
+        await asyncio.sleep(0)
+        yield part
+    if error is not None:
+        raise error
+
+
+def _reading(sensor_id: str = "s1", **extra) -> str:
+    return json.dumps({"sensor_id": sensor_id, "location": [10.0, 20.0], "temperature": 21.5, **extra})
+
+
+async def _lines(*parts, max_line_bytes: int = 64):
+    return [line async for line in iter_lines(_chunks(*parts), max_line_bytes=max_line_bytes)]
+
+
+def test_iter_lines_splits_across_chunk_boundaries():
+    lines = asyncio.run(_lines(b"ab", b"c\r\nde", b"f\n\n", b"last"))
+    assert lines == ["abc", "def", "", "last"]
+
+
+def test_iter_lines_rejects_overlong_and_invalid_lines():
+    lines = asyncio.run(_lines(b"x" * 40, b"x" * 40, b"x" * 40 + b"\nok\n\xff\xfe\nfine", max_line_bytes=64))
+    assert isinstance(lines[0], RowError) and "longer than 64" in str(lines[0])
+    assert lines[1] == "ok"
+    assert isinstance(lines[2], RowError) and "UTF-8" in str(lines[2])
+    assert lines[3] == "fine"
+
+
+def test_ndjson_rows_are_validated_and_rejections_reported():
+    body = "\n".join([
+        _reading("s1"),
+        "{not json",
+        json.dumps({"location": [0, 0]}),
+        "",
+        _reading("s2", location=[500, 0]),
+        _reading("s3"),
+    ]).encode()
+
+    ingestor = MemoryIngestor(batch_size=10)
+    report = asyncio.run(ingestor.ingest(_chunks(body[:7], body[7:]), fmt="ndjson"))
+    assert report["accepted"] == 2
+    assert report["rejected"] == 3
+    assert [e["line"] for e in report["errors"]] == [2, 3, 5]
+    assert [r[0] for batch in ingestor.written for r in batch] == ["s1", "s3"]
+
+
+def test_csv_rows_use_the_header():
+    body = (b"sensor_id,timestamp,lng,lat,temperature,delay_minutes\n"
+            b"s1,2024-01-01T00:00:00Z,10,20,21.5,3\n"
+            b"s2,,10,20\n"
+            b"s3,2024-01-01T00:00:00Z,10,95,,\n")
+    ingestor = MemoryIngestor(batch_size=10)
+    report = asyncio.run(ingestor.ingest(_chunks(body), fmt="csv"))
+    assert report["accepted"] == 1
+    assert report["rejected"] == 2
+    record = ingestor.written[0][0]
+    assert record[0] == "s1" and json.loads(record[2]) == [10.0, 20.0] and record[4] == 3
+
+    with pytest.raises(IngestAborted, match="header missing"):
+        asyncio.run(MemoryIngestor().ingest(_chunks(b"sensor_id,lat\ns1,1\n"), fmt="csv"))
+
+
+def test_batches_split_at_batch_size():
+    body = "\n".join(_reading(f"s{i}") for i in range(5)).encode()
+    ingestor = MemoryIngestor(batch_size=2)
+    seen = []
+
+    async def listener(records):
+        seen.append(len(records))
+
+    ingestor.batch_listeners.append(listener)
+    report = asyncio.run(ingestor.ingest(_chunks(body), fmt="ndjson"))
+    assert report["batches"] == 3
+    assert [len(batch) for batch in ingestor.written] == [2, 2, 1]
+    assert seen == [2, 2, 1]
+
+
+def test_parse_failure_finishes_the_batch_in_flight_and_reports_it():
+    body = ("\n".join(_reading(f"s{i}") for i in range(2)) + "\n").encode()
+
+    async def scenario():
+        ingestor = MemoryIngestor(batch_size=2, write_delay=0.05)
+        with pytest.raises(IngestAborted) as aborted:
+            await ingestor.ingest(_chunks(body, error=ValueError("malformed body")), fmt="ndjson")
+        assert aborted.value.report["accepted"] == 2
+        assert "2 rows already committed" in str(aborted.value)
+        assert len(ingestor.written) == 1
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_in_flight_is_retrieved_when_parsing_fails():
+    body = ("\n".join(_reading(f"s{i}") for i in range(2)) + "\n").encode()
+
+    async def scenario():
+        ingestor = MemoryIngestor(batch_size=2, write_delay=0.01, fail_writes=True)
+        with pytest.raises(IngestAborted) as aborted:
+            await ingestor.ingest(_chunks(body, error=ValueError("malformed body")), fmt="ndjson")
+        assert aborted.value.report["accepted"] == 0
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(scenario())
@@ -0,0 +1,128 @@
+"""
+Agent method benchmarks
+Each public method of the prediction, optimization and alert agents, run
+against seeded data: a synthetic port/lane graph, IoT readings and model
+contexts. Gemini is replaced by FakeGenerativeModel with no latency, so
+model-call numbers measure the cache and batching scheduler, not the API.
+Methods that simulate external work with a fixed sleep (inventory
+optimization) run for fewer iterations.
+"""
+
+import asyncio
+import random
+from itertools import cycle
+from typing import Any, Dict, List
+
+import generators
+from harness import measure, measure_async
+
+
+def create_agents(rng: random.Random, ports: int = 200, lanes_per_port: int = 3):
+    """Agents wired the way main.py does, with the lane graph built from seeded rows"""
+    from agents.alert_agent import AlertAgent
+    from agents.gemini_cache import FakeGenerativeModel
+    from agents.optimization_agent import OptimizationAgent
+    from agents.prediction_agent import PredictionAgent
+    from agents.route_graph import RouteGraph
+
+    port_list = generators.ports(rng, ports)
+    prediction_agent = PredictionAgent(model=FakeGenerativeModel())
+    optimization_agent = OptimizationAgent()
+    optimization_agent.route_graph = RouteGraph.from_rows(generators.route_rows(rng, port_list, lanes_per_port))
+    alert_agent = AlertAgent()
+    return prediction_agent, optimization_agent, alert_agent, port_list
+
+
+async def _prediction(agent, rng: random.Random, iterations: int) -> List[Dict[str, Any]]:
+    readings = generators.sensor_readings(rng, sensors=2000, count=50 * 500)
+    batches = cycle([readings[i:i + 500] for i in range(0, len(readings), 500)])
+    # Fresh contexts for every miss, so none is served from the cache
+    fresh = iter(generators.gemini_contexts(rng, 40 * iterations))
+    cached = generators.gemini_contexts(rng, 1)[0]
+    miss_iterations = max(3, iterations // 50)
+
+    async def concurrent_misses():
+        await asyncio.gather(*(agent.analyze_with_gemini(next(fresh)) for _ in range(32)))
+
+    return [
+        await measure_async("agents.prediction.analyze_satellite_data",
+                            lambda: agent.analyze_satellite_data(b"\0" * 1024), iterations),
+        await measure_async("agents.prediction.analyze_iot_data_500",
+                            lambda: agent.analyze_iot_data(next(batches)), iterations, items=500),
+        await measure_async("agents.prediction.analyze_with_gemini_cached",
+                            lambda: agent.analyze_with_gemini(cached), iterations),
+        # A lone miss waits out the scheduler's batching window
+        await measure_async("agents.prediction.analyze_with_gemini_miss",
+                            lambda: agent.analyze_with_gemini(next(fresh)), miss_iterations),
+        await measure_async("agents.prediction.analyze_with_gemini_miss_x32",
+                            concurrent_misses, miss_iterations, items=32),
+        await measure_async("agents.prediction.predict_disruption",
+                            lambda: agent.predict_disruption(sensor_data=next(batches)), iterations),
+    ]
+
+
+async def _optimization(agent, rng: random.Random, port_list, iterations: int) -> List[Dict[str, Any]]:
+    graph = agent.route_graph
+    lane_ids = list(graph.lanes)
+    affected = [rng.sample(lane_ids, 5) for _ in range(64)]
+    affected_sets = cycle(affected)
+    disruptions = cycle(generators.disruptions(rng, 64, port_list))
+    plan = {"alternative_routes": [], "inventory_optimization": {}}
+    prediction = {"affected_routes": affected[0], "affected_regions": ["west-coast"]}
+
+    def block_and_release():
+        disruption = next(disruptions)
+        agent.block_disruption(disruption)
+        agent.release_disruption(disruption)
+
+    return [
+        await measure_async("agents.optimization.calculate_alternative_routes_cold",
+                            lambda: agent.calculate_alternative_routes(next(affected_sets)),
+                            iterations, items=5, setup=graph.clear_cache),
+        await measure_async("agents.optimization.calculate_alternative_routes_cached",
+                            lambda: agent.calculate_alternative_routes(affected[0]), iterations, items=5),
+        measure("agents.optimization.block_and_release_disruption", block_and_release, iterations),
+        await measure_async("agents.optimization.optimize_inventory",
+                            lambda: agent.optimize_inventory(["west-coast"]), 3, warmup=0),
+        await measure_async("agents.optimization.calculate_optimization_score",
+                            lambda: agent.calculate_optimization_score(plan), iterations),
+        await measure_async("agents.optimization.optimize",
+                            lambda: agent.optimize(prediction), 3, warmup=0),
+    ]
+
+
+async def _alert(agent, rng: random.Random, port_list, iterations: int) -> List[Dict[str, Any]]:
+    disruptions = cycle(generators.disruptions(rng, 256, port_list))
+    plan = {"alternative_routes": [{"original_route": "route-1", "alternative_route": "route-2 > route-3"}]}
+    created = []
+
+    async def create():
+        created.append((await agent.create_alert(next(disruptions), plan))["id"])
+
+    alert_ids = cycle(created)
+    results = [
+        measure("agents.alert.calculate_severity", lambda: agent.calculate_severity(next(disruptions)), iterations),
+        await measure_async("agents.alert.identify_stakeholders",
+                            lambda: agent.identify_stakeholders(next(disruptions)), iterations),
+        await measure_async("agents.alert.create_alert", create, iterations),
+        await measure_async("agents.alert.process_alert",
+                            lambda: agent.process_alert(next(disruptions), plan), iterations),
+        await measure_async("agents.alert.track_resolution",
+                            lambda: agent.track_resolution(next(alert_ids)), iterations),
+        measure("agents.alert.update_alert_status",
+                lambda: agent.update_alert_status(next(alert_ids), "acknowledged"), iterations),
+    ]
+    # Deliver the queued digests so no background sends outlive the run
+    await agent.dispatcher.drain()
+    return results
+
+
+async def run(seed: int, quick: bool = False) -> List[Dict[str, Any]]:
+    iterations = 50 if quick else 500
+    rng = random.Random(seed)
+    prediction_agent, optimization_agent, alert_agent, port_list = create_agents(rng)
+
+    results = await _prediction(prediction_agent, rng, iterations)
+    results += await _optimization(optimization_agent, rng, port_list, iterations)
+    results += await _alert(alert_agent, rng, port_list, iterations)
+    return results
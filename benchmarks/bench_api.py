@@ -0,0 +1,105 @@
+"""
+API benchmarks
+Requests go through an in-process ASGI client (no sockets, no server), so
+the numbers cover routing, validation, the handlers and serialization.
+The app's lifespan is not run: /api/routes is served from its cache with
+the database loader replaced by seeded routes, and the sensor endpoints,
+which need PostgreSQL, are not covered.
+"""
+
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import generators
+from harness import measure_async
+
+
+async def _request(client: httpx.AsyncClient, path: str, params: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None, expect: int = 200) -> httpx.Response:
+    response = await client.get(path, params=params, headers=headers)
+    if response.status_code != expect:
+        raise RuntimeError(f"GET {path} returned {response.status_code}, expected {expect}")
+    return response
+
+
+async def _endpoint_benchmarks(prefix: str, client: httpx.AsyncClient, cases: List[Dict[str, Any]],
+                               iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    for case in cases:
+        results.append(await measure_async(
+            f"{prefix}.{case['name']}",
+            lambda case=case: _request(client, case["path"], case.get("params"), case.get("headers"), case.get("expect", 200)),
+            iterations,
+            warmup=5,
+            setup=case.get("setup")
+        ))
+    return results
+
+
+def _disruption_cases(events: List[Dict[str, Any]], first_page_cursor: Optional[str]) -> List[Dict[str, Any]]:
+    busiest = Counter(e["locationName"] for e in events).most_common(1)[0][0]
+    midpoint = events[len(events) // 2]["timestamp"]
+    cases = [
+        {"name": "disruptions", "path": "/api/disruptions"},
+        {"name": "disruptions_limit_500", "path": "/api/disruptions", "params": {"limit": 500}},
+        {"name": "disruptions_by_severity", "path": "/api/disruptions", "params": {"severity": "critical"}},
+        {"name": "disruptions_by_location", "path": "/api/disruptions", "params": {"locationName": busiest}},
+        {"name": "disruptions_since", "path": "/api/disruptions", "params": {"since": midpoint}},
+    ]
+    if first_page_cursor is not None:
+        cases.append({"name": "disruptions_next_page", "path": "/api/disruptions", "params": {"cursor": first_page_cursor}})
+    return cases
+
+
+async def run(seed: int, quick: bool = False) -> List[Dict[str, Any]]:
+    import main
+    import main_simple
+
+    iterations = 50 if quick else 300
+    rng = random.Random(seed)
+    port_list = generators.ports(rng, 60)
+    events = generators.disruptions(rng, 2 * main.disruptions_store.capacity, port_list)
+    rows = generators.route_rows(rng, port_list)
+    routes = generators.serialized_routes(rows)
+
+    for store in (main.disruptions_store, main_simple.disruptions_store):
+        for event in events:
+            store.add(dict(event))
+
+    async def load_routes():
+        return routes
+
+    # Stands in for the database query; the cache and ETag path are real
+    main.load_routes = load_routes
+
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        first_page = await _request(client, "/api/disruptions")
+        etag = (await _request(client, "/api/routes")).headers["etag"]
+        cases = [{"name": "health", "path": "/"}]
+        cases += _disruption_cases(events, first_page.headers.get("x-next-cursor"))
+        cases += [
+            {"name": "routes_cached", "path": "/api/routes"},
+            {"name": "routes_not_modified", "path": "/api/routes", "headers": {"If-None-Match": etag}, "expect": 304},
+            {"name": "routes_reload", "path": "/api/routes", "setup": lambda: main.routes_cache.invalidate("routes")},
+            {"name": "metrics", "path": "/api/metrics"},
+            {"name": "pipeline_status", "path": "/api/pipeline/status"},
+            {"name": "realtime_status", "path": "/api/realtime/status"},
+            {"name": "db_pool", "path": "/api/system/db-pool"},
+        ]
+        results += await _endpoint_benchmarks("api.main", client, cases, iterations)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main_simple.app), base_url="http://bench") as client:
+        first_page = await _request(client, "/api/disruptions")
+        cases = [{"name": "health", "path": "/"}]
+        cases += _disruption_cases(events, first_page.headers.get("x-next-cursor"))
+        cases += [
+            {"name": "routes", "path": "/api/routes"},
+            {"name": "metrics", "path": "/api/metrics"},
+        ]
+        results += await _endpoint_benchmarks("api.simple", client, cases, iterations)
+
+    return results
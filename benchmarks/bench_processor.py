@@ -0,0 +1,42 @@
+"""
+Satellite image processor benchmark
+SatelliteImageProcessor.process_batch over images from its own
+generate_synthetic_images, seeded through numpy's global generator. Results
+go to the in-memory publisher and images are written to a temporary
+directory. Needs the gpu-processor requirements (TensorFlow, OpenCV).
+"""
+
+import os
+import tempfile
+from itertools import cycle
+from typing import Any, Dict, List
+
+import numpy as np
+
+from harness import measure
+
+
+def run(seed: int, quick: bool = False) -> List[Dict[str, Any]]:
+    os.environ.setdefault("RESULT_PUBLISHER", "memory")
+    from image_sources import InMemoryImageSource
+    from process_images import SatelliteImageProcessor
+
+    # An empty source keeps construction from reaching Cloud Storage
+    processor = SatelliteImageProcessor(source=InMemoryImageSource({}))
+    batch_size = processor.batch_size
+    count = batch_size * (3 if quick else 10)
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            np.random.seed(seed)
+            paths = [os.path.abspath(p) for p in processor.generate_synthetic_images(count)]
+        finally:
+            os.chdir(previous_dir)
+
+        batches = cycle([paths[i:i + batch_size] for i in range(0, count, batch_size)])
+        result = measure("processor.process_batch", lambda: processor.process_batch(next(batches)),
+                         iterations=count // batch_size * 2, warmup=1, items=batch_size)
+    result["extra"] = {"backend": processor.backend.describe(), "gpu": processor.device.gpu}
+    return [result]
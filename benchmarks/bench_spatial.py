@@ -0,0 +1,90 @@
+"""
+Spatial index benchmarks
+Builds the LaneIndex over seeded synthetic ports and lanes, then times
+radius queries through the grid against a linear scan computing the same
+distances for every lane (what a query costs without the index), and the
+DisruptionStore radius lookup against scanning the whole store.
+"""
+
+import random
+from itertools import cycle
+from typing import Any, Dict, List
+
+import numpy as np
+
+import generators
+from harness import measure
+
+
+def _query_points(rng: random.Random, port_list, count: int):
+    """Half at ports (dense areas), half anywhere ports are generated"""
+    points = []
+    for i in range(count):
+        if i % 2:
+            _, lng, lat = rng.choice(port_list)
+        else:
+            lng, lat = rng.uniform(-180, 180), rng.uniform(-60, 70)
+        points.append((lng, lat))
+    return points
+
+
+def _lanes(rng: random.Random, quick: bool) -> List[Dict[str, Any]]:
+    from spatial_index import EARTH_RADIUS_KM, LaneIndex, to_vector
+
+    port_count, lanes_per_port = (2000, 10) if quick else (10000, 20)
+    port_list = generators.ports(rng, port_count)
+    locations = {name: (lng, lat) for name, lng, lat in port_list}
+    rows = generators.route_rows(rng, port_list, lanes_per_port)
+
+    index = LaneIndex.from_rows(rows, locate=locations.get)
+    points = cycle(_query_points(rng, port_list, 200))
+    all_slots = np.array([lane.slot for lane in index.lanes.values()])
+    radius_km = 300.0
+
+    def linear_scan():
+        lng, lat = next(points)
+        distances = index._distances(all_slots, np.array(to_vector(lng, lat)))
+        return np.nonzero(distances * EARTH_RADIUS_KM <= radius_km)[0]
+
+    disruptions = generators.disruptions(rng, 50, port_list)
+    iterations = 50 if quick else 200
+    results = [
+        measure(f"spatial.lane_index.build_{len(rows)}", lambda: LaneIndex.from_rows(rows, locate=locations.get),
+                1 if quick else 3, warmup=0, items=len(rows)),
+        measure("spatial.lanes_near_300km", lambda: index.lanes_near(*next(points), radius_km), iterations),
+        measure("spatial.lanes_near_300km_linear_scan", linear_scan, max(5, iterations // 10)),
+        measure("spatial.at_risk_50_disruptions", lambda: index.at_risk(disruptions, radius_km), max(5, iterations // 10),
+                items=len(disruptions)),
+    ]
+    results[0]["extra"] = index.get_stats()
+    return results
+
+
+def _disruptions(rng: random.Random, quick: bool) -> List[Dict[str, Any]]:
+    from disruption_store import DisruptionStore
+    from spatial_index import distance_km
+
+    capacity = 10000 if quick else 100000
+    port_list = generators.ports(rng, 2000)
+    store = DisruptionStore(capacity=capacity)
+    events = generators.disruptions(rng, capacity, port_list)
+    for event in events:
+        store.add(event)
+    points = cycle(_query_points(rng, port_list, 200))
+    radius_km = 500.0
+
+    def linear_scan():
+        lng, lat = next(points)
+        found = [(d, distance_km(lng, lat, *d["location"])) for d in events]
+        return sorted((item for item in found if item[1] <= radius_km), key=lambda item: item[1])[:50]
+
+    iterations = 50 if quick else 200
+    return [
+        measure(f"spatial.disruptions_near_500km_{capacity}", lambda: store.near(*next(points), radius_km), iterations),
+        measure(f"spatial.disruptions_near_500km_{capacity}_linear_scan", linear_scan, max(3, iterations // 20)),
+    ]
+
+
+def run(seed: int, quick: bool = False) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return _lanes(rng, quick) + _disruptions(rng, quick)
@@ -0,0 +1,73 @@
+"""
+End-to-end workflow benchmarks
+prediction -> optimization -> alert for seeded disruptions, both as one
+sequential call chain (per-disruption latency) and through the queued
+AgentPipeline main.py runs (throughput with the configured workers).
+"""
+
+import asyncio
+import random
+from itertools import cycle
+from typing import Any, Dict, List
+
+import generators
+from bench_agents import create_agents
+from harness import measure_async, summarize
+
+
+async def _sequential(agents, disruptions, iterations: int) -> Dict[str, Any]:
+    prediction_agent, optimization_agent, alert_agent = agents
+    graph = optimization_agent.route_graph
+    events = cycle(disruptions)
+
+    async def workflow():
+        disruption = next(events)
+        prediction = await prediction_agent.predict_disruption()
+        affected = graph.lanes_at_port(disruption["locationName"])
+        if affected:
+            prediction = dict(prediction, affected_routes=affected)
+        plan = await optimization_agent.optimize(prediction)
+        await alert_agent.process_alert(disruption, plan)
+
+    return await measure_async("workflow.sequential", workflow, iterations, warmup=1)
+
+
+async def _pipeline(agents, disruptions, runs: int, count: int) -> Dict[str, Any]:
+    from agents.pipeline import build_agent_pipeline
+
+    samples = []
+    end_to_end = []
+    for _ in range(runs):
+        pipeline = build_agent_pipeline(*agents, workers={"prediction": 2, "optimization": 2, "alert": 4})
+        finished = asyncio.Event()
+
+        async def on_complete(result):
+            if pipeline.completed >= count:
+                finished.set()
+
+        pipeline.on_complete = on_complete
+        await pipeline.start()
+        started = asyncio.get_running_loop().time()
+        for disruption in disruptions[:count]:
+            await pipeline.submit({"kind": "disruption", "disruption": disruption})
+        await finished.wait()
+        samples.append(asyncio.get_running_loop().time() - started)
+        end_to_end.append(pipeline.get_status()["avg_end_to_end_ms"])
+        await pipeline.stop()
+
+    return summarize("workflow.pipeline", samples, items=count,
+                     avg_end_to_end_ms=round(sum(end_to_end) / len(end_to_end), 3))
+
+
+async def run(seed: int, quick: bool = False) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    prediction_agent, optimization_agent, alert_agent, port_list = create_agents(rng)
+    agents = (prediction_agent, optimization_agent, alert_agent)
+    disruptions = generators.disruptions(rng, 100, port_list)
+
+    results = [
+        await _sequential(agents, disruptions, 3 if quick else 10),
+        await _pipeline(agents, disruptions, runs=1 if quick else 3, count=20 if quick else 40),
+    ]
+    await alert_agent.dispatcher.drain()
+    return results
@@ -0,0 +1,160 @@
+"""
+Seeded synthetic data for the benchmark suite
+Every generator takes a random.Random, so the same seed always produces
+the same ports, lanes, disruptions, sensor readings and model contexts.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# Real ports the simulators and seed data use, so lookups by name hit the graph
+KNOWN_PORTS = [
+    ("Shanghai, China", 121.47, 31.23),
+    ("Rotterdam, Netherlands", 4.47, 51.92),
+    ("Singapore", 103.85, 1.29),
+    ("Los Angeles, USA", -118.24, 33.74),
+    ("New York, USA", -74.00, 40.71),
+    ("Dubai, UAE", 55.27, 25.20),
+    ("Hong Kong, China", 114.17, 22.32),
+    ("Hamburg, Germany", 9.99, 53.55),
+    ("Miami, USA", -80.19, 25.77),
+    ("Tokyo, Japan", 139.77, 35.68),
+    ("Busan, South Korea", 129.04, 35.10),
+    ("Antwerp, Belgium", 4.40, 51.22),
+    ("Santos, Brazil", -46.33, -23.96),
+    ("Mumbai, India", 72.88, 19.08),
+    ("Durban, South Africa", 31.03, -29.87),
+    ("Sydney, Australia", 151.21, -33.87),
+]
+
+DISRUPTION_TYPES = [
+    "Port Congestion",
+    "Severe Weather",
+    "Geopolitical Event",
+    "Infrastructure Failure",
+    "Cyber Security Threat",
+    "Labor Strike",
+    "Natural Disaster",
+]
+
+SEVERITIES = ["low", "medium", "high", "critical"]
+ROUTE_STATUSES = ["normal", "normal", "normal", "warning", "critical"]
+
+
+def ports(rng: random.Random, count: int) -> List[Tuple[str, float, float]]:
+    """(name, lng, lat) for the known ports, padded with synthetic ones"""
+    result = list(KNOWN_PORTS[:count])
+    for i in range(len(result), count):
+        result.append((f"Port {i:04d}", round(rng.uniform(-180, 180), 4), round(rng.uniform(-60, 70), 4)))
+    return result
+
+
+def route_rows(rng: random.Random, port_list: List[Tuple[str, float, float]], lanes_per_port: int = 3) -> List[Dict[str, Any]]:
+    """
+    Routes-table rows: a ring through every port (so the graph is connected)
+    plus `lanes_per_port - 1` random lanes per port
+    """
+    names = [p[0] for p in port_list]
+    pairs = [(names[i], names[(i + 1) % len(names)]) for i in range(len(names))]
+    for origin in names:
+        for _ in range(lanes_per_port - 1):
+            destination = rng.choice(names)
+            if destination != origin:
+                pairs.append((origin, destination))
+    return [
+        {
+            "id": i + 1,
+            "origin_port": origin,
+            "destination_port": destination,
+            "current_status": rng.choice(ROUTE_STATUSES),
+            "estimated_delay_hours": rng.choice([0, 0, 0, 2, 4, 8, 12, 24, 48]),
+            "risk_score": round(rng.uniform(0.05, 0.95), 2),
+        }
+        for i, (origin, destination) in enumerate(pairs)
+    ]
+
+
+def serialized_routes(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows in the /api/routes representation (see main.serialize_route)"""
+    return [
+        {
+            "id": f"route-{row['id']}",
+            "origin": row["origin_port"],
+            "destination": row["destination_port"],
+            "status": row["current_status"],
+            "estimated_delay": row["estimated_delay_hours"],
+            "risk_score": row["risk_score"],
+        }
+        for row in rows
+    ]
+
+
+def disruptions(rng: random.Random, count: int, port_list: List[Tuple[str, float, float]],
+                start: datetime = datetime(2024, 1, 1)) -> List[Dict[str, Any]]:
+    """Disruption events shaped like simulate_disruption_detection's, oldest first"""
+    result = []
+    timestamp = start
+    for i in range(count):
+        name, lng, lat = rng.choice(port_list)
+        timestamp += timedelta(seconds=rng.randint(15, 45))
+        result.append({
+            "id": f"disruption-{i + 1}",
+            "type": rng.choice(DISRUPTION_TYPES),
+            "location": [lng, lat],
+            "locationName": name,
+            "severity": rng.choice(SEVERITIES),
+            "confidence": round(rng.uniform(0.75, 0.99), 2),
+            "affectedRoutes": rng.randint(1, 15),
+            "timestamp": timestamp.isoformat(),
+            "description": f"AI agents detected potential disruption in {name}",
+        })
+    return result
+
+
+def sensor_readings(rng: random.Random, sensors: int, count: int, anomaly_rate: float = 0.01) -> List[Dict[str, Any]]:
+    """IoT readings around a per-sensor baseline, with occasional outliers"""
+    baselines = [(rng.uniform(-5, 30), rng.uniform(0, 60)) for _ in range(sensors)]
+    readings = []
+    for _ in range(count):
+        index = rng.randrange(sensors)
+        temperature, delay = baselines[index]
+        spike = 8.0 if rng.random() < anomaly_rate else 1.0
+        readings.append({
+            "sensor_id": f"sensor-{index:05d}",
+            "temperature": round(rng.gauss(temperature, 1.5 * spike), 2),
+            "delay_minutes": max(0, int(rng.gauss(delay, 5 * spike))),
+        })
+    return readings
+
+
+def gemini_contexts(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    """Distinct prediction contexts (distinct cache keys)"""
+    return [
+        {
+            "satellite_data": {
+                "congestion_level": round(rng.random(), 3),
+                "ship_count": rng.randint(5, 120),
+                "weather_anomaly": rng.random() < 0.3,
+                "risk_score": round(rng.random(), 3),
+            },
+            "iot_data": {
+                "avg_delay_minutes": round(rng.uniform(0, 90), 3),
+                "anomaly_detected": rng.random() < 0.2,
+            },
+            "news_data": f"Recent {rng.choice(DISRUPTION_TYPES).lower()} reported near {rng.choice(KNOWN_PORTS)[0]}",
+        }
+        for _ in range(count)
+    ]
+
+
+def event_schedule(seed: int, count: int) -> List[Dict[str, Any]]:
+    """
+    Realtime load-test events; the same seed yields the same events (and
+    locations) in the server and in every client process
+    """
+    rng = random.Random(seed)
+    events = disruptions(rng, count, ports(rng, 200))
+    for seq, event in enumerate(events, 1):
+        event["load_seq"] = seq
+    return events
@@ -0,0 +1,145 @@
+"""
+Timing, result files and baseline comparison for the benchmark suite
+Every benchmark records per-iteration wall time; comparisons use the
+median, which is far less sensitive to scheduler noise than the mean.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def summarize(name: str, samples: List[float], items: int = 1, **extra: Any) -> Dict[str, Any]:
+    """
+    Per-iteration seconds -> result record (times in ms)
+    `items` is the work done per iteration (requests, images, ...), used for ops/sec
+    """
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    result = {
+        "name": name,
+        "iterations": len(ordered),
+        "items_per_iteration": items,
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "stdev_ms": round(statistics.pstdev(ordered) * 1000, 4),
+        "ops_per_sec": round(items / median, 2) if median else 0.0,
+    }
+    if extra:
+        result["extra"] = extra
+    return result
+
+
+def measure(name: str, fn: Callable[[], Any], iterations: int, warmup: int = 1,
+            items: int = 1, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time a synchronous callable; setup() runs untimed before each iteration"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(name, samples, items)
+
+
+async def measure_async(name: str, fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 1,
+                        items: int = 1, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time a coroutine function; setup() runs untimed before each iteration"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(name, samples, items)
+
+
+def environment(seed: int) -> Dict[str, Any]:
+    """Where and on what the results were produced"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.2, min_delta_ms: float = 0.02) -> List[Dict[str, Any]]:
+    """
+    Compare medians benchmark by benchmark
+    A benchmark regresses when its median is more than `threshold` (fraction)
+    slower than the baseline and by more than `min_delta_ms`, so sub-microsecond
+    jitter on very fast benchmarks is not reported
+    """
+    before = {b["name"]: b for b in baseline.get("benchmarks", [])}
+    after = {b["name"]: b for b in current.get("benchmarks", [])}
+    rows = []
+    for name, result in after.items():
+        old = before.get(name)
+        if old is None:
+            rows.append({"name": name, "status": "new", "median_ms": result["median_ms"]})
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+        delta = result["median_ms"] - old["median_ms"]
+        if ratio > 1 + threshold and delta > min_delta_ms:
+            status = "regression"
+        elif ratio < 1 - threshold and -delta > min_delta_ms:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name,
+            "status": status,
+            "baseline_ms": old["median_ms"],
+            "median_ms": result["median_ms"],
+            "change": round(ratio - 1, 4),
+        })
+    for name in before:
+        if name not in after:
+            rows.append({"name": name, "status": "missing", "baseline_ms": before[name]["median_ms"]})
+    return rows
@@ -0,0 +1,651 @@
+"""
+Socket.IO load test for the realtime disruption feed
+
+Starts realtime_server.py (one uvicorn worker), opens thousands of
+simulated dashboard clients from several client processes, injects seeded
+disruptions at --rate events/s and reports, per client count:
+
+  - connect time (websocket open to namespace connected) and failures
+  - end-to-end latency (server publish -> client receive) percentiles
+  - dropped events (expected from the client's subscription but never
+    received), late events (over --late-ms) and unexpected disconnects
+  - server CPU (% of one core) and resident memory, sampled from /proc
+
+Clients speak Engine.IO v4 over a plain websocket rather than running a
+full python-socketio client each, so one client process can hold
+thousands of connections. Steps that keep p99 latency under --slo-ms with
+no drops, failures or saturated CPU count towards the capacity estimate.
+Clients and server share the machine; on small hosts give the client
+processes their own cores (or machine) for meaningful numbers.
+
+    python benchmarks/loadtest_realtime.py --clients 500,1000,2000,4000 --rate 20 --duration 30
+    python benchmarks/loadtest_realtime.py --clients 2000 --subscribe regions --format msgpack
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import urllib.request
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "backend"))
+
+import generators  # noqa: E402
+from harness import environment, write_results  # noqa: E402
+
+try:
+    import msgpack
+except ImportError:  # only needed for --format msgpack
+    msgpack = None
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+# ----------------------------------------------------------------------
+# Server process sampling
+# ----------------------------------------------------------------------
+
+class ProcessSampler:
+    """CPU and RSS of one process from /proc, sampled on a thread"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._page = os.sysconf("SC_PAGE_SIZE")
+
+    def read(self) -> Optional[Dict[str, float]]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # Fields after the command name, which may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{self.pid}/statm") as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return {
+            "time": time.monotonic(),
+            "cpu_seconds": (int(fields[11]) + int(fields[12])) / self._ticks,
+            "rss_mb": rss_pages * self._page / 1e6,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            sample = self.read()
+            if sample is not None:
+                self.samples.append(sample)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def cpu_between(self, start: float, end: float) -> Dict[str, Optional[float]]:
+        """Mean and peak CPU (% of one core) over samples in [start, end]"""
+        window = [s for s in self.samples if start <= s["time"] <= end]
+        if len(window) < 2:
+            return {"mean": None, "peak": None}
+        rates = [
+            (b["cpu_seconds"] - a["cpu_seconds"]) / (b["time"] - a["time"]) * 100
+            for a, b in zip(window, window[1:])
+        ]
+        total = (window[-1]["cpu_seconds"] - window[0]["cpu_seconds"]) / (window[-1]["time"] - window[0]["time"]) * 100
+        return {"mean": round(total, 1), "peak": round(max(rates), 1)}
+
+
+# ----------------------------------------------------------------------
+# Simulated clients
+# ----------------------------------------------------------------------
+
+class ClientStats:
+    """Counters for the clients of one process"""
+
+    def __init__(self):
+        self.connect_times = array("d")
+        self.connect_failures = 0
+        self.subscribe_failures = 0
+        self.disconnects = 0
+        self.latencies = array("d")
+        self.messages = 0
+        self.duplicates = 0
+
+
+class SimulatedClient:
+    """One dashboard: Engine.IO v4 / Socket.IO v5 over a websocket"""
+
+    def __init__(self, index: int, subscription: Optional[Dict[str, Any]], cells: Optional[frozenset]):
+        self.index = index
+        self.subscription = subscription
+        self.cells = cells  # None = subscribed to everything
+        self.received: set = set()
+        self.ws = None
+        self.stopping = False
+
+    async def connect(self, url: str, stats: ClientStats, timeout: float, compression: bool) -> bool:
+        started = time.perf_counter()
+        try:
+            self.ws = await websockets.connect(
+                url, max_size=None, ping_interval=None, open_timeout=timeout,
+                compression="deflate" if compression else None
+            )
+            await asyncio.wait_for(self._handshake(), timeout)
+        except Exception:
+            stats.connect_failures += 1
+            await self.close()
+            return False
+        stats.connect_times.append(time.perf_counter() - started)
+
+        if self.subscription is not None:
+            try:
+                await self.ws.send("420" + json.dumps(["subscribe", self.subscription]))
+                reply = await asyncio.wait_for(self._wait_for_ack("430"), timeout)
+                if "error" in reply:
+                    raise ValueError(reply["error"])
+            except Exception:
+                stats.subscribe_failures += 1
+                await self.close()
+                return False
+        return True
+
+    async def _handshake(self):
+        opened = await self.ws.recv()
+        if not opened.startswith("0"):
+            raise ConnectionError(f"unexpected open packet {opened[:40]}")
+        await self.ws.send("40")
+        while True:
+            message = await self.ws.recv()
+            if message == "2":
+                await self.ws.send("3")
+            elif message.startswith("40"):
+                return
+            elif message.startswith("44"):
+                raise ConnectionError(f"connect refused: {message[2:]}")
+
+    async def _wait_for_ack(self, prefix: str) -> Dict[str, Any]:
+        while True:
+            message = await self.ws.recv()
+            if message == "2":
+                await self.ws.send("3")
+            elif isinstance(message, str) and message.startswith(prefix):
+                return json.loads(message[len(prefix):])[0]
+
+    def _handle_batch(self, data: Dict[str, Any], stats: ClientStats):
+        now = time.time()
+        stats.messages += 1
+        for event in data.get("events", ()):
+            seq = event.get("load_seq")
+            if seq is None:
+                continue  # the app's own simulator
+            if seq in self.received:
+                stats.duplicates += 1
+                continue
+            self.received.add(seq)
+            stats.latencies.append(now - event["sent_at"])
+
+    async def listen(self, stats: ClientStats):
+        attachments = 0
+        header = None
+        try:
+            async for message in self.ws:
+                if isinstance(message, bytes):
+                    if attachments and header is not None:
+                        attachments -= 1
+                        if header[0] == "disruption_batch":
+                            self._handle_batch(msgpack.unpackb(message), stats)
+                    continue
+                if message == "2":
+                    await self.ws.send("3")
+                elif message.startswith("42"):
+                    event, data = json.loads(message[2:])
+                    if event == "disruption_batch":
+                        self._handle_batch(data, stats)
+                elif message.startswith("45"):
+                    # Binary event: "45<n>-[event, placeholder]" followed by n binary frames
+                    count, _, body = message[2:].partition("-")
+                    attachments = int(count)
+                    header = json.loads(body)
+                elif message.startswith("1") or message.startswith("41"):
+                    break
+        except Exception:
+            pass
+        if not self.stopping:
+            stats.disconnects += 1
+
+    async def close(self):
+        self.stopping = True
+        if self.ws is not None:
+            try:
+                await asyncio.wait_for(self.ws.close(), 2.0)
+            except Exception:
+                pass
+
+
+def client_subscription(mode: str, fmt: str, rng: random.Random, broadcaster):
+    """(subscribe payload or None, watched cells or None for all)"""
+    from realtime import REGIONS
+
+    if mode == "all" and fmt == "json":
+        return None, None
+    if mode == "all":
+        return {"format": fmt}, None
+    if mode == "regions":
+        region = rng.choice(sorted(REGIONS))
+        return {"regions": [region], "format": fmt}, frozenset(broadcaster.cells_for_bbox(REGIONS[region]))
+    # Dashboards zoomed into a 30x20 degree window
+    lng = rng.uniform(-180, 150)
+    lat = rng.uniform(-60, 50)
+    bbox = [round(lng, 2), round(lat, 2), round(lng + 30, 2), round(lat + 20, 2)]
+    return {"bboxes": [bbox], "format": fmt}, frozenset(broadcaster.cells_for_bbox(bbox))
+
+
+async def _client_process_main(process_index: int, indices: List[int], config: Dict[str, Any],
+                               ready, stop, injected, results):
+    from realtime import RegionBroadcaster
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    # Geometry only: the same cell grid as the server
+    grid = RegionBroadcaster(None, cell_degrees=config["cell_degrees"])
+    stats = ClientStats()
+    clients = []
+    listeners = []
+    interval = config["processes"] / config["ramp"]
+
+    async def open_client(index: int):
+        rng = random.Random(config["seed"] * 100003 + index)
+        subscription, cells = client_subscription(config["subscribe"], config["format"], rng, grid)
+        client = SimulatedClient(index, subscription, cells)
+        if await client.connect(config["url"], stats, config["connect_timeout"], config["compression"]):
+            clients.append(client)
+            listeners.append(asyncio.create_task(client.listen(stats)))
+        with ready.get_lock():
+            ready.value += 1
+
+    started = time.perf_counter()
+    opening = []
+    for i, index in enumerate(indices):
+        # Ramp connections instead of opening them all at once
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        opening.append(asyncio.create_task(open_client(index)))
+    await asyncio.gather(*opening)
+
+    while not stop.is_set():
+        await asyncio.sleep(0.1)
+
+    await asyncio.gather(*(client.close() for client in clients))
+    await asyncio.gather(*listeners, return_exceptions=True)
+
+    # Expected deliveries from the injected prefix of the seeded schedule
+    schedule = generators.event_schedule(config["seed"], injected.value)
+    per_cell = Counter(grid.cell_of(*event["location"]) for event in schedule)
+    expected = dropped = 0
+    for client in clients:
+        want = injected.value if client.cells is None else sum(per_cell[c] for c in client.cells)
+        expected += want
+        dropped += max(0, want - len(client.received))
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        "process": process_index,
+        "connected": len(clients),
+        "connect_times": stats.connect_times.tobytes(),
+        "connect_failures": stats.connect_failures,
+        "subscribe_failures": stats.subscribe_failures,
+        "disconnects": stats.disconnects,
+        "latencies": stats.latencies.tobytes(),
+        "messages": stats.messages,
+        "duplicates": stats.duplicates,
+        "expected": expected,
+        "dropped": dropped,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+    })
+
+
+def client_process(process_index, indices, config, ready, stop, injected, results):
+    try:
+        asyncio.run(_client_process_main(process_index, indices, config, ready, stop, injected, results))
+    except BaseException:
+        # Let the parent abort the step with the reason instead of timing out
+        results.put({"process": process_index, "error": traceback.format_exc()})
+        raise
+
+
+def check_workers(workers: List[multiprocessing.Process], results):
+    """Raise if a client process died, with the traceback it sent when there is one"""
+    for worker in workers:
+        if worker.exitcode in (None, 0):
+            continue
+        detail = ""
+        try:
+            while True:
+                report = results.get(timeout=0.5)
+                if "error" in report:
+                    detail = ":\n" + report["error"]
+                    break
+        except queue.Empty:
+            pass
+        raise RuntimeError(f"client process {worker.name} exited with code {worker.exitcode}{detail}")
+
+
+def collect_reports(workers: List[multiprocessing.Process], results, timeout: float) -> List[Dict[str, Any]]:
+    reports = []
+    deadline = time.monotonic() + timeout
+    while len(reports) < len(workers):
+        try:
+            report = results.get(timeout=0.5)
+        except queue.Empty:
+            check_workers(workers, results)
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{len(workers) - len(reports)} client processes did not report "
+                                   f"within {timeout:g}s")
+            continue
+        if "error" in report:
+            raise RuntimeError(f"client process {report['process']} failed:\n{report['error']}")
+        reports.append(report)
+    return reports
+
+
+# ----------------------------------------------------------------------
+# One load step
+# ----------------------------------------------------------------------
+
+def http(method: str, url: str, timeout: float = 5.0) -> Dict[str, Any]:
+    request = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               REALTIME_TICK_SECONDS=str(args.tick),
+               REALTIME_CELL_DEGREES=str(args.cell_degrees),
+               PYTHONUNBUFFERED="1")
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARK_DIR, "realtime_server.py"),
+         "--app", args.app, "--port", str(port), "--seed", str(args.seed)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            http("GET", f"http://127.0.0.1:{port}/loadtest/status", timeout=1.0)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start within 60s")
+
+
+def run_step(args, clients: int) -> Dict[str, Any]:
+    port = args.port
+    base = f"http://127.0.0.1:{port}"
+    server = start_server(args, port)
+    sampler = ProcessSampler(server.pid)
+    idle = sampler.read()
+    sampler.start()
+
+    count = max(1, int(args.rate * args.duration))
+    processes = min(args.client_processes, clients)
+    config = {
+        "url": f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket",
+        "seed": args.seed,
+        "subscribe": args.subscribe,
+        "format": args.format,
+        "cell_degrees": args.cell_degrees,
+        "ramp": args.ramp,
+        "processes": processes,
+        "connect_timeout": args.connect_timeout,
+        "compression": not args.no_compression,
+    }
+    ready = multiprocessing.Value("i", 0)
+    injected = multiprocessing.Value("i", 0)
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(p, list(range(p, clients, processes)), config, ready, stop, injected, results),
+            daemon=True
+        )
+        for p in range(processes)
+    ]
+
+    try:
+        connect_started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        deadline = connect_started + clients / args.ramp + args.connect_timeout + 30
+        while ready.value < clients and time.monotonic() < deadline:
+            time.sleep(0.1)
+            check_workers(workers, results)
+        connect_seconds = time.monotonic() - connect_started
+        time.sleep(1.0)
+        connected = sampler.read()
+
+        inject_started = time.monotonic()
+        http("POST", f"{base}/loadtest/start?rate={args.rate}&count={count}")
+        status = {}
+        while True:
+            time.sleep(0.5)
+            check_workers(workers, results)
+            status = http("GET", f"{base}/loadtest/status")
+            if not status["running"]:
+                break
+        inject_ended = time.monotonic()
+        # Let the last ticks flush before counting drops
+        time.sleep(args.tick * 2 + args.late_ms / 1000)
+        status = http("GET", f"{base}/loadtest/status")
+
+        injected.value = status["injected"]
+        stop.set()
+        reports = collect_reports(workers, results, timeout=120)
+        for worker in workers:
+            worker.join(timeout=30)
+    finally:
+        sampler.stop()
+        stop.set()
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    connect_times = array("d")
+    latencies = array("d")
+    for report in reports:
+        connect_times.frombytes(report["connect_times"])
+        latencies.frombytes(report["latencies"])
+    latencies = list(latencies)
+    connected_clients = sum(r["connected"] for r in reports)
+    expected = sum(r["expected"] for r in reports)
+    dropped = sum(r["dropped"] for r in reports)
+    late = sum(1 for latency in latencies if latency * 1000 > args.late_ms)
+    inject_seconds = max(inject_ended - inject_started, 1e-9)
+    cpu = sampler.cpu_between(inject_started, inject_ended)
+    rss_idle = idle["rss_mb"] if idle else None
+    rss_connected = connected["rss_mb"] if connected else None
+    rss_peak = max((s["rss_mb"] for s in sampler.samples), default=None)
+
+    return {
+        "clients": clients,
+        "connected": connected_clients,
+        "connect_failures": sum(r["connect_failures"] + r["subscribe_failures"] for r in reports),
+        "disconnects": sum(r["disconnects"] for r in reports),
+        "connect_seconds": round(connect_seconds, 2),
+        "connect_ms": {
+            "p50": ms(percentile(connect_times, 0.5)),
+            "p95": ms(percentile(connect_times, 0.95)),
+            "p99": ms(percentile(connect_times, 0.99)),
+            "max": ms(max(connect_times, default=None)),
+        },
+        "events_injected": status["injected"],
+        "injector_max_lag_ms": status["max_lag_ms"],
+        "events_per_sec": round(status["injected"] / inject_seconds, 1),
+        "deliveries_expected": expected,
+        "deliveries_per_sec": round(len(latencies) / inject_seconds, 1),
+        "messages": sum(r["messages"] for r in reports),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.5)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(max(latencies, default=None)),
+        },
+        "dropped": dropped,
+        "drop_rate": round(dropped / expected, 6) if expected else 0.0,
+        "late": late,
+        "duplicates": sum(r["duplicates"] for r in reports),
+        "server_cpu_percent": cpu,
+        "server_rss_mb": {
+            "idle": round(rss_idle, 1) if rss_idle else None,
+            "connected": round(rss_connected, 1) if rss_connected else None,
+            "peak": round(rss_peak, 1) if rss_peak else None,
+        },
+        "server_kb_per_client": round((rss_connected - rss_idle) * 1000 / connected_clients, 1)
+        if rss_idle and rss_connected and connected_clients else None,
+        "client_cpu_seconds": round(sum(r["cpu_seconds"] for r in reports), 2),
+        "realtime": status.get("realtime"),
+    }
+
+
+def within_slo(step: Dict[str, Any], args) -> bool:
+    p99 = step["latency_ms"]["p99"]
+    cpu = step["server_cpu_percent"]["mean"]
+    return step["connect_failures"] == 0 \
+        and step["disconnects"] == 0 \
+        and step["drop_rate"] <= args.max_drop_rate \
+        and p99 is not None and p99 <= args.slo_ms \
+        and (cpu is None or cpu <= args.max_cpu)
+
+
+def print_step(step: Dict[str, Any], ok: bool):
+    connect = step["connect_ms"]
+    latency = step["latency_ms"]
+    cpu = step["server_cpu_percent"]
+    print(f"{step['clients']:>7} {step['connected']:>9} {step['connect_failures']:>6} "
+          f"{connect['p50'] or 0:>8.1f} {connect['p99'] or 0:>8.1f} "
+          f"{step['deliveries_per_sec']:>10.0f} {latency['p50'] or 0:>8.1f} {latency['p95'] or 0:>8.1f} "
+          f"{latency['p99'] or 0:>8.1f} {step['dropped']:>8} {step['late']:>7} "
+          f"{cpu['mean'] or 0:>6.0f} {cpu['peak'] or 0:>6.0f} {step['server_rss_mb']['peak'] or 0:>8.0f}  "
+          f"{'ok' if ok else 'over'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=str, default="250,500,1000,2000", help="comma-separated client counts, one step each")
+    parser.add_argument("--rate", type=float, default=20.0, help="injected disruptions per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of injection per step")
+    parser.add_argument("--subscribe", choices=["all", "regions", "bbox"], default="all",
+                        help="what each client watches: everything, one named region, or a 30x20 degree box")
+    parser.add_argument("--format", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--client-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--ramp", type=float, default=500.0, help="new connections per second")
+    parser.add_argument("--connect-timeout", type=float, default=15.0)
+    parser.add_argument("--no-compression", action="store_true", help="do not offer permessage-deflate")
+    parser.add_argument("--app", choices=["simple", "main"], default="simple")
+    parser.add_argument("--tick", type=float, default=0.25, help="REALTIME_TICK_SECONDS for the server")
+    parser.add_argument("--cell-degrees", type=float, default=10.0, help="REALTIME_CELL_DEGREES for the server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--late-ms", type=float, default=1000.0, help="deliveries slower than this count as late")
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p99 latency a step must stay under")
+    parser.add_argument("--max-drop-rate", type=float, default=0.0)
+    parser.add_argument("--max-cpu", type=float, default=85.0, help="mean server CPU (%% of one core) a step must stay under")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show server errors")
+    args = parser.parse_args()
+
+    if args.format == "msgpack" and msgpack is None:
+        parser.error("--format msgpack needs the msgpack package")
+    if websockets is None:
+        parser.error("the load test needs the websockets package (pip install -r benchmarks/requirements.txt)")
+    steps = [int(c) for c in args.clients.split(",") if c]
+
+    print(f"Realtime load test: {args.app} app, {args.rate:g} events/s for {args.duration:g}s, "
+          f"subscribe={args.subscribe}, format={args.format}, tick={args.tick}s, "
+          f"{args.client_processes} client processes on {os.cpu_count()} cores\n")
+    print(f"{'clients':>7} {'connected':>9} {'failed':>6} {'conn p50':>8} {'conn p99':>8} "
+          f"{'deliv/s':>10} {'lat p50':>8} {'lat p95':>8} {'lat p99':>8} {'dropped':>8} {'late':>7} "
+          f"{'cpu%':>6} {'peak%':>6} {'rss MB':>8}")
+
+    results = []
+    capacity = None
+    for clients in steps:
+        try:
+            step = run_step(args, clients)
+        except RuntimeError as e:
+            print(f"{clients:>7} aborted: {e}")
+            break
+        ok = within_slo(step, args)
+        step["within_slo"] = ok
+        results.append(step)
+        print_step(step, ok)
+        if ok:
+            capacity = step
+
+    print()
+    if capacity is None:
+        print(f"✗ No step met the SLO (p99 <= {args.slo_ms:g} ms, drop rate <= {args.max_drop_rate:g}, "
+              f"CPU <= {args.max_cpu:g}%)")
+    else:
+        print(f"✓ Capacity per worker: {capacity['clients']} clients at {args.rate:g} events/s "
+              f"({capacity['deliveries_per_sec']:.0f} deliveries/s, p99 {capacity['latency_ms']['p99']} ms, "
+              f"{capacity['server_cpu_percent']['mean']}% CPU, "
+              f"{capacity['server_kb_per_client']} KB/client)")
+        if capacity is results[-1]:
+            print("  The largest step still met the SLO; add larger --clients steps to find the limit")
+
+    if args.output:
+        write_results(args.output, {
+            "environment": environment(args.seed),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "capacity_clients": capacity["clients"] if capacity else None,
+            "steps": results,
+        })
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
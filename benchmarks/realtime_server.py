@@ -0,0 +1,110 @@
+"""
+Socket.IO server for realtime load tests
+Serves the socket_app of main_simple.py (no database) or main.py with two
+extra endpoints used by loadtest_realtime.py:
+
+  POST /loadtest/start?rate=20&count=600   inject seeded disruptions at `rate`/s
+  GET  /loadtest/status                    injected count and injector lag
+
+Injected events go through the app's own disruptions_store and broadcaster,
+exactly like its disruption simulator, with `load_seq` and `sent_at` (epoch
+seconds) added so clients can detect drops and measure latency.
+
+    python benchmarks/realtime_server.py --port 8765 --app simple
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "backend"))
+
+import generators  # noqa: E402
+
+
+class EventInjector:
+    """Publishes the seeded event schedule at a fixed rate"""
+
+    def __init__(self, module, seed: int):
+        self.module = module
+        self.seed = seed
+        self.injected = 0
+        self.running = False
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self, rate: float, count: int):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / rate
+        due = loop.time()
+        for event in generators.event_schedule(self.seed, count):
+            # How far behind schedule a busy event loop makes us
+            self.max_lag = max(self.max_lag, loop.time() - due)
+            event["sent_at"] = time.time()
+            event["timestamp"] = datetime.utcnow().isoformat()
+            self.module.disruptions_store.add(event)
+            self.module.broadcaster.publish(event, event["location"])
+            self.injected += 1
+            due += interval
+            await asyncio.sleep(max(0.0, due - loop.time()))
+        self.running = False
+
+    def start(self, rate: float, count: int):
+        if self.running:
+            raise RuntimeError("injection already running")
+        self.injected = 0
+        self.max_lag = 0.0
+        self.running = True
+        self._task = asyncio.get_running_loop().create_task(self._run(rate, count))
+
+    def get_status(self):
+        return {"injected": self.injected, "running": self.running, "max_lag_ms": round(self.max_lag * 1000, 3)}
+
+
+def raise_file_limit():
+    """Thousands of sockets need more than the default 1024 descriptors"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=["simple", "main"], default="simple",
+                        help="simple = main_simple.py (no database); main = main.py (needs PostgreSQL)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import uvicorn
+    from fastapi import HTTPException, Query
+
+    raise_file_limit()
+    module = importlib.import_module("main_simple" if args.app == "simple" else "main")
+    injector = EventInjector(module, args.seed)
+
+    async def start(rate: float = Query(20.0, gt=0), count: int = Query(600, ge=1)):
+        try:
+            injector.start(rate, count)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return injector.get_status()
+
+    async def status():
+        return {**injector.get_status(), "realtime": module.broadcaster.get_stats()}
+
+    module.app.add_api_route("/loadtest/start", start, methods=["POST"])
+    module.app.add_api_route("/loadtest/status", status, methods=["GET"])
+
+    uvicorn.run(module.socket_app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
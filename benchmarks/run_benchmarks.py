@@ -0,0 +1,135 @@
+"""
+Benchmark suite for the backend API, the agents and the image processor
+
+Suites:
+  api        FastAPI endpoints of main.py and main_simple.py (in-process ASGI client)
+  agents     every prediction/optimization/alert agent method
+  workflow   prediction -> optimization -> alert, sequential and pipelined
+  processor  SatelliteImageProcessor.process_batch (needs TensorFlow)
+  spatial    spatial index build and radius queries vs. linear scans
+
+All data is generated from --seed. Results are written as JSON and compared
+with a saved baseline; the run fails (exit code 1) when any benchmark's
+median is more than --threshold slower than in the baseline.
+
+    python benchmarks/run_benchmarks.py --save-baseline     # on the base commit
+    python benchmarks/run_benchmarks.py                     # after a change
+    python benchmarks/run_benchmarks.py --suites api,agents --quick
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+for path in (os.path.join(ROOT, "backend"), os.path.join(ROOT, "gpu-processor")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# No rate limiting or persistence, so runs measure the code rather than budgets
+os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("GEMINI_TOKENS_PER_MINUTE", "0")
+os.environ.setdefault("GEMINI_CACHE_PATH", "")
+
+from harness import compare, environment, load_results, write_results  # noqa: E402
+
+SUITES = {
+    "api": "bench_api",
+    "agents": "bench_agents",
+    "workflow": "bench_workflow",
+    "processor": "bench_processor",
+    "spatial": "bench_spatial",
+}
+
+
+def run_suite(name: str, seed: int, quick: bool, verbose: bool):
+    """Results of one suite, or None when its dependencies are missing"""
+    try:
+        module = importlib.import_module(SUITES[name])
+        with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+            if asyncio.iscoroutinefunction(module.run):
+                return asyncio.run(module.run(seed, quick))
+            return module.run(seed, quick)
+    except ImportError as e:
+        print(f"⚠ Skipping {name} benchmarks: {e}")
+        return None
+
+
+def print_results(results):
+    print(f"  {'benchmark':<58} {'median ms':>10} {'p95 ms':>10} {'ops/s':>10}")
+    for result in results:
+        print(f"  {result['name']:<58} {result['median_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['ops_per_sec']:>10.1f}")
+
+
+def print_comparison(rows, threshold: float):
+    print(f"\nCompared with baseline (threshold {threshold:.0%}):")
+    print(f"  {'benchmark':<58} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for row in rows:
+        if row["status"] in ("new", "missing"):
+            ms = row.get("median_ms", row.get("baseline_ms"))
+            print(f"  {row['name']:<58} {'':>10} {ms:>10.3f} {'':>8}  {row['status']}")
+            continue
+        print(f"  {row['name']:<58} {row['baseline_ms']:>10.3f} {row['median_ms']:>10.3f} {row['change']:>+8.1%}  {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", type=str, default=",".join(SUITES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke run")
+    parser.add_argument("--output", type=str, default=os.path.join(BENCHMARK_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", type=str, default=os.path.join(BENCHMARK_DIR, "baseline.json"))
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown as a fraction")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="show output from the code under test")
+    args = parser.parse_args()
+
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)}")
+
+    results = {"environment": environment(args.seed), "suites": [], "benchmarks": []}
+    for name in suites:
+        print(f"Running {name} benchmarks...")
+        started = time.perf_counter()
+        suite_results = run_suite(name, args.seed, args.quick, args.verbose)
+        if suite_results is None:
+            continue
+        print_results(suite_results)
+        print(f"  ({time.perf_counter() - started:.1f}s)\n")
+        results["suites"].append(name)
+        results["benchmarks"].extend(suite_results)
+
+    write_results(args.output, results)
+    print(f"Results written to {args.output}")
+
+    regressions = []
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+    else:
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if baseline.get("environment", {}).get("machine") != results["environment"]["machine"] \
+                or baseline.get("environment", {}).get("cpu_count") != results["environment"]["cpu_count"]:
+            print("⚠ Baseline was recorded on different hardware; differences may not be meaningful")
+        regressions = [row for row in rows if row["status"] == "regression"]
+
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n✗ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
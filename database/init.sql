@@ -48,12 +48,83 @@ CREATE TABLE IF NOT EXISTS sensor_readings (
     temperature DECIMAL(5,2),
     delay_minutes INT,
     sensor_metadata JSON,  -- Additional sensor data
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Writing transaction's id: the rollups fold rows in commit-safe xid order
+    ingest_xid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint)
 );
 
 -- Create indexes for time-series queries
 CREATE INDEX idx_sensor_readings_sensor ON sensor_readings(sensor_id);
 CREATE INDEX idx_sensor_readings_time ON sensor_readings(timestamp DESC);
+CREATE INDEX idx_sensor_readings_ingest_xid ON sensor_readings(ingest_xid);
+
+-- Per-sensor rollups of sensor_readings, maintained incrementally by the backend
+-- (sums and counts are stored so buckets can be merged and re-aggregated)
+CREATE TABLE IF NOT EXISTS sensor_readings_1m (
+    sensor_id VARCHAR(50) NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    reading_count INT NOT NULL DEFAULT 0,
+    delay_count INT NOT NULL DEFAULT 0,
+    delay_sum BIGINT,
+    delay_min INT,
+    delay_max INT,
+    temp_count INT NOT NULL DEFAULT 0,
+    temp_sum DOUBLE PRECISION,
+    temp_min DOUBLE PRECISION,
+    temp_max DOUBLE PRECISION,
+    PRIMARY KEY (sensor_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS sensor_readings_1h (
+    sensor_id VARCHAR(50) NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    reading_count INT NOT NULL DEFAULT 0,
+    delay_count INT NOT NULL DEFAULT 0,
+    delay_sum BIGINT,
+    delay_min INT,
+    delay_max INT,
+    temp_count INT NOT NULL DEFAULT 0,
+    temp_sum DOUBLE PRECISION,
+    temp_min DOUBLE PRECISION,
+    temp_max DOUBLE PRECISION,
+    PRIMARY KEY (sensor_id, bucket)
+);
+
+CREATE INDEX idx_sensor_readings_1m_bucket ON sensor_readings_1m(bucket);
+CREATE INDEX idx_sensor_readings_1h_bucket ON sensor_readings_1h(bucket);
+
+-- Rollup watermark (rows with ingest_xid below last_xid are aggregated)
+CREATE TABLE IF NOT EXISTS sensor_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_xid BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Time-based partitioning of sensor_readings is optional:
+-- see partition_sensor_readings.sql
+-- Databases created before ingest_xid existed: run migrate_rollup_ingest_xid.sql
+
+-- Alerts archived from the Alert Agent's in-memory history (on eviction and at shutdown)
+CREATE TABLE IF NOT EXISTS alerts (
+    seq BIGINT PRIMARY KEY,
+    alert_id VARCHAR(50) NOT NULL UNIQUE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    payload JSON NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_alerts_created ON alerts(created_at DESC);
+CREATE INDEX idx_alerts_severity ON alerts(severity);
+CREATE INDEX idx_alerts_status ON alerts(status);
+
+-- High-water mark of alert ids; the Alert Agent reserves ids in blocks ahead of use
+CREATE TABLE IF NOT EXISTS alert_sequence (
+    name VARCHAR(50) PRIMARY KEY,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
 
 -- Agent activity log table
 CREATE TABLE IF NOT EXISTS agent_activity (
@@ -0,0 +1,26 @@
+-- Upgrade an existing database from the id-based rollup watermark
+-- (sensor_rollup_state.last_id) to the commit-safe ingest_xid watermark.
+-- Rows the rollups already folded get ingest_xid 0 and the rest 1, with
+-- the watermark at 1, so the next refresh folds exactly the remainder.
+-- Stop the backend (and any bulk ingest) while this runs.
+
+BEGIN;
+
+ALTER TABLE sensor_readings ADD COLUMN ingest_xid BIGINT;
+
+UPDATE sensor_readings
+SET ingest_xid = CASE
+    WHEN id <= COALESCE((SELECT last_id FROM sensor_rollup_state WHERE name = 'sensor_readings'), 0) THEN 0
+    ELSE 1
+END;
+
+ALTER TABLE sensor_readings
+    ALTER COLUMN ingest_xid SET DEFAULT (pg_current_xact_id()::text::bigint),
+    ALTER COLUMN ingest_xid SET NOT NULL;
+CREATE INDEX idx_sensor_readings_ingest_xid ON sensor_readings(ingest_xid);
+
+ALTER TABLE sensor_rollup_state ADD COLUMN last_xid BIGINT NOT NULL DEFAULT 0;
+UPDATE sensor_rollup_state SET last_xid = 1;
+ALTER TABLE sensor_rollup_state DROP COLUMN last_id;
+
+COMMIT;
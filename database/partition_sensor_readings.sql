@@ -0,0 +1,46 @@
+-- Optional: convert sensor_readings to a table partitioned by day on timestamp
+-- Run once, then set SENSOR_PARTITIONING=true so the backend creates upcoming
+-- partitions and drops expired ones instead of deleting rows.
+
+BEGIN;
+
+ALTER TABLE sensor_readings RENAME TO sensor_readings_legacy;
+ALTER INDEX idx_sensor_readings_sensor RENAME TO idx_sensor_readings_legacy_sensor;
+ALTER INDEX idx_sensor_readings_time RENAME TO idx_sensor_readings_legacy_time;
+ALTER INDEX idx_sensor_readings_ingest_xid RENAME TO idx_sensor_readings_legacy_ingest_xid;
+
+-- The partition key must be part of the primary key
+CREATE TABLE sensor_readings (
+    id SERIAL,
+    sensor_id VARCHAR(50) NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    location JSON NOT NULL,
+    temperature DECIMAL(5,2),
+    delay_minutes INT,
+    sensor_metadata JSON,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    ingest_xid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX idx_sensor_readings_sensor ON sensor_readings(sensor_id, timestamp DESC);
+CREATE INDEX idx_sensor_readings_time ON sensor_readings(timestamp DESC);
+CREATE INDEX idx_sensor_readings_ingest_xid ON sensor_readings(ingest_xid);
+
+-- Catch-all for rows outside the managed daily partitions
+CREATE TABLE sensor_readings_default PARTITION OF sensor_readings DEFAULT;
+
+-- Keep ids increasing past the legacy rows
+SELECT setval(
+    pg_get_serial_sequence('sensor_readings', 'id'),
+    GREATEST((SELECT COALESCE(MAX(id), 0) FROM sensor_readings_legacy), 1)
+);
+
+-- ingest_xid is copied as-is so rows the rollups already folded are not folded again
+INSERT INTO sensor_readings (id, sensor_id, timestamp, location, temperature, delay_minutes, sensor_metadata, created_at, ingest_xid)
+SELECT id, sensor_id, COALESCE(timestamp, created_at, CURRENT_TIMESTAMP), location, temperature, delay_minutes, sensor_metadata, created_at, ingest_xid
+FROM sensor_readings_legacy;
+
+DROP TABLE sensor_readings_legacy;
+
+COMMIT;
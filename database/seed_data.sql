@@ -3,6 +3,7 @@
 
 -- Clear existing data
 TRUNCATE TABLE routes, predictions, sensor_readings, agent_activity RESTART IDENTITY CASCADE;
+TRUNCATE TABLE sensor_readings_1m, sensor_readings_1h, sensor_rollup_state, alerts, alert_sequence;
 
 -- ============================================================================
 -- ROUTES DATA (50 major global supply chain routes)
@@ -29,8 +29,9 @@ export function LayoutWrapper({ children }: { children: React.ReactNode }) {
       setIsConnected(false)
     })
 
-    newSocket.on('disruption_update', (data: any) => {
-      setDisruptions((prev) => [data, ...prev.slice(0, 499)])
+    // Disruptions arrive batched, one message per server tick
+    newSocket.on('disruption_batch', (batch: { events: any[] }) => {
+      setDisruptions((prev) => [...[...batch.events].reverse(), ...prev].slice(0, 500))
     })
 
     setSocket(newSocket)
@@ -32,12 +32,14 @@ export default function Home() {
       success('Connected to real-time data stream', 3000)
     })
 
-    newSocket.on('disruption_update', (data: Disruption) => {
-      console.log('New disruption:', data)
-      setDisruptions((prev) => [data, ...prev.slice(0, 499)])
-      if (data.severity === 'critical') {
-        error(`Critical disruption: ${data.location}`, 5000)
-      }
+    // Disruptions arrive batched, one message per server tick
+    newSocket.on('disruption_batch', (batch: { events: Disruption[] }) => {
+      const events = [...batch.events].reverse()
+      console.log('New disruptions:', events)
+      setDisruptions((prev) => [...events, ...prev].slice(0, 500))
+      events
+        .filter((data) => data.severity === 'critical')
+        .forEach((data) => error(`Critical disruption: ${data.location}`, 5000))
     })
 
     setSocket(newSocket)
@@ -0,0 +1,131 @@
+"""
+Inference backend benchmark
+Runs the configured model (MODEL_PATH, or the demo model) through each
+backend on the same synthetic images and reports per-batch latency,
+throughput and drift from the Keras outputs (top-1 agreement, probability
+and risk-score differences)
+
+    python benchmark_inference.py --images 200 --backends keras,tflite,tflite-int8
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import tensorflow as tf
+
+from benchmark_preprocess import synthetic_source
+from image_decode import decode_into
+from inference_backends import create_backend, detect_device
+from process_images import SatelliteImageProcessor
+
+IMAGE_SIZE = (512, 512)
+
+
+def load_model() -> tf.keras.Model:
+    model_path = os.getenv("MODEL_PATH", "port_congestion_model")
+    if os.path.exists(model_path):
+        print(f"Loading model from {model_path}")
+        return SatelliteImageProcessor.with_uint8_input(tf.keras.models.load_model(model_path))
+    print("Using demo model")
+    return SatelliteImageProcessor.create_demo_model()
+
+
+def synthetic_batches(count: int, batch_size: int, seed: int) -> List[np.ndarray]:
+    """Decoded uint8 batches of synthetic JPEGs"""
+    source = synthetic_source(count, 1024, seed)
+    images = np.empty((count, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.uint8)
+    for i, ref in enumerate(source.list_images()):
+        decode_into(source.fetch(ref), images[i], IMAGE_SIZE)
+    return [images[i:i + batch_size] for i in range(0, count, batch_size)]
+
+
+def run_backend(backend, batches: List[np.ndarray]) -> Dict[str, Any]:
+    latencies = []
+    outputs = []
+    for batch in batches:
+        started = time.perf_counter()
+        outputs.append(backend.predict(batch))
+        latencies.append(time.perf_counter() - started)
+    images = sum(len(batch) for batch in batches)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": backend.describe(),
+        "warmup_seconds": round(backend.warmup_seconds, 3),
+        "batch_p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "batch_p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "imgs_per_sec": round(images / sum(latencies), 1),
+        "predictions": np.concatenate(outputs).astype(np.float32),
+    }
+
+
+def drift(reference: np.ndarray, predictions: np.ndarray) -> Dict[str, float]:
+    """How far a backend's outputs are from the Keras outputs"""
+    diff = np.abs(reference - predictions)
+    # risk_score as in SatelliteImageProcessor.build_results
+    risk_diff = np.abs(reference[:, 2:].mean(axis=1) - predictions[:, 2:].mean(axis=1))
+    return {
+        "top1_agreement": round(float(np.mean(reference.argmax(axis=1) == predictions.argmax(axis=1))), 4),
+        "max_abs_diff": round(float(diff.max()), 5),
+        "mean_abs_diff": round(float(diff.mean()), 6),
+        "risk_score_max_diff": round(float(risk_diff.max()), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--backends", type=str, default="keras,tflite,tflite-dynamic,tflite-int8")
+    parser.add_argument("--calibration-images", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0, help="TFLite threads (default: one per core)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="", help="write results as JSON")
+    args = parser.parse_args()
+
+    device = detect_device()
+    model = load_model()
+    input_shape = (IMAGE_SIZE[1], IMAGE_SIZE[0], 3)
+
+    print(f"Preparing {args.images} evaluation and {args.calibration_images} calibration images...")
+    batches = synthetic_batches(args.images, args.batch_size, args.seed)
+    # Calibrate on different images than the ones measured
+    calibration = synthetic_batches(args.calibration_images, args.batch_size, args.seed + 1)
+
+    kinds = [k for k in args.backends.split(",") if k]
+    if "keras" in kinds:
+        kinds.remove("keras")
+    kinds.insert(0, "keras")  # the reference for drift
+
+    results = []
+    reference = None
+    print(f"\n{'backend':<32} {'p50 ms':>8} {'p95 ms':>8} {'imgs/s':>8} {'top-1':>7} {'max diff':>9}")
+    for kind in kinds:
+        backend = create_backend(
+            kind, model, device,
+            num_threads=args.threads or None,
+            representative_batches=calibration if kind == "tflite-int8" else None
+        )
+        backend.warmup(input_shape, args.batch_size)
+        result = run_backend(backend, batches)
+        predictions = result.pop("predictions")
+        if reference is None:
+            reference = predictions
+        result.update(drift(reference, predictions))
+        result["kind"] = kind
+        results.append(result)
+        print(f"{result['backend']:<32} {result['batch_p50_ms']:>8.1f} {result['batch_p95_ms']:>8.1f} "
+              f"{result['imgs_per_sec']:>8.1f} {result['top1_agreement']:>7.1%} {result['max_abs_diff']:>9.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"device": device.tf_device, "cpu_count": os.cpu_count(), "images": args.images,
+                       "batch_size": args.batch_size, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
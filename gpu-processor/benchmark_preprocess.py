@@ -0,0 +1,136 @@
+"""
+Preprocessing throughput benchmark
+Decodes synthetic in-memory JPEGs through the image pipeline (no model,
+no network) in thread and process mode at increasing worker counts and
+reports imgs/sec and scaling relative to one worker
+
+    python benchmark_preprocess.py --images 400 --source-size 2048
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from image_decode import ProcessDecoder, decode_into
+from image_pipeline import ImagePipeline, SharedBatchBufferPool
+from image_sources import InMemoryImageSource
+
+IMAGE_SIZE = (512, 512)
+BATCH_SIZE = 10
+
+
+def synthetic_source(count: int, source_size: int, seed: int) -> InMemoryImageSource:
+    """Smooth noise (compresses like imagery, unlike white noise) encoded as JPEG"""
+    rng = np.random.default_rng(seed)
+    images = {}
+    for i in range(count):
+        coarse = rng.integers(0, 256, (source_size // 16, source_size // 16, 3), dtype=np.uint8)
+        img = cv2.resize(coarse, (source_size, source_size), interpolation=cv2.INTER_CUBIC)
+        img = cv2.add(img, rng.integers(0, 24, img.shape, dtype=np.uint8))
+        ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if ok:
+            images[f"synthetic_{i}.jpg"] = encoded.tobytes()
+    return InMemoryImageSource(images)
+
+
+def create_pipeline(source: InMemoryImageSource, mode: str, workers: int) -> ImagePipeline:
+    image_shape = (IMAGE_SIZE[1], IMAGE_SIZE[0], 3)
+    prefetch_batches = 2
+    if mode == "processes":
+        pool = SharedBatchBufferPool(ImagePipeline.buffer_count(prefetch_batches), BATCH_SIZE, image_shape)
+        decode = ProcessDecoder(pool, IMAGE_SIZE, workers)
+        decode_workers = workers * 2
+    else:
+        pool = None
+        decode = lambda ref, data, buffer, index: decode_into(data, buffer[index], IMAGE_SIZE)
+        decode_workers = workers
+    return ImagePipeline(
+        fetch=source.fetch,
+        decode=decode,
+        image_shape=image_shape,
+        batch_size=BATCH_SIZE,
+        fetch_workers=2,
+        decode_workers=decode_workers,
+        prefetch_batches=prefetch_batches,
+        pool=pool
+    )
+
+
+def run_once(source: InMemoryImageSource, mode: str, workers: int, warmup: int) -> Dict[str, Any]:
+    refs = list(source.list_images())
+    pipeline = create_pipeline(source, mode, workers)
+    try:
+        # Start worker processes and attach shared memory outside the timed run
+        for _ in pipeline.run(refs[:warmup]):
+            pass
+        images = 0
+        checksum = 0
+        started = time.perf_counter()
+        for batch_refs, batch in pipeline.run(refs):
+            images += len(batch_refs)
+            checksum += int(batch[:, 0, 0, 0].sum())
+        elapsed = time.perf_counter() - started
+    finally:
+        pipeline.close()
+    return {
+        "mode": mode,
+        "workers": workers,
+        "images": images,
+        "seconds": round(elapsed, 3),
+        "imgs_per_sec": round(images / elapsed, 1) if elapsed else 0.0,
+        "checksum": checksum,
+    }
+
+
+def default_worker_counts() -> List[int]:
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    if cores > 1:
+        counts.append(cores)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--source-size", type=int, default=1024, help="edge length of the encoded images")
+    parser.add_argument("--workers", type=str, default="", help="comma-separated worker counts (default 1, 2, 4 ... cores)")
+    parser.add_argument("--modes", type=str, default="threads,processes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="", help="write results as JSON")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",") if w] or default_worker_counts()
+    modes = [m for m in args.modes.split(",") if m]
+
+    print(f"Encoding {args.images} synthetic {args.source_size}px JPEGs...")
+    source = synthetic_source(args.images, args.source_size, args.seed)
+    print(f"CPU cores: {os.cpu_count()}, decoding to {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} uint8\n")
+
+    results = []
+    print(f"{'mode':<10} {'workers':>7} {'imgs/s':>9} {'scaling':>8}")
+    for mode in modes:
+        baseline = None
+        for workers in worker_counts:
+            result = run_once(source, mode, workers, warmup=min(len(source.images), BATCH_SIZE * 2))
+            baseline = baseline or result["imgs_per_sec"]
+            result["scaling"] = round(result["imgs_per_sec"] / baseline, 2) if baseline else 0.0
+            results.append(result)
+            print(f"{mode:<10} {workers:>7} {result['imgs_per_sec']:>9.1f} {result['scaling']:>7.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "images": args.images,
+                       "source_size": args.source_size, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Result publishing throughput benchmark
+Streams synthetic result records (per-image results and scene risk grids)
+through ResultPublisher into the in-memory Pub/Sub stand-in at several chunk
+sizes, with and without gzip, and compares against publishing one message
+per batch and waiting for it. Reports results/s, messages/s, bytes on the
+wire and retries; every run checks that all results arrived exactly once.
+
+    python benchmark_publish.py --results 20000 --latency 0.02 --fail-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from result_publisher import InMemoryPublisher, ResultPublisher
+
+BATCH_SIZE = 10
+LEVELS = ['low', 'medium', 'high', 'critical']
+
+
+def synthetic_results(count: int, scene_every: int, seed: int) -> List[Dict[str, Any]]:
+    """Image results, with a scene result carrying a 64x64 risk grid every `scene_every`"""
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        if scene_every and i % scene_every == scene_every - 1:
+            grid = [[round(rng.random(), 4) for _ in range(64)] for _ in range(64)]
+            results.append({
+                "image_path": f"scenes/scene_{i}.tif",
+                "congestion_level": rng.choice(LEVELS),
+                "risk_score": max(max(row) for row in grid),
+                "risk_grid": {"cell_size": 448, "risk": grid},
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            continue
+        results.append({
+            "image_path": f"images/port_{i:07d}.jpg",
+            "congestion_level": rng.choice(LEVELS),
+            "confidence": rng.random(),
+            "risk_score": rng.random() / 2,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    return results
+
+
+def envelope() -> Dict[str, Any]:
+    return {"processed_at": datetime.utcnow().isoformat(), "gpu_used": False, "inference_backend": "benchmark"}
+
+
+def run_blocking(results: List[Dict[str, Any]], latency: float) -> Dict[str, Any]:
+    """One message per batch, waiting for each, as publish_results used to"""
+    publisher = InMemoryPublisher(latency=latency)
+    started = time.perf_counter()
+    sent = 0
+    for i in range(0, len(results), BATCH_SIZE):
+        data = json.dumps(dict(envelope(), results=results[i:i + BATCH_SIZE])).encode("utf-8")
+        publisher.publish("benchmark", data).result()
+        sent += len(data)
+    elapsed = time.perf_counter() - started
+    return {
+        "config": "blocking per batch",
+        "results_per_sec": round(len(results) / elapsed, 1),
+        "messages_per_sec": round(len(publisher.messages) / elapsed, 1),
+        "messages": len(publisher.messages),
+        "bytes_sent": sent,
+        "retries": 0,
+        "failures": 0,
+        "complete": True,
+    }
+
+
+def run_streaming(results: List[Dict[str, Any]], max_message_bytes: int, compression: str,
+                  latency: float, fail_rate: float, max_in_flight: int, seed: int) -> Dict[str, Any]:
+    publisher = InMemoryPublisher(latency=latency, fail_rate=fail_rate, seed=seed)
+    streamer = ResultPublisher(
+        publisher, "benchmark",
+        max_message_bytes=max_message_bytes,
+        compression=compression,
+        max_in_flight=max_in_flight,
+        retry_base_delay=0.01,
+        envelope=envelope
+    )
+    started = time.perf_counter()
+    for i in range(0, len(results), BATCH_SIZE):
+        streamer.add(results[i:i + BATCH_SIZE])
+    ok = streamer.drain()
+    elapsed = time.perf_counter() - started
+
+    received = [result["image_path"] for payload in publisher.decoded() for result in payload["results"]]
+    stats = streamer.get_stats()
+    return {
+        "config": f"{max_message_bytes // 1000} KB chunks, {compression}",
+        "results_per_sec": round(len(results) / elapsed, 1),
+        "messages_per_sec": round(stats["messages_published"] / elapsed, 1),
+        "messages": stats["messages_published"],
+        "bytes_sent": stats["bytes_sent"],
+        "retries": stats["retries"],
+        "failures": stats["failures"],
+        "peak_in_flight": stats["peak_in_flight"],
+        "complete": ok and sorted(received) == sorted(result["image_path"] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=10000)
+    parser.add_argument("--scene-every", type=int, default=100, help="one scene result (with risk grid) per N results, 0 for none")
+    parser.add_argument("--chunk-kb", type=str, default="64,256,1000", help="comma-separated max message sizes in KB")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated publish round trip in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of publish attempts that fail")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = synthetic_results(args.results, args.scene_every, args.seed)
+    print(f"{len(results)} synthetic results, {args.latency * 1000:.0f} ms publish latency, "
+          f"{args.fail_rate:.0%} failed attempts\n")
+
+    runs = [run_blocking(results, args.latency)]
+    for chunk_kb in [int(c) for c in args.chunk_kb.split(",") if c]:
+        for compression in ("none", "gzip"):
+            runs.append(run_streaming(results, chunk_kb * 1000, compression, args.latency,
+                                      args.fail_rate, args.max_in_flight, args.seed))
+
+    print(f"{'config':<24} {'results/s':>10} {'msgs/s':>8} {'messages':>9} {'MB sent':>8} {'retries':>8} {'complete':>9}")
+    for run in runs:
+        print(f"{run['config']:<24} {run['results_per_sec']:>10.0f} {run['messages_per_sec']:>8.1f} "
+              f"{run['messages']:>9} {run['bytes_sent'] / 1e6:>8.2f} {run['retries']:>8} {str(run['complete']):>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": args.results, "latency": args.latency,
+                       "fail_rate": args.fail_rate, "runs": runs}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
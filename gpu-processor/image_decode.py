@@ -0,0 +1,133 @@
+"""
+Image decoding shared by the thread and process preprocessing modes
+Only depends on OpenCV and NumPy so process-pool workers can import it
+without loading TensorFlow
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_scratch = threading.local()
+
+
+def decode_into(data, out: np.ndarray, image_size: Tuple[int, int]):
+    """
+    Decode an encoded image (bytes or memoryview, no copy) straight into
+    `out`, one slot of a batch buffer. uint8 slots receive raw pixels;
+    float32 slots are normalized in place via a per-thread uint8 scratch.
+    image_size is (width, height) as in cv2.resize.
+    """
+    img = cv2.imdecode(np.frombuffer(memoryview(data), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Failed to decode image")
+
+    target = out
+    if out.dtype != np.uint8:
+        target = getattr(_scratch, "image", None)
+        if target is None or target.shape != out.shape:
+            target = _scratch.image = np.empty(out.shape, dtype=np.uint8)
+
+    # Resize to model input size, writing into the destination
+    if img.shape[:2] == target.shape[:2]:
+        np.copyto(target, img)
+    else:
+        cv2.resize(img, image_size, dst=target)
+
+    if target is not out:
+        # Normalize pixel values
+        np.multiply(target, 1.0 / 255.0, out=out, casting="unsafe")
+
+
+# Process-pool mode
+
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _init_worker():
+    # One process per core already; keep OpenCV from oversubscribing
+    cv2.setNumThreads(1)
+
+
+def _ready(_) -> int:
+    return os.getpid()
+
+
+def _decode_into_shared(shm_name: str, shape: Tuple[int, ...], dtype: str, index: int, data: bytes,
+                        image_size: Tuple[int, int]):
+    """Worker entry point: decode into slot `index` of a shared batch buffer"""
+    entry = _attached.get(shm_name)
+    if entry is None:
+        # Workers share the parent's resource tracker, which unlinks the
+        # block only if the parent exits without closing the pool
+        shm = shared_memory.SharedMemory(name=shm_name)
+        entry = _attached[shm_name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    decode_into(data, entry[1][index], image_size)
+
+
+class DecodeProcesses:
+    """
+    Worker processes for ProcessDecoder, forked as soon as this is created
+
+    Fork is unsafe once TensorFlow has started its runtime threads, so a
+    process that runs a model creates this first (before listing devices or
+    loading the model) and hands it to every ProcessDecoder it builds
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn/forkserver would re-import the main script (and TensorFlow) in
+        # every worker; forked workers only ever run OpenCV/NumPy code
+        method = "fork" if "fork" in get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context(method),
+            initializer=_init_worker
+        )
+        # ProcessPoolExecutor forks on first use; start the workers now
+        list(self.executor.map(_ready, range(self.workers)))
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ProcessDecoder:
+    """
+    decode(ref, data, buffer, index) for ImagePipeline that runs on a pool
+    of worker processes. `pool` is the pipeline's SharedBatchBufferPool:
+    only the encoded bytes and a slot index cross the process boundary,
+    pixels are written into the shared batch buffer in place. Pass
+    `processes` to reuse workers forked earlier (they are then left running
+    on close()); otherwise `workers` processes are forked here
+    """
+
+    def __init__(self, pool, image_size: Tuple[int, int], workers: int = 0,
+                 processes: Optional[DecodeProcesses] = None):
+        self.pool = pool
+        self.image_size = image_size
+        self._owns_processes = processes is None
+        self.processes = processes or DecodeProcesses(workers)
+        self.workers = self.processes.workers
+
+    def __call__(self, ref, data, buffer: np.ndarray, index: int):
+        self.processes.submit(
+            _decode_into_shared,
+            self.pool.name_of(buffer),
+            self.pool.shape,
+            self.pool.dtype.str,
+            index,
+            data,
+            self.image_size
+        ).result()
+
+    def close(self):
+        if self._owns_processes:
+            self.processes.close()
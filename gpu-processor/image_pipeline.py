@@ -0,0 +1,418 @@
+"""
+Streaming fetch -> decode -> inference pipeline
+Fetcher threads pull encoded images from a source and decode workers write
+them straight into slots of preallocated batch buffers, which are handed
+to the inference loop through a bounded prefetch queue and recycled once
+the consumer is done with them. Every hand-off is bounded, so the stages
+overlap while memory stays capped and steady-state runs allocate no
+per-batch arrays.
+"""
+
+import os
+import queue
+import resource
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_DONE = object()
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    """Blocking get that returns _DONE once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def memory_usage() -> Dict[str, float]:
+    """Current and peak resident set size of this process in MB"""
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    current_mb = None
+    try:
+        with open("/proc/self/statm") as f:
+            current_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        pass
+    return {
+        "rss_mb": round(current_mb, 1) if current_mb is not None else None,
+        "peak_rss_mb": round(max(peak_mb, current_mb or 0.0), 1),
+    }
+
+
+class StageTimer:
+    """Busy time and item counts for one stage (shared by its threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.bytes = 0
+
+    def add(self, seconds: float, nbytes: int = 0):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+            self.bytes += nbytes
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "bytes": self.bytes,
+        }
+
+
+class BatchBufferPool:
+    """Fixed set of reusable (batch, H, W, C) arrays"""
+
+    def __init__(self, count: int, batch_size: int, image_shape: Tuple[int, int, int], dtype=np.uint8):
+        self.buffers = [np.empty((batch_size,) + tuple(image_shape), dtype=dtype) for _ in range(count)]
+        self._free: queue.Queue = queue.Queue()
+        for buffer in self.buffers:
+            self._free.put(buffer)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers)
+
+    def acquire(self, stop: threading.Event) -> Any:
+        return _get(self._free, stop)
+
+    def release(self, buffer: np.ndarray):
+        self._free.put(buffer)
+
+    def close(self):
+        pass
+
+
+class SharedBatchBufferPool(BatchBufferPool):
+    """
+    Batch buffers backed by multiprocessing.shared_memory blocks, so decode
+    worker processes can write pixels where the inference loop reads them
+    """
+
+    def __init__(self, count: int, batch_size: int, image_shape: Tuple[int, int, int], dtype=np.uint8):
+        self.shape = (batch_size,) + tuple(image_shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._nbytes = nbytes * count
+        self._blocks = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(count)]
+        self.buffers = [np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf) for block in self._blocks]
+        self._names = {id(buffer): block.name for buffer, block in zip(self.buffers, self._blocks)}
+        self._free = queue.Queue()
+        for buffer in self.buffers:
+            self._free.put(buffer)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def name_of(self, buffer: np.ndarray) -> str:
+        return self._names[id(buffer)]
+
+    def close(self):
+        """Unlink the blocks; buffers must not be used afterwards"""
+        self.buffers = []
+        self._free = queue.Queue()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+class _Batch:
+    __slots__ = ("buffer", "refs", "claimed", "committed", "sealed")
+
+    def __init__(self, buffer: np.ndarray):
+        self.buffer = buffer
+        self.refs: List[Any] = []
+        self.claimed = 0
+        self.committed = 0
+        self.sealed = False
+
+
+class _BatchAssembler:
+    """
+    Hands out buffer slots to decode workers and emits a batch once it is
+    sealed (full or end of stream) and every claimed slot has been written
+    """
+
+    def __init__(self, pool: BatchBufferPool, batch_size: int, batch_q: queue.Queue, stop: threading.Event):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_q = batch_q
+        self.stop = stop
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._acquiring = False
+        self._current: Optional[_Batch] = None
+
+    def claim(self, ref: Any) -> Optional[Tuple[_Batch, int]]:
+        with self._lock:
+            # One decoder fetches the next buffer; the rest wait for it to be published
+            while self._current is None and self._acquiring:
+                if self.stop.is_set():
+                    return None
+                self._published.wait(0.1)
+            if self._current is not None:
+                return self._take_slot(ref)
+            self._acquiring = True
+
+        # Blocks while every buffer is queued or in inference (backpressure).
+        # Outside the lock, so other decoders can still commit and seal the
+        # batches whose release frees a buffer.
+        claim = None
+        buffer = _DONE
+        try:
+            buffer = self.pool.acquire(self.stop)
+        finally:
+            with self._lock:
+                self._acquiring = False
+                if buffer is not _DONE:
+                    self._current = _Batch(buffer)
+                    claim = self._take_slot(ref)
+                self._published.notify_all()
+        return claim
+
+    def _take_slot(self, ref: Any) -> Tuple[_Batch, int]:
+        batch = self._current
+        index = batch.claimed
+        batch.claimed += 1
+        batch.refs.append(ref)
+        if batch.claimed == self.batch_size:
+            batch.sealed = True
+            self._current = None
+        return batch, index
+
+    def commit(self, batch: _Batch):
+        with self._lock:
+            batch.committed += 1
+            ready = batch.sealed and batch.committed == batch.claimed
+        if ready:
+            self._emit(batch)
+
+    def abandon(self, batch: _Batch, index: int):
+        """A claimed slot could not be written"""
+        with self._lock:
+            # The newest claim of the batch being filled can simply be handed back
+            if batch is self._current and index == batch.claimed - 1:
+                batch.claimed -= 1
+                batch.refs.pop()
+                return
+            # Otherwise leave a hole that is compacted before inference
+            batch.refs[index] = None
+            batch.committed += 1
+            ready = batch.sealed and batch.committed == batch.claimed
+        if ready:
+            self._emit(batch)
+
+    def finish(self):
+        """Seal the partial batch at end of stream"""
+        with self._lock:
+            batch, self._current = self._current, None
+            if batch is None:
+                return
+            batch.sealed = True
+            ready = batch.committed == batch.claimed
+        if ready:
+            self._emit(batch)
+
+    def _emit(self, batch: _Batch):
+        if batch.claimed == 0:
+            self.pool.release(batch.buffer)
+            return
+        _put(self.batch_q, batch, self.stop)
+
+
+class ImagePipeline:
+    """
+    Overlapped image processing into reusable batch buffers
+
+    fetch(ref) -> bytes runs on `fetch_workers` threads (I/O bound);
+    decode(ref, data, buffer, index) writes one image into slot `index` of
+    a pooled batch buffer on `decode_workers` threads (OpenCV releases the
+    GIL, or the decoder hands the work to processes writing into a
+    SharedBatchBufferPool passed as `pool`). run() yields
+    (refs, batch) where batch is a view of a pooled buffer: it is only
+    valid until the consumer asks for the next batch. At most
+    `prefetch_batches` batches are ready ahead of the consumer. Results
+    come out in completion order, not listing order. close() releases
+    the pool and the decoder when they hold resources.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[Any], bytes],
+                 decode: Callable[[Any, bytes, np.ndarray, int], None],
+                 image_shape: Tuple[int, int, int],
+                 dtype=np.uint8,
+                 batch_size: int = 10,
+                 fetch_workers: int = 8,
+                 decode_workers: int = 4,
+                 prefetch_batches: int = 2,
+                 pool: Optional[BatchBufferPool] = None):
+        self.fetch = fetch
+        self.decode = decode
+        self.batch_size = batch_size
+        self.fetch_workers = fetch_workers
+        self.decode_workers = decode_workers
+        self.prefetch_batches = prefetch_batches
+
+        self.pool = pool or BatchBufferPool(self.buffer_count(prefetch_batches), batch_size, image_shape, dtype)
+
+        self.fetch_stats = StageTimer()
+        self.decode_stats = StageTimer()
+        self.failures: List[Tuple[Any, str]] = []
+        self.consumer_wait_seconds = 0.0
+        self._failures_lock = threading.Lock()
+
+    @staticmethod
+    def buffer_count(prefetch_batches: int) -> int:
+        # Queued batches + one being filled + one in inference
+        return prefetch_batches + 2
+
+    def _fail(self, ref: Any, stage: str, error: Exception):
+        with self._failures_lock:
+            self.failures.append((ref, f"{stage}: {error}"))
+        print(f"Error {stage} {getattr(ref, 'name', ref)}: {error}")
+
+    def _fetcher(self, refs: Iterator[Any], refs_lock: threading.Lock, raw_q: queue.Queue, stop: threading.Event):
+        while not stop.is_set():
+            with refs_lock:
+                ref = next(refs, _DONE)
+            if ref is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                data = self.fetch(ref)
+            except Exception as e:
+                self.fetch_stats.error()
+                self._fail(ref, "fetching", e)
+                continue
+            self.fetch_stats.add(time.perf_counter() - started, getattr(data, "nbytes", None) or len(data))
+            if not _put(raw_q, (ref, data), stop):
+                return
+
+    def _decoder(self, raw_q: queue.Queue, assembler: _BatchAssembler, stop: threading.Event):
+        while True:
+            item = _get(raw_q, stop)
+            if item is _DONE:
+                return
+            ref, data = item
+            claim = assembler.claim(ref)
+            if claim is None:
+                return
+            batch, index = claim
+            started = time.perf_counter()
+            try:
+                self.decode(ref, data, batch.buffer, index)
+            except Exception as e:
+                self.decode_stats.error()
+                self._fail(ref, "decoding", e)
+                assembler.abandon(batch, index)
+                continue
+            self.decode_stats.add(time.perf_counter() - started)
+            assembler.commit(batch)
+
+    def _finish(self, fetchers: List[threading.Thread], decoders: List[threading.Thread],
+                raw_q: queue.Queue, assembler: _BatchAssembler, batch_q: queue.Queue, stop: threading.Event):
+        # Shut each stage down once everything upstream of it has finished
+        for thread in fetchers:
+            thread.join()
+        for _ in decoders:
+            _put(raw_q, _DONE, stop)
+        for thread in decoders:
+            thread.join()
+        assembler.finish()
+        _put(batch_q, _DONE, stop)
+
+    @staticmethod
+    def _compact(batch: _Batch) -> Tuple[List[Any], np.ndarray]:
+        """Drop slots abandoned after a decode failure"""
+        if all(ref is not None for ref in batch.refs):
+            return batch.refs, batch.buffer[:batch.claimed]
+        keep = [i for i, ref in enumerate(batch.refs) if ref is not None]
+        for target, source in enumerate(keep):
+            if target != source:
+                batch.buffer[target] = batch.buffer[source]
+        return [batch.refs[i] for i in keep], batch.buffer[:len(keep)]
+
+    def run(self, refs: Iterable[Any]) -> Iterator[Tuple[List[Any], np.ndarray]]:
+        """Yield (refs, batch) as batches become ready"""
+        raw_q: queue.Queue = queue.Queue(maxsize=self.fetch_workers * 2)
+        batch_q: queue.Queue = queue.Queue(maxsize=self.prefetch_batches)
+        stop = threading.Event()
+        refs_lock = threading.Lock()
+        iterator = iter(refs)
+        assembler = _BatchAssembler(self.pool, self.batch_size, batch_q, stop)
+
+        fetchers = [
+            threading.Thread(target=self._fetcher, args=(iterator, refs_lock, raw_q, stop), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        decoders = [
+            threading.Thread(target=self._decoder, args=(raw_q, assembler, stop), daemon=True)
+            for _ in range(self.decode_workers)
+        ]
+        finisher = threading.Thread(
+            target=self._finish, args=(fetchers, decoders, raw_q, assembler, batch_q, stop), daemon=True
+        )
+        threads = fetchers + decoders + [finisher]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                waited_from = time.perf_counter()
+                batch = batch_q.get()
+                self.consumer_wait_seconds += time.perf_counter() - waited_from
+                if batch is _DONE:
+                    break
+                batch_refs, view = self._compact(batch)
+                if batch_refs:
+                    yield batch_refs, view
+                # The consumer is done with the view once it asks for more
+                self.pool.release(batch.buffer)
+        finally:
+            # Also releases every stage if the consumer stopped early
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def close(self):
+        for resource_owner in (self.decode, self.pool):
+            close = getattr(resource_owner, "close", None)
+            if close is not None:
+                close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "fetch": self.fetch_stats.to_dict(),
+            "decode": self.decode_stats.to_dict(),
+            "failures": len(self.failures),
+            "inference_wait_seconds": round(self.consumer_wait_seconds, 4),
+            "buffer_pool_mb": round(self.pool.nbytes / 1e6, 1),
+        }
@@ -0,0 +1,131 @@
+"""
+Pluggable image sources for the satellite image processor
+A source lists image references and fetches their encoded bytes; the
+processor never touches the local filesystem for intermediate copies
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """One image in a source"""
+    name: str
+    size: int = 0
+    # Changes whenever the object is rewritten (GCS generation / file mtime in ns)
+    generation: str = ""
+    md5: Optional[str] = None
+    # Last modification time (epoch seconds) when the source knows it
+    updated: Optional[float] = None
+
+
+class GCSImageSource:
+    """Images in a Cloud Storage bucket"""
+
+    name = "gcs"
+
+    def __init__(self, bucket_name: str, prefix: str = "", client=None):
+        if client is None:
+            from google.cloud import storage
+            client = storage.Client()
+        self.client = client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.bucket = client.bucket(bucket_name)
+
+    def describe(self) -> str:
+        return f"gs://{self.bucket_name}/{self.prefix}"
+
+    def list_images(self, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS) -> Iterator[ImageRef]:
+        for blob in self.client.list_blobs(self.bucket_name, prefix=self.prefix):
+            if blob.name.lower().endswith(extensions):
+                yield ImageRef(
+                    blob.name, blob.size or 0, str(blob.generation or ""), blob.md5_hash,
+                    blob.updated.timestamp() if blob.updated else None
+                )
+
+    def fetch(self, ref: ImageRef) -> bytes:
+        blob = self.bucket.blob(ref.name)
+        if ref.generation:
+            blob = self.bucket.blob(ref.name, generation=int(ref.generation))
+        return blob.download_as_bytes()
+
+    def scene_uri(self, ref: ImageRef) -> str:
+        """GDAL path for windowed reads without downloading the object"""
+        return f"/vsigs/{self.bucket_name}/{ref.name}"
+
+
+class LocalDirectorySource:
+    """Images under a local directory (offline runs and benchmarks)"""
+
+    name = "local"
+
+    def __init__(self, root: str, recursive: bool = True):
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+
+    def describe(self) -> str:
+        return self.root
+
+    def list_images(self, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS) -> Iterator[ImageRef]:
+        if not os.path.isdir(self.root):
+            return
+        for directory, subdirs, files in os.walk(self.root):
+            # Skip hidden directories such as .processor_state
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+            for filename in sorted(files):
+                if filename.lower().endswith(extensions):
+                    path = os.path.join(directory, filename)
+                    stat = os.stat(path)
+                    yield ImageRef(os.path.relpath(path, self.root), stat.st_size, str(stat.st_mtime_ns),
+                                   updated=stat.st_mtime)
+            if not self.recursive:
+                break
+
+    def path_of(self, ref: ImageRef) -> str:
+        return os.path.join(self.root, ref.name)
+
+    def fetch(self, ref: ImageRef) -> bytes:
+        with open(self.path_of(ref), "rb") as f:
+            return f.read()
+
+    def scene_uri(self, ref: ImageRef) -> str:
+        return self.path_of(ref)
+
+
+class InMemoryImageSource:
+    """Encoded images held in memory (synthetic demo data, tests)"""
+
+    name = "memory"
+
+    def __init__(self, images: Dict[str, bytes]):
+        self.images = images
+
+    def describe(self) -> str:
+        return f"memory ({len(self.images)} images)"
+
+    def list_images(self, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS) -> Iterator[ImageRef]:
+        for name, data in self.images.items():
+            if name.lower().endswith(extensions):
+                yield ImageRef(name, len(data), hashlib.md5(data).hexdigest())
+
+    def fetch(self, ref: ImageRef) -> bytes:
+        return self.images[ref.name]
+
+
+def source_from_env() -> object:
+    """IMAGE_SOURCE=gcs (default) or local (reads LOCAL_IMAGE_DIR)"""
+    kind = os.getenv("IMAGE_SOURCE", "gcs")
+    if kind == "local":
+        return LocalDirectorySource(os.getenv("LOCAL_IMAGE_DIR", "./images"))
+    if kind == "gcs":
+        return GCSImageSource(
+            os.getenv("GCS_BUCKET", "supply-chain-satellite-images"),
+            prefix=os.getenv("GCS_PREFIX", "")
+        )
+    raise ValueError(f"Unknown IMAGE_SOURCE: {kind}")
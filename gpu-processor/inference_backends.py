@@ -0,0 +1,244 @@
+"""
+Pluggable inference backends for the satellite image processor
+Keras runs the model as-is (GPU hosts); TFLite runs a converted copy on
+CPU, optionally with int8 post-training quantization. Device detection
+happens once per process.
+"""
+
+import functools
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+QUANTIZATION_MODES = ("none", "dynamic", "int8")
+
+
+@dataclass(frozen=True)
+class DeviceInfo:
+    """Accelerators visible to TensorFlow"""
+    gpus: Tuple[str, ...] = ()
+
+    @property
+    def gpu(self) -> bool:
+        return bool(self.gpus)
+
+    @property
+    def tf_device(self) -> str:
+        return '/GPU:0' if self.gpu else '/CPU:0'
+
+
+@functools.lru_cache(maxsize=1)
+def detect_device() -> DeviceInfo:
+    """
+    List GPUs and enable memory growth, once per process
+    """
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        print(f"✓ GPU detected: {gpus}")
+        try:
+            # Enable memory growth to avoid OOM
+            for gpu in gpus:
+                tf.config.experimental.set_memory_growth(gpu, True)
+            print("✓ GPU memory growth enabled")
+        except RuntimeError as e:
+            print(f"GPU configuration error: {e}")
+    else:
+        print("⚠ No GPU detected - using CPU (slower)")
+    return DeviceInfo(tuple(gpu.name for gpu in gpus))
+
+
+class InferenceBackend:
+    """
+    predict(batch) -> (n, classes) float32 probabilities for a uint8 batch
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.warmup_seconds = 0.0
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def warmup(self, input_shape: Tuple[int, int, int], batch_size: int, runs: int = 2):
+        """
+        Run a few zero batches so graph tracing, tensor allocation and
+        kernel selection happen before the first real batch
+        """
+        batch = np.zeros((batch_size,) + tuple(input_shape), dtype=np.uint8)
+        started = time.perf_counter()
+        for _ in range(runs):
+            self.predict(batch)
+        self.warmup_seconds = time.perf_counter() - started
+
+    def describe(self) -> str:
+        return self.name
+
+
+class KerasBackend(InferenceBackend):
+    """The Keras model on the detected device"""
+
+    name = "keras"
+
+    def __init__(self, model: tf.keras.Model, device: DeviceInfo):
+        super().__init__()
+        self.model = model
+        self.device = device
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        with tf.device(self.device.tf_device):
+            # predict_on_batch skips predict()'s per-call dataset and callback setup
+            return np.asarray(self.model.predict_on_batch(batch))
+
+    def describe(self) -> str:
+        return f"keras ({self.device.tf_device})"
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    A converted model on the TFLite interpreter
+    Handles float, uint8 and int8-quantized input/output tensors.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_content: bytes, num_threads: Optional[int] = None, quantization: str = "none"):
+        super().__init__()
+        self.quantization = quantization
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.interpreter = tf.lite.Interpreter(model_content=model_content, num_threads=self.num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_len = None
+
+    def _resize(self, batch_len: int, image_shape: Tuple[int, ...]):
+        self.interpreter.resize_tensor_input(self.input["index"], (batch_len,) + tuple(image_shape))
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_len = batch_len
+
+    def _to_input(self, batch: np.ndarray) -> np.ndarray:
+        dtype = self.input["dtype"]
+        if dtype == batch.dtype:
+            return batch
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            # Quantized input: map pixel values onto the tensor's scale
+            return np.clip(np.round(batch / scale + zero_point), np.iinfo(dtype).min, np.iinfo(dtype).max).astype(dtype)
+        return batch.astype(dtype)
+
+    def _from_output(self, output: np.ndarray) -> np.ndarray:
+        scale, zero_point = self.output["quantization"]
+        if scale and output.dtype != np.float32:
+            return (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        if len(batch) != self._batch_len:
+            self._resize(len(batch), batch.shape[1:])
+        self.interpreter.set_tensor(self.input["index"], self._to_input(batch))
+        self.interpreter.invoke()
+        # get_tensor copies; the interpreter reuses its output buffer
+        return self._from_output(self.interpreter.get_tensor(self.output["index"]))
+
+    def describe(self) -> str:
+        return f"tflite ({self.quantization}, {self.num_threads} threads)"
+
+
+def convert_to_tflite(model: tf.keras.Model,
+                      quantization: str = "none",
+                      representative_batches: Optional[Iterable[np.ndarray]] = None) -> bytes:
+    """
+    Convert a Keras model to a TFLite flatbuffer
+    "dynamic" quantizes weights to int8; "int8" also quantizes activations
+    using representative_batches (uint8 image batches) for calibration and
+    keeps float ops as a fallback where no int8 kernel exists.
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization: {quantization}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        if representative_batches is None:
+            raise ValueError("int8 quantization needs representative_batches")
+        input_dtype = tf.as_dtype(model.inputs[0].dtype).as_numpy_dtype
+
+        def representative_dataset():
+            for batch in representative_batches:
+                for image in batch:
+                    yield [np.asarray(image[None], dtype=input_dtype)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+        ]
+    return converter.convert()
+
+
+def model_fingerprint(model: tf.keras.Model) -> str:
+    """Hash of architecture and weights, to key cached conversions"""
+    digest = hashlib.sha256(model.to_json().encode("utf-8"))
+    for weights in model.get_weights():
+        digest.update(np.ascontiguousarray(weights).data)
+    return digest.hexdigest()[:16]
+
+
+def load_or_convert(model: tf.keras.Model,
+                    quantization: str,
+                    cache_dir: Optional[str] = None,
+                    representative_batches: Optional[Iterable[np.ndarray]] = None) -> bytes:
+    """
+    convert_to_tflite with an optional on-disk cache keyed by the model
+    fingerprint, so repeated job runs skip conversion and calibration
+    """
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"model-{model_fingerprint(model)}-{quantization}.tflite")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+
+    started = time.perf_counter()
+    content = convert_to_tflite(model, quantization, representative_batches)
+    print(f"✓ Converted model to TFLite ({quantization}) in {time.perf_counter() - started:.1f}s, "
+          f"{len(content) / 1e6:.1f} MB")
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return content
+
+
+def create_backend(kind: str,
+                   model: tf.keras.Model,
+                   device: DeviceInfo,
+                   num_threads: Optional[int] = None,
+                   cache_dir: Optional[str] = None,
+                   representative_batches: Optional[Iterable[np.ndarray]] = None) -> InferenceBackend:
+    """
+    kind: keras, tflite (float), tflite-dynamic (int8 weights), tflite-int8
+    (int8 weights and activations, needs representative_batches), or auto:
+    Keras on GPU, tflite-dynamic on CPU, which keeps activations in float so
+    outputs stay within ~1e-3 of Keras (see benchmark_inference.py)
+    """
+    if kind == "auto":
+        kind = "keras" if device.gpu else "tflite-dynamic"
+    if kind == "keras":
+        return KerasBackend(model, device)
+    if kind.startswith("tflite"):
+        quantization = kind.partition("-")[2] or "none"
+        content = load_or_convert(model, quantization, cache_dir, representative_batches)
+        return TFLiteBackend(content, num_threads, quantization)
+    raise ValueError(f"Unknown INFERENCE_BACKEND: {kind}")
@@ -4,55 +4,148 @@ Cloud Run Job with NVIDIA L4 GPU for analyzing satellite imagery
 """
 
 import os
+import signal
 import sys
+import threading
 import time
 import numpy as np
 import cv2
 from PIL import Image
 import tensorflow as tf
-from google.cloud import storage, pubsub_v1
-import json
-from typing import Dict, List, Any
+from google.cloud import pubsub_v1
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from datetime import datetime
 
+from image_decode import DecodeProcesses, ProcessDecoder, decode_into
+from image_pipeline import ImagePipeline, SharedBatchBufferPool, memory_usage
+from image_sources import IMAGE_EXTENSIONS, ImageRef, InMemoryImageSource, source_from_env
+from inference_backends import InferenceBackend, create_backend, detect_device
+from result_publisher import InMemoryPublisher, ResultPublisher
+from run_manifest import RunManifest, parse_time, state_store_from_env
+from scene_tiling import SCENE_EXTENSIONS, RiskGrid, TiledSceneAnalyzer, open_scene
+
 class SatelliteImageProcessor:
     """
     GPU-accelerated processor for satellite imagery analysis
     Detects port congestion, weather patterns, and infrastructure issues
     """
 
-    def __init__(self):
+    def __init__(self, source=None):
         self.batch_size = 10
         self.image_size = (512, 512)
 
-        # Check GPU availability
-        gpus = tf.config.list_physical_devices('GPU')
-        if gpus:
-            print(f"✓ GPU detected: {gpus}")
-            try:
-                # Enable memory growth to avoid OOM
-                for gpu in gpus:
-                    tf.config.experimental.set_memory_growth(gpu, True)
-                print("✓ GPU memory growth enabled")
-            except RuntimeError as e:
-                print(f"GPU configuration error: {e}")
+        # Overlapped fetch/decode/inference settings
+        self.fetch_workers = int(os.getenv("FETCH_WORKERS", "8"))
+        self.decode_workers = int(os.getenv("DECODE_WORKERS", "4"))
+        self.prefetch_batches = int(os.getenv("PREFETCH_BATCHES", "2"))
+
+        # "threads" decodes on DECODE_WORKERS threads; "processes" decodes on a
+        # process pool writing into shared-memory batch buffers (CPU-only hosts)
+        self.preprocess_mode = os.getenv("PREPROCESS_MODE", "threads")
+        if self.preprocess_mode not in ("threads", "processes"):
+            raise ValueError(f"Unknown PREPROCESS_MODE: {self.preprocess_mode}")
+        self.preprocess_workers = int(os.getenv("PREPROCESS_WORKERS", "0")) or os.cpu_count() or 1
+        # Fork the decode workers now: device detection and model loading
+        # below start TensorFlow's thread pools, after which forking is unsafe
+        self.decode_processes = DecodeProcesses(self.preprocess_workers) if self.preprocess_mode == "processes" else None
+
+        # "resize" squashes each image to the model input; "tiles" reads large
+        # scenes window by window and returns a risk grid (see scene_tiling.py)
+        self.scene_mode = os.getenv("SCENE_MODE", "resize")
+        if self.scene_mode not in ("resize", "tiles"):
+            raise ValueError(f"Unknown SCENE_MODE: {self.scene_mode}")
+        self.tile_size = int(os.getenv("TILE_SIZE", "512"))
+        self.tile_overlap = int(os.getenv("TILE_OVERLAP", "64"))
+        self.inference_seconds = 0.0
+        self.batch_memory: List[Dict[str, Any]] = []
+
+        # Images stay uint8 until the model's first layer rescales them
+        self.input_dtype = np.uint8
+        self._batch_buffer: Optional[np.ndarray] = None
+
+        # Check GPU availability (once; reused for inference and publishing)
+        self.device = detect_device()
+
+        # Where images come from (Cloud Storage by default, see image_sources.py)
+        self.source = source or source_from_env()
+
+        # Initialize Pub/Sub client for publishing results (RESULT_PUBLISHER=memory for a local stand-in)
+        if os.getenv("RESULT_PUBLISHER", "pubsub") == "memory":
+            self.publisher = InMemoryPublisher()
         else:
-            print("⚠ No GPU detected - using CPU (slower)")
-
-        # Initialize Cloud Storage client
-        self.storage_client = storage.Client()
-        self.bucket_name = os.getenv("GCS_BUCKET", "supply-chain-satellite-images")
-
-        # Initialize Pub/Sub client for publishing results
-        self.publisher = pubsub_v1.PublisherClient()
+            self.publisher = pubsub_v1.PublisherClient(batch_settings=pubsub_v1.types.BatchSettings(
+                max_messages=int(os.getenv("PUBSUB_BATCH_MAX_MESSAGES", "100")),
+                max_bytes=int(os.getenv("PUBSUB_BATCH_MAX_BYTES", "5000000")),
+                max_latency=float(os.getenv("PUBSUB_BATCH_MAX_LATENCY", "0.05"))
+            ))
         self.topic_path = self.publisher.topic_path(
             os.getenv("GCP_PROJECT_ID", "my-project"),
             "satellite-analysis-results"
         )
+        # Results stream out in size-bounded chunks as batches complete
+        self.result_publisher = ResultPublisher(
+            self.publisher,
+            self.topic_path,
+            max_message_bytes=int(os.getenv("PUBLISH_MAX_MESSAGE_BYTES", "1000000")),
+            compression=os.getenv("PUBLISH_COMPRESSION", "none"),
+            max_in_flight=int(os.getenv("PUBLISH_MAX_IN_FLIGHT", "32")),
+            max_retries=int(os.getenv("PUBLISH_RETRIES", "5")),
+            envelope=self.result_envelope
+        )
 
         # Load or create model
         self.model = self.load_model()
 
+        # Inference backend: auto = Keras on GPU, quantized TFLite on CPU (see inference_backends.py)
+        self.backend = self.create_backend(os.getenv("INFERENCE_BACKEND", "auto"))
+
+    def create_backend(self, kind: str) -> InferenceBackend:
+        """
+        Build and warm up the inference backend for the loaded model
+        """
+        backend = create_backend(
+            kind,
+            self.model,
+            self.device,
+            num_threads=int(os.getenv("TFLITE_THREADS", "0")) or None,
+            cache_dir=os.getenv("TFLITE_CACHE_DIR") or None,
+            representative_batches=self.calibration_batches() if kind == "tflite-int8" else None
+        )
+        backend.warmup(self.input_shape, self.batch_size)
+        print(f"✓ Inference backend: {backend.describe()} (warm-up {backend.warmup_seconds:.2f}s)")
+        return backend
+
+    def calibration_batches(self) -> Iterator[np.ndarray]:
+        """
+        uint8 batches for int8 calibration: the first INT8_CALIBRATION_IMAGES
+        images of the source, or synthetic images if it has none
+        """
+        limit = int(os.getenv("INT8_CALIBRATION_IMAGES", "50"))
+        try:
+            refs = [ref for _, ref in zip(range(limit), self.source.list_images())]
+            source = self.source
+        except Exception as e:
+            print(f"Error listing calibration images: {e}")
+            refs = []
+        if not refs:
+            source = self.generate_synthetic_source(limit)
+            refs = list(source.list_images())
+
+        batch = np.empty((self.batch_size,) + self.input_shape, dtype=self.input_dtype)
+        count = 0
+        for ref in refs:
+            try:
+                self.decode_into(source.fetch(ref), batch[count])
+            except Exception as e:
+                print(f"Skipping calibration image {ref.name}: {e}")
+                continue
+            count += 1
+            if count == self.batch_size:
+                yield batch
+                count = 0
+        if count:
+            yield batch[:count]
+
     def load_model(self) -> tf.keras.Model:
         """
         Load pre-trained model or create a simple CNN for demo
@@ -62,18 +155,21 @@ class SatelliteImageProcessor:
 
         if os.path.exists(model_path):
             print(f"Loading model from {model_path}")
-            return tf.keras.models.load_model(model_path)
+            return self.with_uint8_input(tf.keras.models.load_model(model_path))
         else:
             print("Creating demo model (replace with trained model in production)")
             return self.create_demo_model()
 
-    def create_demo_model(self) -> tf.keras.Model:
+    @staticmethod
+    def create_demo_model() -> tf.keras.Model:
         """
         Create a simple CNN for demonstration
         In production, use a trained model (e.g., ResNet, EfficientNet)
         """
         model = tf.keras.Sequential([
-            tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(512, 512, 3)),
+            tf.keras.Input(shape=(512, 512, 3), dtype=tf.uint8),
+            tf.keras.layers.Rescaling(1.0 / 255),  # Normalize on the accelerator
+            tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
             tf.keras.layers.MaxPooling2D((2, 2)),
             tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
             tf.keras.layers.MaxPooling2D((2, 2)),
@@ -91,112 +187,329 @@ class SatelliteImageProcessor:
 
         return model
 
+    @staticmethod
+    def with_uint8_input(model: tf.keras.Model) -> tf.keras.Model:
+        """
+        Wrap a model trained on [0, 1] floats so it accepts raw uint8 pixels
+        """
+        if model.inputs and model.inputs[0].dtype == tf.uint8:
+            return model
+        inputs = tf.keras.Input(shape=model.input_shape[1:], dtype=tf.uint8)
+        outputs = model(tf.keras.layers.Rescaling(1.0 / 255)(inputs))
+        return tf.keras.Model(inputs, outputs)
+
+    @property
+    def input_shape(self) -> tuple:
+        """(height, width, channels) of one model input"""
+        return (self.image_size[1], self.image_size[0], 3)
+
+    def decode_into(self, data, out: np.ndarray):
+        """
+        Decode an encoded image straight into `out`, one slot of a batch
+        buffer (see image_decode.decode_into)
+        """
+        decode_into(data, out, self.image_size)
+
+    def decode_image(self, data: bytes) -> np.ndarray:
+        """
+        Decode an encoded image held in memory into a normalized float32 array
+        """
+        img = np.empty(self.input_shape, dtype=np.float32)
+        self.decode_into(data, img)
+        return img
+
     def preprocess_image(self, image_path: str) -> np.ndarray:
         """
         Preprocess satellite image for model input
         """
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        try:
+            return self.decode_image(data)
+        except ValueError:
             raise ValueError(f"Failed to load image: {image_path}")
 
-        # Resize to model input size
-        img = cv2.resize(img, self.image_size)
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run inference on a preprocessed batch
+        """
+        return self.backend.predict(batch)
+
+    def build_results(self, names: List[str], predictions: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Turn class probabilities into result records
+        """
+        results = []
+        for name, pred in zip(names, predictions):
+            congestion_level = ['low', 'medium', 'high', 'critical'][np.argmax(pred)]
+            confidence = float(np.max(pred))
 
-        # Normalize pixel values
-        img = img.astype(np.float32) / 255.0
+            results.append({
+                "image_path": name,
+                "congestion_level": congestion_level,
+                "confidence": confidence,
+                "risk_score": float(np.mean(pred[2:])),  # Average of high/critical probabilities
+                "timestamp": datetime.utcnow().isoformat()
+            })
 
-        return img
+        return results
+
+    @staticmethod
+    def risk_scores(predictions: np.ndarray) -> np.ndarray:
+        """
+        Average of high/critical probabilities per prediction
+        """
+        return predictions[:, 2:].mean(axis=1)
+
+    def analyze_scene(self, uri: str) -> RiskGrid:
+        """
+        Run overlapping tiles of a large scene through the model in batches
+        Windows are read on the fetch threads and placed into pooled batch
+        buffers, so memory is bounded by the tiles in flight
+        """
+        with open_scene(uri) as scene:
+            analyzer = TiledSceneAnalyzer(scene, self.tile_size, self.tile_overlap, self.input_shape, self.risk_scores)
+            pipeline = ImagePipeline(
+                fetch=scene.read_window,
+                decode=lambda window, tile, buffer, index: analyzer.place(tile, buffer[index]),
+                image_shape=self.input_shape,
+                dtype=self.input_dtype,
+                batch_size=self.batch_size,
+                fetch_workers=self.fetch_workers,
+                decode_workers=self.decode_workers,
+                prefetch_batches=self.prefetch_batches
+            )
+            try:
+                for windows, batch in pipeline.run(analyzer.windows()):
+                    start_time = time.time()
+                    predictions = self.predict_batch(batch)
+                    self.inference_seconds += time.time() - start_time
+                    analyzer.add(windows, predictions)
+            finally:
+                pipeline.close()
+            if pipeline.failures:
+                print(f"⚠ {len(pipeline.failures)} tiles of {uri} could not be read")
+            return analyzer.grid()
+
+    def build_scene_result(self, name: str, grid: RiskGrid) -> Dict[str, Any]:
+        """
+        Result record for a tiled scene: level of the riskiest tile plus the full risk grid
+        """
+        worst = grid.worst_tile or {"class_index": 0}
+        return {
+            "image_path": name,
+            "mode": "tiles",
+            "congestion_level": ['low', 'medium', 'high', 'critical'][worst["class_index"]],
+            "risk_score": float(grid.peak.max()),
+            "mean_risk_score": float(grid.risk.mean()),
+            "risk_grid": grid.to_dict(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def run_scenes(self, refs: List[ImageRef], manifest: RunManifest, stop: threading.Event) -> int:
+        """
+        Tiled analysis of each scene, recorded in the manifest as it completes
+        """
+        analyzed = 0
+        for ref in refs:
+            if stop.is_set():
+                break
+            start_time = time.time()
+            try:
+                grid = self.analyze_scene(self.source.scene_uri(ref))
+            except Exception as e:
+                print(f"Error analyzing scene {ref.name}: {e}")
+                continue
+            memory = memory_usage()
+            print(f"✓ {ref.name}: {grid.tiles} tiles in {time.time() - start_time:.2f}s, "
+                  f"{grid.risk.shape[0]}x{grid.risk.shape[1]} grid, max risk {grid.peak.max():.3f}, "
+                  f"peak RSS {memory['peak_rss_mb']} MB")
+            result = self.build_scene_result(ref.name, grid)
+            manifest.record(ref, result)
+            self.publish_results([result])
+            analyzed += 1
+            # Scenes are slow; checkpoint after each one
+            self.checkpoint(manifest)
+        return analyzed
+
+    def run_images(self, refs: List[ImageRef], manifest: RunManifest, stop: threading.Event) -> int:
+        """
+        Stream images through fetch -> decode -> inference, recording results
+        in the manifest and checkpointing as they complete
+        """
+        by_name = {ref.name: ref for ref in refs}
+        processed = 0
+        pipeline = self.create_pipeline()
+        start_time = time.time()
+        self.inference_seconds = 0.0
+        self.batch_memory = []
+        print(f"Preprocessing with {self.preprocess_mode}"
+              + (f" ({self.preprocess_workers} workers)" if self.preprocess_mode == "processes" else ""))
+        try:
+            for results in self.process_stream(refs, pipeline):
+                for result in results:
+                    manifest.record(by_name[result["image_path"]], result)
+                self.publish_results(results)
+                processed += len(results)
+                memory = self.batch_memory[-1]
+                print(f"  Batch of {len(results)} done ({processed}/{len(refs)}) "
+                      f"RSS {memory['rss_mb']} MB, peak {memory['peak_rss_mb']} MB")
+                if manifest.due():
+                    self.checkpoint(manifest)
+                if stop.is_set():
+                    break
+        finally:
+            pipeline.close()
+
+        elapsed = time.time() - start_time
+        if processed:
+            print(f"✓ {processed} images in {elapsed:.2f}s ({processed/elapsed:.1f} imgs/s), "
+                  f"inference busy {self.inference_seconds / elapsed:.0%} of wall time")
+            print(f"  Pipeline stats: {pipeline.get_stats()}")
+        return processed
+
+    def open_manifest(self) -> RunManifest:
+        """
+        Manifest of already analyzed images in the state store for the source
+        """
+        manifest = RunManifest(
+            state_store_from_env(self.source),
+            checkpoint_every=int(os.getenv("CHECKPOINT_EVERY", "100")),
+            checkpoint_seconds=float(os.getenv("CHECKPOINT_SECONDS", "60"))
+        )
+        try:
+            loaded = manifest.load()
+        except Exception as e:
+            # Without the manifest everything is reprocessed, which is safe
+            print(f"Error loading manifest from {manifest.describe()}: {e}")
+            loaded = 0
+        print(f"Manifest: {loaded} images already analyzed ({manifest.describe()})")
+        return manifest
+
+    def checkpoint(self, manifest: RunManifest):
+        """
+        Wait until results recorded since the last checkpoint are published,
+        then persist them. Results are published at least once: a crash
+        between the two steps republishes them on resume
+        """
+        if not manifest.pending:
+            return
+        if not self.result_publisher.drain():
+            # Not in the manifest, so the next run analyzes them again
+            print(f"⚠ Some results failed to publish; {len(manifest.pending)} images will be reprocessed next run")
+            manifest.discard_pending()
+            return
+        try:
+            manifest.checkpoint()
+        except Exception as e:
+            print(f"Error writing checkpoint to {manifest.describe()}: {e}")
 
     def process_batch(self, image_paths: List[str]) -> List[Dict[str, Any]]:
         """
-        Process a batch of images using GPU
+        Process a batch of local image files using GPU
         """
         print(f"Processing batch of {len(image_paths)} images on GPU...")
 
-        # Preprocess images
-        images = []
+        # Decode straight into the reusable batch buffer
+        if self._batch_buffer is None or len(self._batch_buffer) < len(image_paths):
+            self._batch_buffer = np.empty((max(len(image_paths), self.batch_size),) + self.input_shape, dtype=self.input_dtype)
+        loaded_paths = []
         for path in image_paths:
             try:
-                img = self.preprocess_image(path)
-                images.append(img)
+                with open(path, "rb") as f:
+                    self.decode_into(f.read(), self._batch_buffer[len(loaded_paths)])
+                loaded_paths.append(path)
             except Exception as e:
                 print(f"Error preprocessing {path}: {e}")
                 continue
 
-        if not images:
+        if not loaded_paths:
             return []
 
-        # Convert to batch
-        batch = np.array(images)
+        batch = self._batch_buffer[:len(loaded_paths)]
 
         # Run inference on GPU
         start_time = time.time()
-
-        with tf.device('/GPU:0' if tf.config.list_physical_devices('GPU') else '/CPU:0'):
-            predictions = self.model.predict(batch, batch_size=self.batch_size)
-
+        predictions = self.predict_batch(batch)
         processing_time = time.time() - start_time
-        print(f"✓ Processed {len(images)} images in {processing_time:.2f}s ({len(images)/processing_time:.1f} imgs/s)")
-
-        # Parse results
-        results = []
-        for i, pred in enumerate(predictions):
-            congestion_level = ['low', 'medium', 'high', 'critical'][np.argmax(pred)]
-            confidence = float(np.max(pred))
+        print(f"✓ Processed {len(loaded_paths)} images in {processing_time:.2f}s ({len(loaded_paths)/processing_time:.1f} imgs/s)")
 
-            results.append({
-                "image_path": image_paths[i],
-                "congestion_level": congestion_level,
-                "confidence": confidence,
-                "risk_score": float(np.mean(pred[2:])),  # Average of high/critical probabilities
-                "timestamp": datetime.utcnow().isoformat()
-            })
-
-        return results
+        return self.build_results(loaded_paths, predictions)
 
-    def download_images_from_gcs(self, prefix: str = "") -> List[str]:
+    def create_pipeline(self) -> ImagePipeline:
         """
-        Download satellite images from Cloud Storage
+        Fetch/decode/inference pipeline over the configured source
+        Call close() on it when done to release shared memory and workers
         """
-        print(f"Downloading images from gs://{self.bucket_name}/{prefix}")
+        if self.preprocess_mode == "processes":
+            pool = SharedBatchBufferPool(
+                ImagePipeline.buffer_count(self.prefetch_batches),
+                self.batch_size, self.input_shape, self.input_dtype
+            )
+            try:
+                decode = ProcessDecoder(pool, self.image_size, processes=self.decode_processes)
+            except Exception:
+                pool.close()
+                raise
+            # Threads only submit and wait; two per process keep every worker busy
+            decode_workers = self.preprocess_workers * 2
+        else:
+            pool = None
+            decode = lambda ref, data, buffer, index: self.decode_into(data, buffer[index])
+            decode_workers = self.decode_workers
+
+        return ImagePipeline(
+            fetch=self.source.fetch,
+            decode=decode,
+            image_shape=self.input_shape,
+            dtype=self.input_dtype,
+            batch_size=self.batch_size,
+            fetch_workers=self.fetch_workers,
+            decode_workers=decode_workers,
+            prefetch_batches=self.prefetch_batches,
+            pool=pool
+        )
 
-        local_paths = []
+    def process_stream(self, refs: Iterable[ImageRef], pipeline: Optional[ImagePipeline] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Process images from the source with fetching and decoding of later
+        batches overlapping inference on the current one; yields per-batch results
+        """
+        owned = pipeline is None
+        pipeline = pipeline or self.create_pipeline()
         try:
-            bucket = self.storage_client.bucket(self.bucket_name)
-            blobs = bucket.list_blobs(prefix=prefix)
-
-            os.makedirs("./temp_images", exist_ok=True)
-
-            for blob in blobs:
-                if blob.name.endswith(('.jpg', '.jpeg', '.png')):
-                    local_path = f"./temp_images/{os.path.basename(blob.name)}"
-                    blob.download_to_filename(local_path)
-                    local_paths.append(local_path)
-                    print(f"  Downloaded: {blob.name}")
-
-        except Exception as e:
-            print(f"Error downloading from GCS: {e}")
-
-        return local_paths
+            for batch_refs, batch in pipeline.run(refs):
+                start_time = time.time()
+                predictions = self.predict_batch(batch)
+                self.inference_seconds += time.time() - start_time
+                self.batch_memory.append({"images": len(batch_refs), **memory_usage()})
+                yield self.build_results([ref.name for ref in batch_refs], predictions)
+        finally:
+            if owned:
+                pipeline.close()
+
+    def result_envelope(self) -> Dict[str, Any]:
+        """
+        Fields sent with every chunk of results
+        """
+        return {
+            "processed_at": datetime.utcnow().isoformat(),
+            "gpu_used": self.device.gpu,
+            "inference_backend": self.backend.name
+        }
 
-    def publish_results(self, results: List[Dict[str, Any]]):
+    def publish_results(self, results: List[Dict[str, Any]]) -> bool:
         """
         Publish analysis results to Pub/Sub
+        Full chunks are sent asynchronously right away; call
+        result_publisher.drain() to flush and wait for acknowledgements
         """
         try:
-            message_data = json.dumps({
-                "results": results,
-                "processed_at": datetime.utcnow().isoformat(),
-                "gpu_used": len(tf.config.list_physical_devices('GPU')) > 0
-            }).encode("utf-8")
-
-            future = self.publisher.publish(self.topic_path, message_data)
-            message_id = future.result()
-            print(f"✓ Published results to Pub/Sub (message ID: {message_id})")
-
+            self.result_publisher.add(results)
+            return True
         except Exception as e:
             print(f"Error publishing to Pub/Sub: {e}")
+            return False
 
     def run(self):
         """
@@ -210,25 +523,59 @@ class SatelliteImageProcessor:
         if os.getenv("CLOUD_RUN_JOB"):
             print("Running as Cloud Run Job")
 
-        # Download images
-        image_paths = self.download_images_from_gcs()
+        tiled = self.scene_mode == "tiles"
 
-        if not image_paths:
+        # List images
+        print(f"Listing {'scenes' if tiled else 'images'} from {self.source.describe()}")
+        try:
+            refs = list(self.source.list_images(SCENE_EXTENSIONS if tiled else IMAGE_EXTENSIONS))
+        except Exception as e:
+            print(f"Error listing images: {e}")
+            refs = []
+
+        if not refs and not tiled:
             print("⚠ No images found - generating synthetic data for demo")
             # In demo mode, create synthetic images
-            image_paths = self.generate_synthetic_images(5)
-
-        # Process in batches
-        all_results = []
-        for i in range(0, len(image_paths), self.batch_size):
-            batch = image_paths[i:i + self.batch_size]
-            results = self.process_batch(batch)
-            all_results.extend(results)
-
-        # Publish results
-        if all_results:
-            self.publish_results(all_results)
-            print(f"\n✓ Processed {len(all_results)} images total")
+            self.source = self.generate_synthetic_source(5)
+            refs = list(self.source.list_images())
+
+        # Skip images analyzed by earlier runs, or only take REPROCESS_SINCE/UNTIL
+        manifest = self.open_manifest()
+        since, until = parse_time(os.getenv("REPROCESS_SINCE")), parse_time(os.getenv("REPROCESS_UNTIL"))
+        refs, skipped = manifest.select(refs, since, until)
+        if since is not None or until is not None:
+            print(f"Reprocessing {len(refs)} images updated in [{os.getenv('REPROCESS_SINCE') or '-'}, "
+                  f"{os.getenv('REPROCESS_UNTIL') or '-'}), {skipped} outside the window")
+        else:
+            print(f"{len(refs)} images to process, {skipped} already analyzed")
+
+        # Cloud Run sends SIGTERM before stopping a job task: finish the batch, checkpoint, exit
+        stop = threading.Event()
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        processed = 0
+        try:
+            if refs:
+                processed = (self.run_scenes if tiled else self.run_images)(refs, manifest, stop)
+        finally:
+            self.checkpoint(manifest)
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+            try:
+                manifest.compact()
+            except Exception as e:
+                print(f"Error compacting manifest: {e}")
+
+        print(f"  Publisher stats: {self.result_publisher.get_stats()}")
+        if stop.is_set():
+            print(f"\n⚠ Stopped early after {processed} {'scenes' if tiled else 'images'}; "
+                  f"the next run resumes from the last checkpoint")
+        elif processed:
+            print(f"\n✓ Processed {processed} {'scenes' if tiled else 'images'} total")
+        elif not refs:
+            print("\n✓ Nothing new to process")
         else:
             print("\n⚠ No results to publish")
 
@@ -251,6 +598,31 @@ class SatelliteImageProcessor:
         print(f"Generated {count} synthetic images for demo")
         return paths
 
+    def generate_synthetic_source(self, count: int) -> InMemoryImageSource:
+        """
+        Generate synthetic satellite images for demo, encoded in memory
+        """
+        images = {}
+        for i in range(count):
+            img = np.random.randint(0, 255, (512, 512, 3), dtype=np.uint8)
+            ok, encoded = cv2.imencode(".jpg", img)
+            if ok:
+                images[f"synthetic_{i}.jpg"] = encoded.tobytes()
+
+        print(f"Generated {count} synthetic images for demo")
+        return InMemoryImageSource(images)
+
+    def close(self):
+        """
+        Stop the decode worker processes
+        """
+        if self.decode_processes is not None:
+            self.decode_processes.close()
+            self.decode_processes = None
+
 if __name__ == "__main__":
     processor = SatelliteImageProcessor()
-    processor.run()
+    try:
+        processor.run()
+    finally:
+        processor.close()
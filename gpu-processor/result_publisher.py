@@ -0,0 +1,251 @@
+"""
+Streaming result publisher for Pub/Sub
+Results are appended as they are produced and sent as size-bounded,
+optionally gzip-compressed chunk messages. Publishing is asynchronous with
+a bound on in-flight messages; failed messages are retried with backoff.
+drain() flushes and waits for every message to be acknowledged.
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Pub/Sub rejects messages over 10 MB
+PUBSUB_MAX_MESSAGE_BYTES = 10 * 1000 * 1000
+
+
+class _Message:
+    __slots__ = ("data", "attributes", "results", "attempt", "sent_at")
+
+    def __init__(self, data: bytes, attributes: Dict[str, str], results: int):
+        self.data = data
+        self.attributes = attributes
+        self.results = results
+        self.attempt = 0
+        self.sent_at = 0.0
+
+
+class ResultPublisher:
+    """
+    add(results) -> chunks of at most max_message_bytes (before compression)
+    Each message is {"results": [...], "chunk": n, "run_id": ..., **envelope()}
+    with attributes run_id, chunk, results and content_encoding. A single
+    result larger than the limit is sent on its own.
+    """
+
+    def __init__(self,
+                 publisher,
+                 topic_path: str,
+                 max_message_bytes: int = 1000 * 1000,
+                 compression: str = "none",
+                 max_in_flight: int = 32,
+                 max_retries: int = 5,
+                 retry_base_delay: float = 0.5,
+                 envelope: Optional[Callable[[], Dict[str, Any]]] = None,
+                 run_id: str = ""):
+        if compression not in ("none", "gzip"):
+            raise ValueError(f"Unknown compression: {compression}")
+        self.publisher = publisher
+        self.topic_path = topic_path
+        self.max_message_bytes = max_message_bytes
+        self.compression = compression
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.envelope = envelope or (lambda: {})
+        self.run_id = run_id or datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._parts: List[bytes] = []
+        self._parts_bytes = 0
+        self._chunk = 0
+        self._in_flight = 0
+        self._failed_since_drain = 0
+
+        self.max_in_flight = max_in_flight
+        self.results_added = 0
+        self.results_published = 0
+        self.messages_published = 0
+        self.bytes_raw = 0
+        self.bytes_sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.peak_in_flight = 0
+        self.publish_seconds = 0.0
+
+    def add(self, results: List[Dict[str, Any]]):
+        """Buffer results; full chunks are published right away"""
+        for result in results:
+            part = json.dumps(result, default=str).encode("utf-8")
+            # +1 for the separating comma
+            if self._parts and self._parts_bytes + len(part) + 1 > self.max_message_bytes:
+                self.flush()
+            self._parts.append(part)
+            self._parts_bytes += len(part) + 1
+            self.results_added += 1
+
+    def flush(self):
+        """Publish the partial chunk"""
+        if not self._parts:
+            return
+        parts, self._parts, self._parts_bytes = self._parts, [], 0
+        self._chunk += 1
+
+        header = dict(self.envelope(), run_id=self.run_id, chunk=self._chunk)
+        # Results are spliced in pre-encoded rather than re-serialized
+        data = b'{"results":[' + b",".join(parts) + b"]," + json.dumps(header, default=str).encode("utf-8")[1:]
+        self.bytes_raw += len(data)
+        if self.compression == "gzip":
+            data = gzip.compress(data, compresslevel=6)
+
+        attributes = {
+            "run_id": self.run_id,
+            "chunk": str(self._chunk),
+            "results": str(len(parts)),
+            "content_encoding": self.compression,
+        }
+        message = _Message(data, attributes, len(parts))
+        if len(data) > PUBSUB_MAX_MESSAGE_BYTES:
+            print(f"Error publishing chunk {self._chunk}: {len(data)} bytes exceeds the Pub/Sub message limit")
+            self._fail(message)
+            return
+
+        # Blocks while max_in_flight messages await acknowledgement (backpressure)
+        self._slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        self._send(message)
+
+    def _send(self, message: _Message):
+        message.sent_at = time.perf_counter()
+        try:
+            future = self.publisher.publish(self.topic_path, message.data, **message.attributes)
+        except Exception as e:
+            self._on_error(message, e)
+            return
+        future.add_done_callback(lambda f: self._on_done(message, f))
+
+    def _on_done(self, message: _Message, future):
+        error = future.exception()
+        if error is not None:
+            self._on_error(message, error)
+            return
+        with self._lock:
+            self.publish_seconds += time.perf_counter() - message.sent_at
+            self.messages_published += 1
+            self.results_published += message.results
+            self.bytes_sent += len(message.data)
+        self._release()
+
+    def _on_error(self, message: _Message, error: Exception):
+        if message.attempt < self.max_retries:
+            message.attempt += 1
+            with self._lock:
+                self.retries += 1
+            delay = self.retry_base_delay * (2 ** (message.attempt - 1)) * (1 + random.random() * 0.1)
+            # Retry off the callback thread, keeping the in-flight slot
+            timer = threading.Timer(delay, self._send, args=(message,))
+            timer.daemon = True
+            timer.start()
+            return
+        print(f"Error publishing to Pub/Sub after {message.attempt + 1} attempts: {error}")
+        self._fail(message)
+        self._release()
+
+    def _fail(self, message: _Message):
+        with self._lock:
+            self.failures += 1
+            self._failed_since_drain += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._idle.notify_all()
+        self._slots.release()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Flush and wait for every in-flight message; True if all of them
+        (and everything since the previous drain) were published
+        """
+        self.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            ok = self._failed_since_drain == 0
+            self._failed_since_drain = 0
+        return ok
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "results_added": self.results_added,
+            "results_published": self.results_published,
+            "messages_published": self.messages_published,
+            "bytes_raw": self.bytes_raw,
+            "bytes_sent": self.bytes_sent,
+            "compression": self.compression,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_publish_ms": round(self.publish_seconds / self.messages_published * 1000, 2) if self.messages_published else 0.0,
+        }
+
+
+class InMemoryPublisher:
+    """
+    Local stand-in for pubsub_v1.PublisherClient
+    publish() returns a future completed on a worker thread after `latency`
+    seconds; `fail_rate` of attempts fail (seeded) and messages over the
+    Pub/Sub size limit are rejected like the real client does.
+    """
+
+    def __init__(self, latency: float = 0.005, fail_rate: float = 0.0, workers: int = 8, seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.messages: List[Dict[str, Any]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fake-pubsub")
+        self._next_id = 0
+
+    def topic_path(self, project: str, topic: str) -> str:
+        return f"projects/{project}/topics/{topic}"
+
+    def _complete(self, topic: str, data: bytes, attributes: Dict[str, str], fail: bool) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise RuntimeError("simulated publish failure")
+        with self._lock:
+            self._next_id += 1
+            self.messages.append({"topic": topic, "data": data, "attributes": attributes})
+            return str(self._next_id)
+
+    def publish(self, topic: str, data: bytes, **attributes: str) -> Future:
+        if len(data) > PUBSUB_MAX_MESSAGE_BYTES:
+            raise ValueError("Message exceeds the Pub/Sub size limit")
+        with self._lock:
+            fail = self._random.random() < self.fail_rate
+        return self._executor.submit(self._complete, topic, data, attributes, fail)
+
+    def decoded(self) -> List[Dict[str, Any]]:
+        """Published payloads, decompressed and parsed"""
+        payloads = []
+        for message in self.messages:
+            data = message["data"]
+            if message["attributes"].get("content_encoding") == "gzip":
+                data = gzip.decompress(data)
+            payloads.append(json.loads(data))
+        return payloads
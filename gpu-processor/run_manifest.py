@@ -0,0 +1,269 @@
+"""
+Persistent manifest of analyzed images for incremental, resumable runs
+Each checkpoint appends a JSON-lines shard to a state store (a GCS prefix or
+a local directory), so a preempted job loses at most the images since its
+last checkpoint and later runs skip images whose generation/content hash
+has already been analyzed.
+"""
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from image_sources import GCSImageSource, ImageRef, LocalDirectorySource
+
+SHARD_PREFIX = "manifest/"
+
+
+class LocalStateStore:
+    """State objects as files under a local directory"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def describe(self) -> str:
+        return self.root
+
+    def list(self, prefix: str) -> List[str]:
+        directory = os.path.join(self.root, prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(prefix + name for name in os.listdir(directory) if not name.endswith(".tmp"))
+
+    def read(self, name: str) -> bytes:
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+
+    def write(self, name: str, data: bytes):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, name: str):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+
+
+class GCSStateStore:
+    """State objects under a Cloud Storage prefix"""
+
+    def __init__(self, bucket_name: str, prefix: str = "", client=None):
+        if client is None:
+            from google.cloud import storage
+            client = storage.Client()
+        self.client = client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.bucket = client.bucket(bucket_name)
+
+    def describe(self) -> str:
+        return f"gs://{self.bucket_name}/{self.prefix}"
+
+    def list(self, prefix: str) -> List[str]:
+        full_prefix = self.prefix + prefix
+        return sorted(blob.name[len(self.prefix):] for blob in self.client.list_blobs(self.bucket_name, prefix=full_prefix))
+
+    def read(self, name: str) -> bytes:
+        return self.bucket.blob(self.prefix + name).download_as_bytes()
+
+    def write(self, name: str, data: bytes):
+        self.bucket.blob(self.prefix + name).upload_from_string(data, content_type="application/x-ndjson")
+
+    def delete(self, name: str):
+        self.bucket.blob(self.prefix + name).delete()
+
+
+def state_store_from_env(source) -> Optional[object]:
+    """
+    STATE_URI (gs://bucket/prefix or a local directory), otherwise next to
+    the images: _processor_state/ in the bucket or .processor_state/ in the
+    local directory. None (no persistence) for in-memory sources.
+    """
+    uri = os.getenv("STATE_URI", "")
+    if uri.startswith("gs://"):
+        bucket_name, _, prefix = uri[len("gs://"):].partition("/")
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        return GCSStateStore(bucket_name, prefix)
+    if uri:
+        return LocalStateStore(uri)
+    if isinstance(source, GCSImageSource):
+        return GCSStateStore(source.bucket_name, "_processor_state/", client=source.client)
+    if isinstance(source, LocalDirectorySource):
+        return LocalStateStore(os.path.join(source.root, ".processor_state"))
+    return None
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """ISO 8601 timestamp (UTC if no offset) to epoch seconds"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class RunManifest:
+    """
+    name -> last analysis of that image (generation, md5, result)
+
+    record() buffers entries; checkpoint() writes them as one new shard
+    once due() (every `checkpoint_every` images or `checkpoint_seconds`).
+    Shards are read in name order, so newer analyses win, and compact()
+    folds them into one once there are more than `compact_after`.
+    """
+
+    def __init__(self,
+                 store=None,
+                 checkpoint_every: int = 100,
+                 checkpoint_seconds: float = 60.0,
+                 compact_after: int = 50):
+        self.store = store
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.compact_after = compact_after
+        self.run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.pending: List[Dict[str, Any]] = []
+        # Persisted entry (or None) each pending entry replaced, for discard_pending()
+        self._replaced: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.shards: List[str] = []
+        self.checkpoints = 0
+        self._last_checkpoint = time.monotonic()
+
+    def describe(self) -> str:
+        return self.store.describe() if self.store else "in memory only"
+
+    def load(self) -> int:
+        """Read every shard; returns the number of images already analyzed"""
+        if self.store is None:
+            return 0
+        self.shards = [name for name in self.store.list(SHARD_PREFIX) if name.endswith(".jsonl")]
+        for shard in self.shards:
+            for line in self.store.read(shard).decode("utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["name"]] = entry
+        return len(self.entries)
+
+    def is_current(self, ref: ImageRef) -> bool:
+        """Analyzed before, and the image has not been rewritten since"""
+        entry = self.entries.get(ref.name)
+        if entry is None:
+            return False
+        if ref.generation and entry.get("generation") == ref.generation:
+            return True
+        return bool(ref.md5) and entry.get("md5") == ref.md5
+
+    def select(self, refs: Iterable[ImageRef], since: Optional[float] = None,
+               until: Optional[float] = None) -> Tuple[List[ImageRef], int]:
+        """
+        Images to process and how many were skipped. Without a window, every
+        image not analyzed in its current version; with since/until (epoch
+        seconds), only images updated in [since, until), analyzed or not.
+        """
+        selected = []
+        skipped = 0
+        windowed = since is not None or until is not None
+        for ref in refs:
+            if windowed:
+                in_window = ref.updated is not None \
+                    and (since is None or ref.updated >= since) \
+                    and (until is None or ref.updated < until)
+                keep = in_window
+            else:
+                keep = not self.is_current(ref)
+            if keep:
+                selected.append(ref)
+            else:
+                skipped += 1
+        return selected, skipped
+
+    def record(self, ref: ImageRef, result: Dict[str, Any]):
+        entry = {
+            "name": ref.name,
+            "generation": ref.generation,
+            "md5": ref.md5,
+            "updated": ref.updated,
+            "processed_at": datetime.utcnow().isoformat(),
+            "run_id": self.run_id,
+            "result": result,
+        }
+        if ref.name not in self._replaced:
+            self._replaced[ref.name] = self.entries.get(ref.name)
+        self.entries[ref.name] = entry
+        self.pending.append(entry)
+
+    def due(self) -> bool:
+        if not self.pending:
+            return False
+        return len(self.pending) >= self.checkpoint_every \
+            or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+
+    def discard_pending(self):
+        """
+        Drop pending entries without persisting them and restore what they
+        replaced, so those images are redone next run
+        """
+        for name, previous in self._replaced.items():
+            if previous is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = previous
+        self._replaced = {}
+        self.pending = []
+        self._last_checkpoint = time.monotonic()
+
+    def _shard_name(self) -> str:
+        # Sorts by write time, then by run
+        return f"{SHARD_PREFIX}{time.time_ns():020d}-{self.run_id}.jsonl"
+
+    def _write(self, entries: List[Dict[str, Any]]) -> str:
+        name = self._shard_name()
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode("utf-8")
+        self.store.write(name, data)
+        return name
+
+    def checkpoint(self) -> int:
+        """Persist pending entries as a new shard; returns how many"""
+        count = len(self.pending)
+        if count and self.store is not None:
+            self.shards.append(self._write(self.pending))
+            self.checkpoints += 1
+        self.pending = []
+        self._replaced = {}
+        self._last_checkpoint = time.monotonic()
+        return count
+
+    def compact(self, force: bool = False) -> bool:
+        """
+        Rewrite all entries as one shard and delete the old ones (a crash in
+        between only leaves duplicates, which load() resolves)
+        """
+        if self.store is None or self.pending or (len(self.shards) <= self.compact_after and not force):
+            return False
+        old_shards = self.shards
+        self.shards = [self._write(list(self.entries.values()))]
+        for shard in old_shards:
+            self.store.delete(shard)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "store": self.describe(),
+            "run_id": self.run_id,
+            "entries": len(self.entries),
+            "pending": len(self.pending),
+            "shards": len(self.shards),
+            "checkpoints": self.checkpoints,
+        }
@@ -0,0 +1,352 @@
+"""
+Tiled analysis of large satellite scenes
+Scenes are read window by window (GDAL windowed reads for GeoTIFF/JP2, a
+memory-mapped array for .npy), cut into overlapping model-sized tiles and
+the per-tile risk is aggregated into a georeferenced grid. Only the tiles
+in flight are ever resident, so memory does not grow with scene size.
+"""
+
+import json
+import mmap
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import rasterio
+    from rasterio.warp import transform as warp_transform
+    from rasterio.windows import Window
+except ImportError:  # only needed for GeoTIFF / JP2 scenes
+    rasterio = None
+
+SCENE_EXTENSIONS = ('.tif', '.tiff', '.jp2', '.npy')
+
+# Affine pixel -> map transform (a, b, c, d, e, f) as in rasterio/GDAL:
+# x = a * col + b * row + c, y = d * col + e * row + f
+Transform = Tuple[float, float, float, float, float, float]
+
+
+@dataclass(frozen=True)
+class TileWindow:
+    """One tile of a scene in pixel coordinates"""
+    row: int
+    col: int
+    height: int
+    width: int
+
+    @property
+    def name(self) -> str:
+        return f"tile@{self.row},{self.col}"
+
+
+def tile_windows(height: int, width: int, tile_size: int, overlap: int) -> Iterator[TileWindow]:
+    """
+    Row-major tiles of tile_size with `overlap` pixels shared between
+    neighbours; the last row/column is shifted back to end on the scene edge
+    """
+    if not 0 <= overlap < tile_size:
+        raise ValueError("overlap must be >= 0 and smaller than tile_size")
+    stride = tile_size - overlap
+
+    def starts(extent: int) -> List[int]:
+        if extent <= tile_size:
+            return [0]
+        offsets = list(range(0, extent - tile_size + 1, stride))
+        if offsets[-1] + tile_size < extent:
+            offsets.append(extent - tile_size)
+        return offsets
+
+    for row in starts(height):
+        for col in starts(width):
+            yield TileWindow(row, col, min(tile_size, height - row), min(tile_size, width - col))
+
+
+def _apply(transform: Transform, cols: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    a, b, c, d, e, f = transform
+    return a * cols + b * rows + c, d * cols + e * rows + f
+
+
+class MemmapScene:
+    """
+    (H, W, 3) uint8 BGR scene stored as .npy, read through a read-only
+    memory map. Pages of each window are dropped after it is copied so RSS
+    stays at the tiles in flight. Georeferencing (EPSG:4326) comes from an
+    optional sidecar `<path>.json` with {"transform": [a, b, c, d, e, f]}.
+    """
+
+    def __init__(self, path: str, transform: Optional[Transform] = None):
+        self.path = path
+        self._file = open(path, "rb")
+        version = np.lib.format.read_magic(self._file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(self._file)
+        if fortran_order or len(shape) != 3 or shape[2] != 3 or dtype != np.uint8:
+            self._file.close()
+            raise ValueError(f"Expected a C-ordered (H, W, 3) uint8 array in {path}")
+        offset = self._file.tell()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.pixels = np.ndarray(shape, dtype=np.uint8, buffer=self._mmap, offset=offset)
+        self._offset = offset
+        self._row_bytes = shape[1] * 3
+        self.height, self.width = shape[:2]
+
+        if transform is None:
+            try:
+                with open(f"{path}.json", "r", encoding="utf-8") as f:
+                    transform = tuple(json.load(f)["transform"])
+            except (OSError, ValueError, KeyError):
+                transform = None
+        self.transform = transform
+        self.crs = "EPSG:4326" if transform else None
+
+    def read_window(self, window: TileWindow) -> np.ndarray:
+        tile = np.array(self.pixels[window.row:window.row + window.height, window.col:window.col + window.width])
+        # Release the mapped pages of these rows (they refault from the page cache if needed)
+        start = self._offset + window.row * self._row_bytes
+        end = start + window.height * self._row_bytes
+        start -= start % mmap.PAGESIZE
+        if hasattr(self._mmap, "madvise"):
+            self._mmap.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return tile
+
+    def pixel_to_lonlat(self, cols: np.ndarray, rows: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self.transform is None:
+            return None
+        return _apply(self.transform, cols, rows)
+
+    def close(self):
+        self.pixels = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RasterioScene:
+    """
+    GeoTIFF / COG / JP2 scene read with GDAL windowed reads (local paths or
+    /vsigs/ URIs). Each reader thread gets its own dataset handle; GDAL's
+    block cache is bounded by GDAL_CACHEMAX. Bands 1-3 are taken as RGB and
+    reordered to BGR like cv2.imdecode output; non-uint8 data is scaled
+    from [0, max_value].
+    """
+
+    def __init__(self, uri: str, max_value: Optional[float] = None):
+        if rasterio is None:
+            raise RuntimeError("rasterio is required to read GeoTIFF/JP2 scenes")
+        self.uri = uri
+        self._local = threading.local()
+        self._handles: List[Any] = []
+        self._lock = threading.Lock()
+
+        dataset = self._dataset()
+        self.height, self.width = dataset.height, dataset.width
+        self.transform = tuple(dataset.transform)[:6]
+        self.crs = dataset.crs.to_string() if dataset.crs else None
+        self.dtype = np.dtype(dataset.dtypes[0])
+        self.bands = [3, 2, 1] if dataset.count >= 3 else [1, 1, 1]
+        if max_value is None and self.dtype != np.uint8:
+            max_value = float(np.iinfo(self.dtype).max) if self.dtype.kind in "ui" else 1.0
+        self.max_value = max_value
+
+    def _dataset(self):
+        dataset = getattr(self._local, "dataset", None)
+        if dataset is None:
+            dataset = self._local.dataset = rasterio.open(self.uri)
+            with self._lock:
+                self._handles.append(dataset)
+        return dataset
+
+    def read_window(self, window: TileWindow) -> np.ndarray:
+        data = self._dataset().read(self.bands, window=Window(window.col, window.row, window.width, window.height))
+        tile = np.moveaxis(data, 0, -1)
+        if self.dtype != np.uint8:
+            tile = np.clip(tile.astype(np.float32) * (255.0 / self.max_value), 0, 255).astype(np.uint8)
+        return np.ascontiguousarray(tile)
+
+    def pixel_to_lonlat(self, cols: np.ndarray, rows: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if not self.crs:
+            return None
+        xs, ys = _apply(self.transform, cols, rows)
+        if self.crs == "EPSG:4326":
+            return xs, ys
+        lons, lats = warp_transform(self.crs, "EPSG:4326", xs.ravel().tolist(), ys.ravel().tolist())
+        return np.reshape(lons, xs.shape), np.reshape(lats, ys.shape)
+
+    def close(self):
+        with self._lock:
+            for dataset in self._handles:
+                dataset.close()
+            self._handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_scene(uri: str):
+    """Scene reader for a path or GDAL URI"""
+    if uri.lower().endswith(".npy"):
+        return MemmapScene(uri)
+    return RasterioScene(uri)
+
+
+@dataclass
+class RiskGrid:
+    """
+    Tile risk aggregated onto a regular grid of cell_size-pixel cells
+    risk is the mean and peak the max risk score of the tiles covering each
+    cell; lons/lats are cell centres (None when the scene has no georeference)
+    """
+    risk: np.ndarray
+    peak: np.ndarray
+    cell_size: int
+    height: int
+    width: int
+    tiles: int
+    crs: Optional[str] = None
+    transform: Optional[Transform] = None
+    lons: Optional[np.ndarray] = None
+    lats: Optional[np.ndarray] = None
+    # Riskiest tile: pixel window, risk and predicted class index
+    worst_tile: Optional[Dict[str, Any]] = None
+
+    def hotspots(self, top: int = 10) -> List[Dict[str, Any]]:
+        """Cells with the highest peak risk"""
+        order = np.argsort(self.peak, axis=None)[::-1][:top]
+        spots = []
+        for flat in order:
+            i, j = np.unravel_index(flat, self.peak.shape)
+            spot = {
+                "row": int(i),
+                "col": int(j),
+                "peak_risk": round(float(self.peak[i, j]), 4),
+                "mean_risk": round(float(self.risk[i, j]), 4),
+            }
+            if self.lons is not None:
+                spot["lon"] = round(float(self.lons[i, j]), 6)
+                spot["lat"] = round(float(self.lats[i, j]), 6)
+            spots.append(spot)
+        return spots
+
+    def to_dict(self, precision: int = 3, hotspots: int = 10) -> Dict[str, Any]:
+        result = {
+            "rows": int(self.risk.shape[0]),
+            "cols": int(self.risk.shape[1]),
+            "cell_size_px": self.cell_size,
+            "scene_size_px": [self.height, self.width],
+            "tiles": self.tiles,
+            "crs": self.crs,
+            "transform": list(self.transform) if self.transform else None,
+            "mean_risk": round(float(self.risk.mean()), 4),
+            "max_risk": round(float(self.peak.max()), 4),
+            "risk": np.round(self.risk, precision).tolist(),
+            "hotspots": self.hotspots(hotspots),
+            "worst_tile": self.worst_tile,
+        }
+        if self.lons is not None:
+            result["bounds"] = [
+                round(float(self.lons.min()), 6), round(float(self.lats.min()), 6),
+                round(float(self.lons.max()), 6), round(float(self.lats.max()), 6),
+            ]
+        return result
+
+
+class TiledSceneAnalyzer:
+    """
+    Places tiles into model-sized batch slots and accumulates per-tile risk
+    into cells of `tile_size - overlap` pixels. A tile contributes to the
+    cells whose centre it contains, so every cell is covered by at least one
+    tile and overlaps are counted once per covering tile.
+    """
+
+    def __init__(self, scene, tile_size: int, overlap: int, input_shape: Tuple[int, int, int],
+                 risk_of: Callable[[np.ndarray], np.ndarray]):
+        self.scene = scene
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.input_shape = input_shape
+        self.risk_of = risk_of
+        self.cell_size = tile_size - overlap
+        self._row_centres = self._centres(scene.height)
+        self._col_centres = self._centres(scene.width)
+        rows, cols = len(self._row_centres), len(self._col_centres)
+        self._sum = np.zeros((rows, cols), dtype=np.float64)
+        self._count = np.zeros((rows, cols), dtype=np.int32)
+        self._peak = np.zeros((rows, cols), dtype=np.float32)
+        self.tiles = 0
+        self.worst_tile: Optional[Dict[str, Any]] = None
+
+    def _centres(self, extent: int) -> np.ndarray:
+        # The last cell is clipped to the scene edge
+        starts = np.arange(0, extent, self.cell_size, dtype=np.float64)
+        return (starts + np.minimum(starts + self.cell_size, extent)) / 2
+
+    def windows(self) -> Iterator[TileWindow]:
+        return tile_windows(self.scene.height, self.scene.width, self.tile_size, self.overlap)
+
+    def place(self, tile: np.ndarray, out: np.ndarray):
+        """Write one tile into a batch slot (zero-padded at scene edges, resized if the model input differs)"""
+        height, width = self.input_shape[:2]
+        if tile.shape[0] == self.tile_size and tile.shape[1] == self.tile_size:
+            if self.tile_size == height and self.tile_size == width:
+                np.copyto(out, tile)
+            else:
+                cv2.resize(tile, (width, height), dst=out, interpolation=cv2.INTER_AREA)
+            return
+        # Scene smaller than one tile: pad to a full tile first
+        padded = np.zeros((self.tile_size, self.tile_size, 3), dtype=np.uint8)
+        padded[:tile.shape[0], :tile.shape[1]] = tile
+        self.place(padded, out)
+
+    def add(self, windows: List[TileWindow], predictions: np.ndarray):
+        """Accumulate the risk of each tile onto the cells whose centre it covers"""
+        for window, risk, pred in zip(windows, self.risk_of(predictions), predictions):
+            rows = self._covered(self._row_centres, window.row, window.height)
+            cols = self._covered(self._col_centres, window.col, window.width)
+            self._sum[rows, cols] += risk
+            self._count[rows, cols] += 1
+            np.maximum(self._peak[rows, cols], risk, out=self._peak[rows, cols])
+            self.tiles += 1
+            if self.worst_tile is None or risk > self.worst_tile["risk"]:
+                self.worst_tile = {
+                    "row": window.row,
+                    "col": window.col,
+                    "height": window.height,
+                    "width": window.width,
+                    "risk": round(float(risk), 4),
+                    "class_index": int(np.argmax(pred)),
+                }
+
+    @staticmethod
+    def _covered(centres: np.ndarray, start: int, length: int) -> slice:
+        # Cells whose centre lies in [start, start + length)
+        return slice(int(np.searchsorted(centres, start)), int(np.searchsorted(centres, start + length)))
+
+    def grid(self) -> RiskGrid:
+        risk = np.divide(self._sum, self._count, out=np.zeros_like(self._sum), where=self._count > 0)
+        centre_cols, centre_rows = np.meshgrid(self._col_centres, self._row_centres)
+        centres = self.scene.pixel_to_lonlat(centre_cols, centre_rows)
+        lons, lats = centres if centres is not None else (None, None)
+        return RiskGrid(
+            risk=risk.astype(np.float32),
+            peak=self._peak.copy(),
+            cell_size=self.cell_size,
+            height=self.scene.height,
+            width=self.scene.width,
+            tiles=self.tiles,
+            crs=self.scene.crs,
+            transform=self.scene.transform,
+            lons=lons,
+            lats=lats,
+            worst_tile=self.worst_tile
+        )
@@ -0,0 +1,11 @@
+"""
+Shared setup for the gpu-processor tests
+Modules are imported flat from gpu-processor/, as process_images.py does
+"""
+
+import os
+import sys
+
+PROCESSOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROCESSOR_DIR not in sys.path:
+    sys.path.insert(0, PROCESSOR_DIR)
@@ -0,0 +1,35 @@
+"""
+Process-pool decoding: workers forked up front are shared by decoders and
+outlive them
+"""
+
+import cv2
+import numpy as np
+
+from image_decode import DecodeProcesses, ProcessDecoder
+from image_pipeline import SharedBatchBufferPool
+
+
+def _encoded(value: int) -> bytes:
+    ok, encoded = cv2.imencode(".png", np.full((4, 4, 3), value, dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def test_decoders_reuse_processes_forked_earlier():
+    processes = DecodeProcesses(workers=2)
+    try:
+        for value in (10, 20):
+            pool = SharedBatchBufferPool(1, batch_size=2, image_shape=(4, 4, 3))
+            decoder = ProcessDecoder(pool, (4, 4), processes=processes)
+            try:
+                buffer = pool.buffers[0]
+                decoder("a", _encoded(value), buffer, 1)
+                assert (buffer[1] == value).all()
+            finally:
+                decoder.close()
+                pool.close()
+        # Still running after both decoders closed
+        assert processes.submit(abs, -3).result(timeout=5) == 3
+    finally:
+        processes.close()
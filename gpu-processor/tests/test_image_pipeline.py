@@ -0,0 +1,58 @@
+"""
+Batch assembly: decoders waiting for a buffer must not stop other decoders
+from sealing the batches whose release frees one
+"""
+
+import queue
+import threading
+import time
+
+from image_pipeline import BatchBufferPool, ImagePipeline, _BatchAssembler
+
+
+def test_commit_proceeds_while_a_decoder_waits_for_a_buffer():
+    stop = threading.Event()
+    pool = BatchBufferPool(1, batch_size=1, image_shape=(1, 1, 1))
+    batch_q: queue.Queue = queue.Queue()
+    assembler = _BatchAssembler(pool, 1, batch_q, stop)
+    try:
+        first, _ = assembler.claim("a")  # takes the only buffer and seals it
+
+        claims = []
+        waiter = threading.Thread(target=lambda: claims.append(assembler.claim("b")), daemon=True)
+        waiter.start()
+        time.sleep(0.2)  # let it block on the empty pool
+
+        committer = threading.Thread(target=assembler.commit, args=(first,), daemon=True)
+        committer.start()
+        committer.join(2)
+        assert not committer.is_alive()
+
+        emitted = batch_q.get(timeout=1)
+        assert emitted.refs == ["a"]
+        pool.release(emitted.buffer)
+        waiter.join(2)
+        assert claims and claims[0][0].refs == ["b"]
+    finally:
+        stop.set()
+
+
+def test_many_decoders_with_a_small_pool_finish_every_image():
+    def decode(ref, data, buffer, index):
+        time.sleep(0.001)
+        buffer[index] = ref % 256
+
+    pipeline = ImagePipeline(fetch=lambda ref: b"x", decode=decode, image_shape=(2, 2, 1),
+                             batch_size=3, fetch_workers=4, decode_workers=16, prefetch_batches=0)
+    seen = []
+
+    def consume():
+        for refs, batch in pipeline.run(range(300)):
+            assert all((batch[i] == ref % 256).all() for i, ref in enumerate(refs))
+            seen.extend(refs)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    consumer.join(30)
+    assert not consumer.is_alive()
+    assert sorted(seen) == list(range(300))
@@ -0,0 +1,64 @@
+"""
+RunManifest: checkpoints, discarded (unpublished) results and compaction
+"""
+
+from image_sources import ImageRef
+from run_manifest import LocalStateStore, RunManifest
+
+
+def _manifest(tmp_path) -> RunManifest:
+    manifest = RunManifest(LocalStateStore(str(tmp_path)))
+    manifest.load()
+    return manifest
+
+
+def test_checkpointed_images_are_current_after_reload(tmp_path):
+    ref = ImageRef("a.png", generation="1")
+    manifest = _manifest(tmp_path)
+    manifest.record(ref, {"risk": 0.1})
+    assert manifest.checkpoint() == 1
+
+    assert _manifest(tmp_path).is_current(ref)
+    assert not _manifest(tmp_path).is_current(ImageRef("a.png", generation="2"))
+
+
+def test_discarded_new_image_is_not_saved_by_compaction(tmp_path):
+    ref = ImageRef("a.png", generation="1")
+    manifest = _manifest(tmp_path)
+    manifest.record(ref, {"risk": 0.1})
+    manifest.discard_pending()
+    assert not manifest.is_current(ref)
+
+    assert manifest.compact(force=True)
+    assert not _manifest(tmp_path).is_current(ref)
+
+
+def test_discard_restores_the_previous_analysis(tmp_path):
+    old = ImageRef("a.png", generation="1")
+    new = ImageRef("a.png", generation="2")
+    manifest = _manifest(tmp_path)
+    manifest.record(old, {"risk": 0.1})
+    manifest.checkpoint()
+
+    # The rewritten image is analyzed twice in one window, then discarded
+    manifest.record(new, {"risk": 0.5})
+    manifest.record(new, {"risk": 0.6})
+    manifest.discard_pending()
+    assert manifest.compact(force=True)
+
+    reloaded = _manifest(tmp_path)
+    assert reloaded.is_current(old)
+    assert not reloaded.is_current(new)
+    assert reloaded.entries["a.png"]["result"] == {"risk": 0.1}
+
+
+def test_discard_after_checkpoint_keeps_checkpointed_entries(tmp_path):
+    first, second = ImageRef("a.png", generation="1"), ImageRef("b.png", generation="1")
+    manifest = _manifest(tmp_path)
+    manifest.record(first, {})
+    manifest.checkpoint()
+    manifest.record(second, {})
+    manifest.discard_pending()
+
+    assert manifest.is_current(first)
+    assert not manifest.is_current(second)